@@ -1,5 +1,20 @@
+from collections import ChainMap, Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import deepcopy
 from enum import Enum
+from functools import lru_cache
+from hashlib import blake2b
+from threading import Lock
+from weakref import WeakSet, WeakValueDictionary
+import csv
+import heapq
+import itertools
+import operator
+import os
+import queue
 import re
+import time
 
 
 PATTERN_PREFIX = '([^0-9 ]+[.])'
@@ -23,12 +38,399 @@ KEYWORD = {
 CMD_SELECT, CMD_FROM, CMD_WHERE, CMD_GROUP_BY, CMD_ORDER_BY, CMD_LIMIT = KEYWORD.keys()
 USUAL_KEYS = [CMD_SELECT, CMD_WHERE, CMD_GROUP_BY, CMD_ORDER_BY, CMD_LIMIT]
 TO_LIST = lambda x: x if isinstance(x, list) else [] if x is None else [x]
+VALUES_VERSION = itertools.count(1)
+CURRENT_CONTEXT = ContextVar('CURRENT_CONTEXT', default=None)
+CONTEXT_TOKENS = ContextVar('CONTEXT_TOKENS', default=())  # --- the BuildContexts entered
 
 
-class FuncNode:
-    text: str = ''
-    stack = []
-    ref: 'FuncNode' = None
+class ClauseIndex:
+    """
+    Hash indexes of a clause list, updated
+    as its items are added or removed:
+        * named: prefixes of the field aliases;
+        * elements: the items as compared by `diff`.
+    """
+    __slots__ = ('key', 'named', 'elements')
+
+    def __init__(self, key: str, source: list=()):
+        self.key = key
+        self.named = Counter()
+        self.elements = Counter()
+        for text in source:
+            self.add(text)
+
+    @staticmethod
+    def count(counter: Counter, items, inc: int):
+        for item in items:
+            counter[item] += inc
+            if counter[item] <= 0:
+                del counter[item]
+
+    def update(self, text: str, inc: int):
+        node = ClauseNode.parse(self.key, text)
+        for word in node.named:
+            self.count(self.named, [word[:size] for size in range(len(word)+1)], inc)
+        self.count(self.elements, node.elements(self.key, False), inc)
+
+    def add(self, text: str):
+        self.update(text, 1)
+
+    def discard(self, text: str):
+        self.update(text, -1)
+
+    def copy(self) -> 'ClauseIndex':
+        result = ClauseIndex(self.key)
+        result.named = self.named.copy()
+        result.elements = self.elements.copy()
+        return result
+
+
+class ValueList(list):
+    """
+    A clause list (SELECT, WHERE...) that
+    tells its ValueMap when it was changed
+    and keeps its ClauseIndex up to date.
+    """
+    __slots__ = ('owner', 'key', 'indexed', 'sharers')
+
+    def __init__(self, source: list=(), owner: 'ValueMap'=None, key: str=''):
+        self.owner = owner
+        self.key = key
+        self.indexed = None
+        self.sharers = None
+        super().__init__(source)
+
+    def share(self, values: 'ValueMap'):
+        if self.sharers is None:
+            self.sharers = WeakValueDictionary()
+        self.sharers[id(values)] = values
+
+    def detach(self):
+        """Gives the copies that share this list their own list, before it changes"""
+        sharers = getattr(self, 'sharers', None)
+        if sharers:
+            for values in list(sharers.values()):
+                values.unshare(self.key, self)
+            sharers.clear()
+
+    def clause_index(self) -> ClauseIndex:
+        if self.indexed is None:
+            self.indexed = ClauseIndex(self.key, self)
+        return self.indexed
+
+    def touch(self, added: list=(), removed: list=(), reindex: bool=False):
+        indexed = getattr(self, 'indexed', None)
+        if reindex:
+            self.indexed = None
+        elif indexed is not None:
+            for text in removed:
+                indexed.discard(text)
+            for text in added:
+                indexed.add(text)
+        owner = getattr(self, 'owner', None)
+        if owner is not None:
+            owner.touch()
+
+    def __reduce__(self):
+        return ValueList, (list(self),)
+
+    def __deepcopy__(self, memo: dict):
+        return ValueList(self)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, int) and index < len(self) and self[index] == value:
+            return
+        self.detach()
+        if isinstance(index, slice):
+            removed, value = self[index], list(value)
+            added = value
+        else:
+            removed, added = [self[index]], [value]
+        super().__setitem__(index, value)
+        self.touch(added, removed)
+
+    def __delitem__(self, index):
+        self.detach()
+        removed = self[index]
+        super().__delitem__(index)
+        self.touch(removed=removed if isinstance(index, slice) else [removed])
+
+    def __iadd__(self, other):
+        self.detach()
+        other = list(other)
+        super().__iadd__(other)
+        self.touch(other)
+        return self
+
+    def __imul__(self, times: int):
+        self.detach()
+        super().__imul__(times)
+        self.touch(reindex=True)
+        return self
+
+    def append(self, value):
+        self.detach()
+        super().append(value)
+        self.touch([value])
+
+    def extend(self, source):
+        self.detach()
+        source = list(source)
+        super().extend(source)
+        self.touch(source)
+
+    def insert(self, index: int, value):
+        self.detach()
+        super().insert(index, value)
+        self.touch([value])
+
+    def pop(self, index: int=-1):
+        self.detach()
+        result = super().pop(index)
+        self.touch(removed=[result])
+        return result
+
+    def remove(self, value):
+        self.detach()
+        super().remove(value)
+        self.touch(removed=[value])
+
+    def clear(self):
+        self.detach()
+        super().clear()
+        self.touch(reindex=True)
+
+    def sort(self, **args):
+        self.detach()
+        super().sort(**args)
+        self.touch()
+
+    def reverse(self):
+        self.detach()
+        super().reverse()
+        self.touch()
+
+
+class ValueMap(dict):
+    """
+    The `values` of a query: each change in the map or in
+    one of its lists increments `version` and clears `memo`,
+    where the results computed from the values are kept.
+    The lists of a copy are `shared` with the original:
+    the original keeps them and the copy only takes its own
+    list when it reads it or when the original changes it.
+    """
+    __slots__ = ('version', 'memo', 'shared', '__weakref__')
+
+    def __init__(self, source: dict=None):
+        super().__init__()
+        self.version = next(VALUES_VERSION)
+        self.memo = {}
+        self.shared = set()
+        if source:
+            self.update(source)
+
+    def unshare(self, key: str, source: ValueList=None):
+        value = super().get(key)
+        if source is not None and value is not source:
+            return
+        self.shared.discard(key)
+        if value is not None:
+            if value.sharers:
+                value.sharers.pop(id(self), None)
+            new_list = ValueList(value, self, key)
+            if value.indexed is not None:
+                new_list.indexed = value.indexed.copy()
+            super().__setitem__(key, new_list)
+
+    def __getitem__(self, key: str) -> ValueList:
+        if key in self.shared:
+            self.unshare(key)
+        return super().__getitem__(key)
+
+    def get(self, key: str, default=None):
+        if key in self.shared:
+            self.unshare(key)
+        return super().get(key, default)
+
+    def values(self):
+        for key in list(self.shared):
+            self.unshare(key)
+        return super().values()
+
+    def items(self):
+        for key in list(self.shared):
+            self.unshare(key)
+        return super().items()
+
+    def touch(self):
+        self.version = next(VALUES_VERSION)
+        if self.memo:
+            self.memo.clear()
+
+    def __reduce__(self):
+        return ValueMap, (dict(self),)
+
+    def __deepcopy__(self, memo: dict):
+        return ValueMap(self)
+
+    def __setitem__(self, key: str, value: list):
+        if not isinstance(value, ValueList) or value.owner is not self or value.key != key:
+            value = ValueList(value, self, key)
+        self.shared.discard(key)
+        super().__setitem__(key, value)
+        self.touch()
+
+    def __delitem__(self, key: str):
+        self.shared.discard(key)
+        super().__delitem__(key)
+        self.touch()
+
+    def __ior__(self, other: dict):
+        self.update(other)
+        return self
+
+    def setdefault(self, key: str, default: list=None) -> ValueList:
+        if key not in self:
+            self[key] = [] if default is None else default
+        return self[key]
+
+    def update(self, source: dict=(), **values):
+        for key, value in dict(source, **values).items():
+            self[key] = value
+
+    def pop(self, key: str, *default):
+        if key in self.shared:
+            self.unshare(key)
+        result = super().pop(key, *default)
+        self.touch()
+        return result
+
+    def popitem(self) -> tuple:
+        key, result = super().popitem()
+        if key in self.shared:
+            self.shared.discard(key)
+            result = ValueList(result)
+        self.touch()
+        return key, result
+
+    def clear(self):
+        self.shared.clear()
+        super().clear()
+        self.touch()
+
+    def copy(self) -> 'ValueMap':
+        """
+        Copy-on-write: the copy refers to the same lists,
+        which are copied only for the copy (see `unshare`).
+        """
+        result = ValueMap()
+        dict.update(result, self)
+        result.shared = set(self)
+        result.memo = self.memo.copy()
+        for value in dict.values(self):
+            value.share(result)
+        return result
+
+
+class ScopedAttribute:
+    """
+    A class attribute whose value can be replaced
+    inside a BuildContext without affecting
+    other threads or asyncio tasks:
+        * `local` attributes are always kept per thread/task
+          and restart with their default in each context;
+        * `scope` builds the value used when a context starts.
+    """
+    UNSET = object()
+    SCOPED: list = []
+
+    def __init__(self, value, local: bool=False, scope: callable=None, parent: 'ScopedAttribute'=None):
+        self.value = value
+        self.local = local
+        self.scope = scope
+        self.parent = parent
+        self.var: ContextVar = None
+
+    def __set_name__(self, owner: type, name: str):
+        self.var = ContextVar(f'{owner.__name__}.{name}', default=self.UNSET)
+        if self.scope or self.local:
+            self.SCOPED.append(self)
+
+    def __get__(self, instance, owner: type=None):
+        attr = self
+        while attr:
+            value = attr.var.get()
+            if value is not self.UNSET:
+                return value
+            attr = attr.parent
+        attr = self
+        while attr.value is self.UNSET:
+            attr = attr.parent
+        return attr.value
+
+    def set(self, value):
+        if self.local or CURRENT_CONTEXT.get() is not None:
+            self.var.set(value)
+        else:
+            self.value = value
+
+    def enter(self, state: dict) -> tuple:
+        if self.local:
+            value = self.value
+        elif self in state:
+            value = state[self]
+        else:  # --- setdefault: two threads entering the same session get the same value
+            value = state.setdefault(self, self.scope( self.__get__(None) ))
+        return self.var, self.var.set(value)
+
+
+class Registry(OrderedDict):
+    """
+    A dict of names registered while building queries.
+    With `max_size`, the oldest entries are discarded.
+    The changes are locked, so a session can be shared by threads.
+    """
+    def __init__(self, source: dict=(), max_size: int=None):
+        self.max_size = max_size
+        self.lock = Lock()
+        super().__init__(source)
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            if self.max_size is not None:
+                while len(self) > self.max_size:
+                    self.popitem(last=False)
+
+    def __reduce__(self):
+        return Registry, (dict(self), self.max_size)
+
+
+class ContextMeta(type):
+    """
+    Routes the assignments of ScopedAttribute
+    fields to the current BuildContext.
+    """
+    def __setattr__(cls, name: str, value):
+        for owner in cls.__mro__:
+            attr = owner.__dict__.get(name)
+            if isinstance(attr, ScopedAttribute):
+                break
+        else:
+            return super().__setattr__(name, value)
+        if owner is not cls:
+            attr = ScopedAttribute(ScopedAttribute.UNSET, attr.local, attr.scope, attr)
+            attr.__set_name__(cls, name)
+            super().__setattr__(name, attr)
+        attr.set(value)
+
+
+class FuncNode(metaclass=ContextMeta):
+    text: str = ScopedAttribute('', local=True)
+    stack: list = ScopedAttribute([], local=True)
+    ref: 'FuncNode' = ScopedAttribute(None, local=True)
 
     def __init__(self, func_name: str, open: int):
         self.func_name: str =  func_name
@@ -120,16 +522,178 @@ class FuncNode:
         return cls.stack
 
 
-class DQL_Object:
-    ALIAS_FUNC = None
+class ClauseNode:
+    """
+    Typed element of a clause (an item of `values[key]`).
+    Each text is parsed once -- see `ClauseNode.parse` --
+    and the node is shared by all queries that contain it.
+    """
+    __slots__ = ('text', 'named', 'keys', 'prefixes')
+    REGEX_NAMED = re.compile(r'(?:\s+as\s+|\s+AS\s+)(\S*)')
+    REGEX_PREFIX = re.compile(r'(\w+)[.]')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.named = tuple( self.REGEX_NAMED.findall(text) )
+        self.keys = {}
+        self.prefixes = None
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(
+            self.__class__.__name__, ', '.join(
+                f'{name}={getattr(self, name)!r}'
+                for name in self.__slots__
+            )
+        )
+
+    def is_named(self, name: str='') -> bool:
+        """Same as DQL_Object.is_named_field"""
+        return any(word.startswith(name) for word in self.named)
+
+    def elements(self, key: str, exact: bool) -> frozenset:
+        """
+        The parts of the text compared by `diff`
+        (see DQL_Object.field_set)
+        """
+        if exact not in self.keys:
+            self.keys[exact] = frozenset( DQL_Object.text_elements(self.text, key, exact) )
+        return self.keys[exact]
+
+    def has_prefix(self, alias: str) -> bool:
+        """Is some field of the text qualified by `alias.`?"""
+        if self.prefixes is None:
+            self.prefixes = frozenset( self.REGEX_PREFIX.findall(self.text) )
+        return alias in self.prefixes
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def parse(key: str, text: str) -> 'ClauseNode':
+        node_class = CLAUSE_NODES.get(key, ClauseNode)
+        if node_class is Column and FunctionCall.REGEX.match(text):
+            node_class = FunctionCall
+        return node_class(text)
+
+
+class Column(ClauseNode):
+    """`table.name AS alias` in SELECT or GROUP BY"""
+    __slots__ = ('table', 'name', 'alias')
+    REGEX = re.compile(r'^\s*(?:(\w+)[.])?(\w+|[*])(?:\s+(?:as|AS)\s+(\w+))?\s*$')
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        found = self.REGEX.match(text)
+        if found:
+            self.table, self.name, self.alias = [s or '' for s in found.groups()]
+        else:
+            self.table, self.name = '', text.strip()
+            self.alias = self.named[-1] if self.named else ''
+
+
+class FunctionCall(ClauseNode):
+    """`Func(param1, param2) AS alias` in SELECT"""
+    __slots__ = ('func_name', 'params', 'alias')
+    REGEX = re.compile(r'^\s*(\w+)[(](.*)[)](?:\s+(?:as|AS)\s+(\w+))?\s*$', re.DOTALL)
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.func_name, params, alias = self.REGEX.match(text).groups()
+        self.params = tuple(self.split_params(params))
+        self.alias = alias or ''
+
+    @staticmethod
+    def split_params(text: str) -> list:
+        result, level, start = [], 0, 0
+        quote = ''
+        for pos, char in enumerate(text):
+            if quote:
+                if char == quote:
+                    quote = ''
+            elif char in '\'"':
+                quote = char
+            elif char == '(':
+                level += 1
+            elif char == ')':
+                level -= 1
+            elif char == ',' and level == 0:
+                result.append( text[start:pos].strip() )
+                start = pos + 1
+        last = text[start:].strip()
+        if last or result:
+            result.append(last)
+        return result
+
+
+class Predicate(ClauseNode):
+    """`[NOT] field operator value` in WHERE"""
+    __slots__ = ('negated', 'field', 'operator', 'value')
+    REGEX = re.compile(
+        r'^\s*(NOT\s+)?(.+?)\s*(<>|>=|<=|!=|=|>|<|\bLIKE\b|\bIN\b|\bIS\b|\bBETWEEN\b)\s*(.*?)\s*$',
+        re.IGNORECASE | re.DOTALL
+    )
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        found = self.REGEX.match(text)
+        if found:
+            negated, self.field, operator, self.value = found.groups()
+            self.negated = bool(negated)
+            self.operator = operator.upper()
+        else:
+            self.negated, self.field = False, text.strip()
+            self.operator = self.value = ''
+
+
+class Join(ClauseNode):
+    """The main table or a `[type] JOIN table alias ON (...)` in FROM"""
+    __slots__ = ('join_type', 'table', 'alias', 'condition')
+    REGEX = re.compile(
+        r'^\s*(?:(\w+)\s+)?JOIN\s+(\S+)(?:\s+(\w+))?\s+ON\s+(.*?)\s*$',
+        re.IGNORECASE | re.DOTALL
+    )
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        found = self.REGEX.match(text)
+        if found:
+            join_type, self.table, alias, self.condition = found.groups()
+            self.join_type = (join_type or '').upper()
+            self.alias = alias or ''
+        else:
+            self.table, *alias = text.split() or ['']
+            self.alias = alias[-1] if alias else ''
+            self.join_type = self.condition = ''
+
+
+class SortKey(ClauseNode):
+    """`field [ASC|DESC]` in ORDER BY"""
+    __slots__ = ('field', 'descending')
+    REGEX = re.compile(r'^\s*(.*?)(?:\s+(ASC|DESC))?\s*$', re.IGNORECASE | re.DOTALL)
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.field, sort = self.REGEX.match(text).groups()
+        self.descending = (sort or '').upper() == 'DESC'
+
+
+CLAUSE_NODES = {
+    CMD_SELECT: Column, CMD_FROM: Join, CMD_WHERE: Predicate,
+    CMD_GROUP_BY: Column, CMD_ORDER_BY: SortKey,
+}
+
+
+class DQL_Object(metaclass=ContextMeta):
+    ALIAS_FUNC = ScopedAttribute(None)
     """    ^^^^^^^^^^^^^^^^^^^^^^^^
     You can change the behavior by assigning 
     a user function to DQL_Object.ALIAS_FUNC
     """
     FILE_PATH = ''
-    USE_CATALOG: bool = False
+    USE_CATALOG: bool = ScopedAttribute(False)
 
-    catalog = {}
+    catalog: Registry = ScopedAttribute(Registry(), scope=lambda catalog: Registry())
 
     def __init__(self, table_name: str=''):
         self.__alias = ''
@@ -137,6 +701,16 @@ class DQL_Object:
         self.key_field = ''
         self.set_table(table_name)
 
+    @property
+    def values(self) -> ValueMap:
+        return self.__values
+
+    @values.setter
+    def values(self, new_values: dict):
+        if not isinstance(new_values, ValueMap):
+            new_values = ValueMap(new_values)
+        self.__values = new_values
+
     @staticmethod
     def split_filename(file_name: str) -> list:
         found = re.findall(r'[\'"]*(.*[/])(\w+)([.]\w+)[\'"]*', file_name)
@@ -236,49 +810,131 @@ class DQL_Object:
         return re.search(fr'(\s+as\s+|\s+AS\s+){name}', fld)
 
     def has_named_field(self, name: str) -> bool:
-        return any(
-            self.is_named_field(fld, name)
-            for fld in self.values.get(CMD_SELECT, [])
-        )
+        return self.clause_index(CMD_SELECT).named[name] > 0
 
-    def diff(self, key: str, search_list: list, exact: bool=False) -> set:
-        def disassemble(source: list) -> list:
-            if not exact:
-                return source
-            result = []
-            for fld in source:
-                # result += re.split(r'([=()]|<>|\s+ON\s+|\s+on\s+)', fld)
-                result += re.split(r'([=()]|<>|\bon\b)', fld, re.IGNORECASE)
-            return result
+    def clause_index(self, key: str) -> ClauseIndex:
+        values = self.values.get(key)
+        if values is None:
+            return ClauseIndex(key)
+        return values.clause_index()
+
+    def nodes(self, key: str) -> list[ClauseNode]:
+        """
+        Typed view of `values[key]` (see ClauseNode),
+        kept until the values are changed.
+        """
+        memo = self.values.memo
+        ref = ('nodes', key)
+        if ref not in memo:
+            if KEYWORD.get(key, ' ')[0].startswith(','):
+                # --- Select.parse may keep `a, Func(b) AS c` as one item:
+                split = FunctionCall.split_params
+            else:
+                split = lambda text: [text]
+            memo[ref] = [
+                ClauseNode.parse(key, item)
+                for text in self.values.get(key, [])
+                for item in split(text) if item
+            ]
+        return memo[ref]
+
+    @classmethod
+    def text_elements(cls, text: str, key: str, exact: bool=False) -> list:
+        """
+        The elements of one item of a clause (see `field_set`).
+        """
         def cleanup(text: str) -> str:
             # if re.search(r'^CASE\b', text):
-            if self.contains_CASE_statement(text):
+            if cls.contains_CASE_statement(text):
                 return text
             text = re.sub(r'[\n\t]', ' ', text)
             if exact:
                 text = text.lower()
             return text.strip()
-        def field_set(source: list) -> set:
-            return set(
-                (
-                    fld 
-                    if key == CMD_SELECT and self.is_named_field(fld, '') 
-                    else
-                    re.sub(pattern, '', cleanup(fld))
-                )
-                for string in disassemble(source)
-                for fld in self.split_fields(string, key)
-            )       
+        if exact:
+            # source = re.split(r'([=()]|<>|\s+ON\s+|\s+on\s+)', text)
+            source = re.split(r'([=()]|<>|\bon\b)', text, re.IGNORECASE)
+        else:
+            source = [text]
         pattern = KEYWORD[key][1] 
         if exact:
             if key == CMD_WHERE:
                 pattern = r'["\']| '
             pattern += f'|{PATTERN_PREFIX}'
-        s1 = field_set(search_list)
-        s2 = field_set(self.values.get(key, []))
+        return [
+            (
+                fld 
+                if key == CMD_SELECT and cls.is_named_field(fld, '') 
+                else
+                re.sub(pattern, '', cleanup(fld))
+            )
+            for string in source
+            for fld in cls.split_fields(string, key)
+        ]
+
+    def field_set(self, key: str, source: list, exact: bool=False) -> set:
+        """
+        The elements of a clause as they are compared by `diff`.
+        """
+        return set().union(*(
+            ClauseNode.parse(key, text).elements(key, exact)
+            for text in source
+        ))
+
+    def normalized(self, key: str, exact: bool=True) -> set:
+        """
+        Same as `field_set` for the own values,
+        kept until the values are changed.
+        """
+        memo = self.values.memo
+        ref = ('normalized', key, exact)
+        if ref not in memo:
+            memo[ref] = self.field_set(key, self.values.get(key, []), exact)
+        return memo[ref]
+
+    def diff(self, key: str, search_list: list, exact: bool=False) -> set:
+        s1 = self.field_set(key, search_list, exact)
         if exact:
-            return s1.symmetric_difference(s2)
-        return s1 - s2
+            return s1.symmetric_difference( self.normalized(key, exact) )
+        elements = self.clause_index(key).elements
+        return {element for element in s1 if element not in elements}
+
+    def conditions_without_literals(self, params: list) -> dict:
+        """
+        WHERE and HAVING conditions with a PARAM_MARK
+        in the place of each literal (see `to_params`).
+        """
+        groups = []
+        for group in self.values.get(CMD_GROUP_BY, []):
+            group, *having = re.split(r'(\s+HAVING\s+)', group, maxsplit=1)
+            groups.append( group + extract_params(''.join(having), params) )
+        return {
+            CMD_WHERE: [
+                extract_params(condition, params)
+                for condition in self.values.get(CMD_WHERE, [])
+            ],
+            CMD_GROUP_BY: groups,
+        }
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the query shape: the same for queries that differ
+        only by the literals of conditions or the order of the items.
+        Note: `==` ignores quotes, but here `t.name = 'x'` (a literal)
+        and `t.name = x` (a name) are different shapes.
+        """
+        memo = self.values.memo
+        if 'fingerprint' not in memo:
+            shape = self.conditions_without_literals([])
+            text = '\n'.join(
+                '{}:{}'.format(key, '|'.join(sorted(
+                    self.field_set(key, shape[key], True)
+                    if key in shape else self.normalized(key)
+                )))
+                for key in KEYWORD
+            )
+            memo['fingerprint'] = blake2b(text.encode(), digest_size=16).hexdigest()
+        return memo['fingerprint']
 
     def increment_alias(self) -> str:
         name, value = re.findall(r'([A-Za-z]+)(\d+)*', self.alias)[0]
@@ -320,6 +976,7 @@ class Field:
         def is_const() -> bool:
             return any([
                 re.findall('[.()0-9]', name),
+                name.startswith("'"),
                 name in SQL_CONSTS,
                 re.findall(r'\w+\s*[+-]\s*\w+', name)
             ])
@@ -408,38 +1065,6 @@ SQL_TYPES = 'CHAR INT DATE FLOAT ANY'.split()
 CHAR, INT, DATE, FLOAT, ANY  =  SQL_TYPES
 
 
-class DialectLanguage:
-    dialect: Dialect = Dialect.ANSI
-
-    def __init__(self, target: 'Select'):
-        self.target = target
-
-    def convert(self) -> str:
-        Function.dialect = self.dialect
-        script = str(self.target)
-        for func_name in re.findall(r"(\w+)[(]", script):
-            found = Function.find(func_name)
-            if found:
-                script = script.replace( f"{func_name}(", found.name()+'(' )
-                break
-        return script
-
-class OracleLanguage(DialectLanguage):
-    dialect = Dialect.ORACLE
-
-class PostgreLanguage(DialectLanguage):
-    dialect = Dialect.POSTGRESQL
-
-class SqlServerLanguage(DialectLanguage):
-    dialect = Dialect.SQL_SERVER
-
-class MySqlLanguage(DialectLanguage):
-    dialect = Dialect.MYSQL
-
-class BigQueryLanguage(DialectLanguage):
-    dialect = Dialect.BIGQUERY
-
-
 class Position(Enum):
     StartsWith = -1
     Middle = 0
@@ -497,8 +1122,91 @@ class Condition:
         return cls(f'{keyword} ({values})')
 
 
-class Function(Code, Condition):
-    dialect = Dialect.ANSI
+class FunctionRegistry:
+    """
+    The Function classes and their names in each dialect.
+    Built on the first use and discarded whenever
+    a Function subclass is declared or unregistered.
+    """
+    lock = Lock()
+    removed = WeakSet()
+    classes: dict = {}
+    members: set = None
+    names: dict = {}
+    by_name: dict = {}
+    spelled: dict = {}
+
+    @classmethod
+    def invalidate(cls):
+        with cls.lock:
+            cls.classes, cls.names, cls.by_name, cls.spelled = {}, {}, {}, {}
+            cls.members = None
+
+    @classmethod
+    def unregister(cls, func_class: type):
+        """
+        Hides `func_class` (and its subclasses) from the registry:
+        Python keeps the subclasses of a class until they are collected.
+        """
+        cls.removed.add(func_class)
+        cls.invalidate()
+
+    @classmethod
+    def descendants(cls, base: type, func_type: str='') -> list:
+        key = (base, func_type)
+        found = cls.classes.get(key)
+        if found is None:
+            found = []
+            for sub in base.__subclasses__():
+                if sub in cls.removed or (func_type and sub.output != func_type):
+                    continue
+                found.append(sub)
+                found += cls.descendants(sub)
+            cls.classes[key] = found
+        return found
+
+    @classmethod
+    def is_function(cls, obj) -> bool:
+        if cls.members is None:
+            cls.members = set( cls.descendants(Function) )
+        return isinstance(obj, type) and obj in cls.members
+
+    @classmethod
+    def name(cls, func_class: type, dialect: Dialect) -> str:
+        key = (func_class, dialect)
+        found = cls.names.get(key)
+        if found is None:
+            found = cls.names[key] = func_class.dialect_name(dialect)
+        return found
+
+    @classmethod
+    def find(cls, search: str, dialect: Dialect) -> type:
+        names = cls.by_name.get(dialect)
+        if names is None:
+            names = {}
+            for func_class in cls.descendants(Function):
+                for name in [*func_class.alternative_names().values(), cls.name(func_class, dialect)]:
+                    names.setdefault(name.lower(), func_class)
+            cls.by_name[dialect] = names
+        return names.get( search.lower() )
+
+    @classmethod
+    def spelled_as(cls, search: str, dialect: Dialect) -> type:
+        """
+        The function whose name in the dialect is exactly `search`
+        (no alternative names and case-sensitive).
+        """
+        names = cls.spelled.get(dialect)
+        if names is None:
+            names = {}
+            for func_class in cls.descendants(Function):
+                names.setdefault(cls.name(func_class, dialect), func_class)
+            cls.spelled[dialect] = names
+        return names.get(search)
+
+
+class Function(Code, Condition, metaclass=ContextMeta):
+    dialect: Dialect = ScopedAttribute(Dialect.ANSI)
     inputs = None
     output = None
     separator = ', '
@@ -509,7 +1217,7 @@ class Function(Code, Condition):
     def __init__(self, *params: list):
         # ----------------------------------------
         def set_func_types(param):
-            if param in Function.descendants():
+            if FunctionRegistry.is_function(param):
                 class_type = param
                 param = class_type()
             if self.auto_convert and isinstance(param, Function):
@@ -532,14 +1240,26 @@ class Function(Code, Condition):
     def new_condition(cls, operator: str, value):
         return Where( f"{operator} {value}", function=cls() )
 
+    def __init_subclass__(cls, **args):
+        super().__init_subclass__(**args)
+        FunctionRegistry.invalidate()
+
+    @classmethod
+    def name(cls, dialect: Dialect=None) -> str:
+        return FunctionRegistry.name(cls, dialect or cls.dialect)
+
     @classmethod
-    def name(cls) -> str:
-        return cls.alternative_names().get(cls.dialect,  cls.__name__)
+    def dialect_name(cls, dialect: Dialect) -> str:
+        """
+        Override this method (instead of `name`)
+        when the name depends on the dialect.
+        """
+        return cls.alternative_names().get(dialect,  cls.__name__)
     
     @classmethod
     def match(cls, func_name: str, filter: Dialect=None) -> bool:
         source: dict = cls.alternative_names()
-        source |= {filter: cls.name()}
+        source |= {filter: cls.name(filter)}
         for dialect, name in source.items():
             if filter and filter != dialect:
                 continue
@@ -548,7 +1268,10 @@ class Function(Code, Condition):
         return False
     
     @classmethod
-    def find(cls, search: str) -> type:
+    def find(cls, search: str, dialect: Dialect=None) -> type:
+        found = FunctionRegistry.find(search, dialect or Function.dialect)
+        if cls is Function or (found and issubclass(found, cls)):
+            return found
         for class_type in cls.descendants():
             if class_type.match(search):
                 return class_type
@@ -556,13 +1279,7 @@ class Function(Code, Condition):
 
     @classmethod
     def descendants(cls, func_type: str='') -> list:
-        result = []
-        for sub in cls.__subclasses__():
-            if func_type and sub.output != func_type:
-                continue
-            result.append(sub)
-            result += sub.descendants()
-        return result
+        return list( FunctionRegistry.descendants(cls, func_type) )
     
     @classmethod
     def alternative_names(cls) -> dict:
@@ -654,7 +1371,7 @@ class EDA(Code):
     def add(self, name: str, main: DQL_Object):
         function: Function = None
         for alias, function in self.func_list.items():
-            if function not in Function.descendants():
+            if not FunctionRegistry.is_function(function):
                 raise ValueError(f'{function.__name__} is not a function.')
             function().As(alias).add(name, main)
 
@@ -703,10 +1420,10 @@ class Re(Function):
         }
     
     @classmethod
-    def name(cls) -> str:
-        if cls.dialect != Dialect.POSTGRESQL:
+    def dialect_name(cls, dialect: Dialect) -> str:
+        if dialect != Dialect.POSTGRESQL:
             return 'Regexp_Substr' # When the class name is no the same as the SQL function.
-        return super().name()
+        return super().dialect_name(dialect)
  
     @classmethod
     def number_before(cls, string: str, start: int=None, end:int=None):
@@ -828,8 +1545,8 @@ class Current_Date(Function):
 # --------------------------------------------------------
 
 
-class Frame:
-    break_lines: bool = True
+class Frame(metaclass=ContextMeta):
+    break_lines: bool = ScopedAttribute(True)
 
     def over(self, **args):
         """
@@ -1132,8 +1849,10 @@ class PrimaryKey:
         main.key_field = name
 
 
-class ForeignKey:
-    references = {}
+class ForeignKey(metaclass=ContextMeta):
+    references: Registry = ScopedAttribute(
+        Registry(), scope=lambda references: ChainMap(Registry(), references)
+    )
 
     def __init__(self, table_name: str):
         self.table_name = table_name
@@ -1167,9 +1886,82 @@ def quoted(value) -> str:
     return str(value)
 
 
-class Where(Condition):
+class ParamStyle(Enum):
+    """
+    Placeholder styles of PEP 249 (paramstyle).
+    """
+    QMARK = 'qmark'
+    NAMED = 'named'
+    FORMAT = 'format'
+    NUMERIC = 'numeric'
+
+    def placeholder(self, pos: int) -> str:
+        return {
+            ParamStyle.QMARK: '?',
+            ParamStyle.NAMED: ':p{}',
+            ParamStyle.FORMAT: '%s',
+            ParamStyle.NUMERIC: ':{}',
+        }[self].format(pos)
+
+    def bind(self, text: str, values: list) -> tuple:
+        """
+        Replaces each PARAM_MARK of `text` by a placeholder.
+        """
+        if self == ParamStyle.FORMAT:
+            text = text.replace('%', '%%')
+        pieces = text.split(PARAM_MARK)
+        result = pieces[0]
+        for pos, piece in enumerate(pieces[1:], 1):
+            result += self.placeholder(pos) + piece
+        if self == ParamStyle.NAMED:
+            return result, {f'p{pos}': value for pos, value in enumerate(values, 1)}
+        return result, list(values)
+
+
+PARAM_MARK = '\x00'
+REGEX_LITERAL = re.compile(
+    r"'((?:[^']|'')*)'|(?<![\w.])(\d+(?:[.]\d+)?)(?![\w.])"
+    r"|(\bROWNUM\s*(?:<=|>=|<>|<|>|=)\s*\d+)|\b(\w+)\s*[(]|([()])",
+    re.IGNORECASE
+)
+# --- words before a parenthesis that is not a function call:
+NOT_A_FUNCTION = {
+    'AND', 'OR', 'NOT', 'IN', 'EXISTS', 'ANY', 'ALL', 'SOME', 'ON', 'USING',
+    'WHERE', 'HAVING', 'SELECT', 'VALUES', 'WHEN', 'THEN', 'ELSE', 'AS', 'IS',
+}
+
+def extract_params(text: str, values: list) -> str:
+    """
+    Moves the literals of `text` to `values`,
+    leaving a PARAM_MARK in the place of each one.
+    The arguments of functions -- Round(x, 2) -- and
+    the row limit of Oracle (ROWNUM <= 10) are kept.
+    """
+    calls = []  # --- one for each open parenthesis: is it a function call?
+    def to_param(found) -> str:
+        string, number, rownum, name, parenthesis = found.groups()
+        if name is not None:
+            calls.append( name.upper() not in NOT_A_FUNCTION )
+            return found.group()
+        if parenthesis == '(':
+            calls.append(False)
+        elif parenthesis and calls:
+            calls.pop()
+        if parenthesis or rownum or any(calls):
+            return found.group()
+        if string is not None:
+            values.append( string.replace("''", "'") )
+        elif '.' in number:
+            values.append( float(number) )
+        else:
+            values.append( int(number) )
+        return PARAM_MARK
+    return REGEX_LITERAL.sub(to_param, text)
+
+
+class Where(Condition, metaclass=ContextMeta):
     prefix = ''
-    quoted_result: bool = True
+    quoted_result: bool = ScopedAttribute(True)
 
     def __init__(self, content: str, function: Function=None):
         self.content = content
@@ -1227,7 +2019,7 @@ class Where(Condition):
             main = main.owner
         # -----------------------------
         schema: Schema = Parser.public_schema
-        if schema:
+        if schema and main:
             field, *rest = re.split(r'([<=>])', name)
             field = re.findall(r'\w+$', field.strip())[0]
             name = name.replace(
@@ -1273,9 +2065,9 @@ class Not(Where):
         return Where.new_condition('<>',value)
 
 
-class Case:
-    break_lines = True
-    quoted_result: bool = True
+class Case(metaclass=ContextMeta):
+    break_lines: bool = ScopedAttribute(True, local=True)
+    quoted_result: bool = ScopedAttribute(True, local=True)
 
     def __init__(self, field: str):
         self.__conditions = {}
@@ -1369,12 +2161,22 @@ class Case:
         expr = re.sub(r'\s+', ' ', expr)
         tokens = [t for t in re.split(f'({REGEX})', expr) if t.strip()]
         last_word = ''
-        while tokens:
-            word = tokens.pop(0)
+        level, start = 0, None
+        for pos, word in enumerate(tokens):
+            if word == 'CASE':
+                if not level:
+                    start = (pos, len(result))
+                level += 1
+            elif word == 'END':
+                level -= 1
             if last_word in KEYWORDS:
                 try:
                     block = KEYWORDS[last_word](word)
                 except:
+                    # --- Keeps the CASE that could not be read (e.g. nested) as text:
+                    pos, size = start or (pos, len(result))
+                    del result[size:]
+                    result.append( ' '.join(t.strip() for t in tokens[pos:]) )
                     break
                 result += block.fields
                 block.fields = []
@@ -1586,8 +2388,8 @@ class DescOrderBy:
         return f"{CMD_ORDER_BY} {field} DESC"
 
 
-class OrderBy(Clause):
-    sort: SortType = SortType.ASC
+class OrderBy(Clause, metaclass=ContextMeta):
+    sort: SortType = ScopedAttribute(SortType.ASC)
     DESC = DescOrderBy
 
     @classmethod
@@ -1614,9 +2416,9 @@ class OrderBy(Clause):
     def cls_to_str(cls, field: str='') -> str:
         return f"{CMD_ORDER_BY} {field}{cls.sort.value}"
 
-class Partition:
-    params = None
-    content = None
+class Partition(metaclass=ContextMeta):
+    params: dict = ScopedAttribute(None, local=True)
+    content = ScopedAttribute(None, local=True)
 
     @classmethod
     def cls_to_str(cls, field: str) -> str:
@@ -1644,7 +2446,7 @@ class GroupBy(Clause):
         func: Function = None
         fields = []
         for alias, obj in self.args.items():
-            if isinstance(obj, type) and obj in Function.descendants():
+            if FunctionRegistry.is_function(obj):
                 func: Function = obj
                 name = func().format(name, main)
                 NamedField(alias).add(name, main)
@@ -1668,8 +2470,8 @@ class GroupBy(Clause):
         cls().__add(name, main)
 
 
-class Compare:
-    on_sub_query: callable = None
+class Compare(metaclass=ContextMeta):
+    on_sub_query: callable = ScopedAttribute(None, local=True)
 
     def __init__(self, function: Function, condition: Where, groupby: str=''):
         self.function = function
@@ -1778,6 +2580,8 @@ class QueryLanguage:
 
     def sort_by(self, values: list) -> str:
         is_ascending = OrderBy.ascending(values[-1]) if values else False
+        if is_ascending and re.search(r'\bASC\s*$', values[-1], re.IGNORECASE):
+            is_ascending = False  # --- explicit direction
         if OrderBy.sort == SortType.DESC and is_ascending:
             values[-1] += ' DESC'
         return self.join_with_tabs(values, ',')
@@ -1824,39 +2628,168 @@ class QueryLanguage:
             self.result[ref] = self.prefix(key) + text
         return self.pattern.format(**self.result).strip()
 
-class MongoDBLanguage(QueryLanguage):
-    pattern = '{_from}.{function}({where}{select}{group_by}){order_by}'
-    has_default = {key: False for key in KEYWORD}
-    LOGICAL_OP_TO_MONGO_FUNC = {
-        '>': '$gt',  '>=': '$gte',
-        '<': '$lt',  '<=': '$lte',
-        '=': '$eq',  '<>': '$ne', 
-        'like': '$regex', 'LIKE': '$regex',
-    }
-    OPERATORS = '|'.join(op for op in LOGICAL_OP_TO_MONGO_FUNC)
-    REGEX = {
-        'options': re.compile(r'\s+or\s+|\s+OR\s+'),
-        'condition': re.compile(fr'({OPERATORS})')
-    }
+class DialectLanguage(QueryLanguage):
+    """
+    Renders the query for a database in a single pass:
+    the names of all functions, the row limit (LIMIT, TOP,
+    FETCH or ROWNUM) and the date literals compared with
+    DATE fields of `Parser.public_schema` are rewritten
+    without changing `Function.dialect` or the query.
+    """
+    dialect: Dialect = Dialect.ANSI
+    LIMIT_FORMAT = ('LIMIT{tab}{rows}', 'LIMIT{tab}{rows} OFFSET {offset}')
+    DATE_TYPES: tuple = ()  # --- prefixes of date and timestamp literals
+    REGEX_TOKEN = re.compile(
+        r"(\b(?:DATE|TIMESTAMP|DATETIME)\s+'[^']*')"
+        r"|(?:\b([\w.]+)(\s*(?:=|<>|!=|<=|>=|<|>|\bBETWEEN\b)\s*))"
+        r"('(?:[^']|'')*')(?:(\s+AND\s+)('(?:[^']|'')*'))?"
+        r"|('(?:[^']|'')*')|\b(\w+)[(]",
+        re.IGNORECASE
+    )
+    REGEX_DATE = re.compile(r"^'\d{4}-\d{2}-\d{2}( \d{2}:\d{2}(:\d{2})?)?'$")
+    REGEX_LIMIT = re.compile(r'^\s*(\d+)(?:\s+OFFSET\s+(\d+))?\s*$', re.IGNORECASE)
+    REGEX_TOP = re.compile(r'^\s*(?:SELECT\s+)?TOP\s*[(]?\s*(\d+)\s*[)]?\s*', re.IGNORECASE)
+    REGEX_ROWNUM = re.compile(r'^\s*ROWNUM\s*(<=|<)\s*(\d+)\s*$', re.IGNORECASE)
 
-    def join_with_tabs(self, values: list, sep: str=',') -> str:
-        def format_field(fld):
-            return '{indent}{fld}'.format(
-                fld=self.remove_alias(fld),
-                indent=self.TABULATION
-            )
-        return '{begin}{content}{line_break}{end}'.format(
-            begin='{',
-            content= sep.join(
-                format_field(fld) for fld in values if fld
-            ),
-            end='}', line_break=self.LINE_BREAK,
-        )
+    def __init__(self, target: 'Select'):
+        target = target.copy()
+        self.rows, self.offset = self.extract_limit(target.values)
+        self.head = target.with_block() if isinstance(target, CTE) else ''
+        schema: Schema = Parser.public_schema
+        self.date_fields = schema.date_fields() if schema and self.DATE_TYPES else set()
+        super().__init__(target)
 
-    def add_field(self, values: list) -> str:
-        if self.result['function'] == 'aggregate':
-            return ''
-        return ',{content}'.format(
+    @classmethod
+    def extract_limit(cls, values: ValueMap) -> tuple:
+        """
+        Removes the row limit from the values,
+        whatever the dialect it was written for.
+        """
+        rows, offset = None, 0
+        found = cls.REGEX_LIMIT.match( ' '.join(values.get(CMD_LIMIT, [])) )
+        if found:
+            rows, offset = int(found.group(1)), int(found.group(2) or 0)
+            del values[CMD_LIMIT]
+        fields = values.get(CMD_SELECT, [])
+        found = cls.REGEX_TOP.match(fields[0]) if fields else None
+        if found:
+            rows = int(found.group(1))
+            fields[0] = fields[0][found.end():] or '*'
+        conditions = []
+        for condition in values.get(CMD_WHERE, []):
+            found = cls.REGEX_ROWNUM.match(condition)
+            if not found:
+                conditions.append(condition)
+                continue
+            operator, count = found.groups()
+            rows = int(count) - (operator == '<')
+        if CMD_WHERE in values and len(conditions) < len(values[CMD_WHERE]):
+            values[CMD_WHERE] = conditions
+        return rows, offset
+
+    def date_literal(self, literal: str) -> str:
+        date = self.REGEX_DATE.match(literal)
+        if not date:
+            return literal
+        return '{} {}'.format(self.DATE_TYPES[bool(date.group(1))], literal)
+
+    def rewrite(self, found: re.Match) -> str:
+        typed, field, operator, first, sep, last, literal, func_name = found.groups()
+        if typed or literal:
+            return typed or literal
+        if field:
+            text = found.group()
+            if field.split('.')[-1].lower() not in self.date_fields:
+                return text
+            return field + operator + self.date_literal(first) + (
+                sep + self.date_literal(last) if sep else ''
+            )
+        func_class = FunctionRegistry.spelled_as(func_name, Dialect.ANSI)
+        if func_class:
+            func_name = func_class.name(self.dialect)
+        return func_name + '('
+
+    def limit_clause(self) -> str:
+        pattern = self.LIMIT_FORMAT[bool(self.offset)]
+        if self.rows is None or not pattern:
+            return ''
+        return self.LINE_BREAK + pattern.format(
+            rows=self.rows, offset=self.offset, tab=self.TABULATION
+        )
+
+    def convert(self) -> str:
+        script = self.head
+        if not script or self.target.show_query:
+            script += super().convert() + self.limit_clause()
+        return self.REGEX_TOKEN.sub(self.rewrite, script)
+
+
+class OracleLanguage(DialectLanguage):
+    dialect = Dialect.ORACLE
+    LIMIT_FORMAT = ('FETCH FIRST {rows} ROWS ONLY', 'OFFSET {offset} ROWS FETCH NEXT {rows} ROWS ONLY')
+    DATE_TYPES = ('DATE', 'TIMESTAMP')
+
+class PostgreLanguage(DialectLanguage):
+    dialect = Dialect.POSTGRESQL
+    DATE_TYPES = ('DATE', 'TIMESTAMP')
+
+class SqlServerLanguage(DialectLanguage):
+    dialect = Dialect.SQL_SERVER
+    LIMIT_FORMAT = ('', 'OFFSET {offset} ROWS FETCH NEXT {rows} ROWS ONLY')
+
+    def add_field(self, values: list) -> str:
+        result = super().add_field(values)
+        if self.rows is not None and not self.offset:
+            return f'TOP({self.rows}) {result}'
+        return result
+
+    def limit_clause(self) -> str:
+        result = super().limit_clause()
+        if result and not self.target.values.get(CMD_ORDER_BY):
+            result = self.prefix(CMD_ORDER_BY) + '(SELECT NULL)' + result
+        return result
+
+class MySqlLanguage(DialectLanguage):
+    dialect = Dialect.MYSQL
+
+class BigQueryLanguage(DialectLanguage):
+    dialect = Dialect.BIGQUERY
+    DATE_TYPES = ('DATE', 'DATETIME')
+
+
+class MongoDBLanguage(QueryLanguage):
+    pattern = '{_from}.{function}({where}{select}{group_by}){order_by}'
+    has_default = {key: False for key in KEYWORD}
+    LOGICAL_OP_TO_MONGO_FUNC = {
+        '>': '$gt',  '>=': '$gte',
+        '<': '$lt',  '<=': '$lte',
+        '=': '$eq',  '<>': '$ne', 
+        'like': '$regex', 'LIKE': '$regex',
+    }
+    OPERATORS = '|'.join(op for op in LOGICAL_OP_TO_MONGO_FUNC)
+    REGEX = {
+        'options': re.compile(r'\s+or\s+|\s+OR\s+'),
+        'condition': re.compile(fr'({OPERATORS})')
+    }
+
+    def join_with_tabs(self, values: list, sep: str=',') -> str:
+        def format_field(fld):
+            return '{indent}{fld}'.format(
+                fld=self.remove_alias(fld),
+                indent=self.TABULATION
+            )
+        return '{begin}{content}{line_break}{end}'.format(
+            begin='{',
+            content= sep.join(
+                format_field(fld) for fld in values if fld
+            ),
+            end='}', line_break=self.LINE_BREAK,
+        )
+
+    def add_field(self, values: list) -> str:
+        if self.result['function'] == 'aggregate':
+            return ''
+        return ',{content}'.format(
             content=self.join_with_tabs([f'{fld}: 1' for fld in values]),
         )
 
@@ -2014,6 +2947,16 @@ class DataAnalysisLanguage(QueryLanguage):
                 common_fields.append(field)
         return common_fields
 
+    def aggregated_columns(self, common_fields: list) -> list:
+        """The columns read by the aggregate functions, missing from the selection"""
+        result = []
+        for field in self.aggregation_fields:
+            for column in re.findall(r'[(]\s*([\w.]+)\s*[)]', field):
+                column = self.remove_alias(column)
+                if column not in common_fields + result:
+                    result.append(column)
+        return result
+
     def split_condition_elements(self, expr: str) -> list:
         expr = self.remove_alias( re.sub('[()]', '', expr) )
         func = lambda token: re.split(r'([%])', token)
@@ -2052,14 +2995,18 @@ class FileExtension(Enum):
     JSON = '.json'
     HTML = '.html'
     DB   = '.db'
+    PARQUET = '.parquet'
 
-    def function(self) -> str:
+    def function(self, lazy: bool=False) -> str:
+        if lazy and self in (FileExtension.CSV, FileExtension.PARQUET):
+            return 'scan_' + self.name.lower()
         return {
             FileExtension.CSV:  'read_csv',
             FileExtension.XLSX: 'read_excel',
             FileExtension.JSON: 'read_json',
             FileExtension.HTML: 'read_html',
             FileExtension.DB:   'scan_sqlite',
+            FileExtension.PARQUET: 'read_parquet',
         }[self]
 
 
@@ -2099,6 +3046,7 @@ class PandasLanguage(DataAnalysisLanguage):
             FuncNode.create(','.join(common_fields))
             common_fields = [node2pandas_func(node) for node in FuncNode.stack]
         if common_fields:
+            common_fields += self.aggregated_columns(common_fields)
             return self.FIELD_LIST_FMT.format(
                 ','.join(
                     line_field_fmt(fld) for fld in common_fields
@@ -2186,10 +3134,9 @@ class PandasLanguage(DataAnalysisLanguage):
         )
     
     def clean_values(self, values: list) -> str:
-        for i in range(len(values)):
-            content = self.remove_alias(values[i])
-            values[i] = f"'{content}'"
-        return ','.join(values)
+        return ','.join(
+            "'{}'".format( self.remove_alias(value) ) for value in values
+        )
 
     def sort_by(self, values: list) -> str:
         if not values:
@@ -2213,18 +3160,20 @@ class PandasLanguage(DataAnalysisLanguage):
         if self.aggregation_fields:
             PANDAS_AGG_FUNC = {'AVG': 'mean', 'COUNT': 'size'}
             result += '.agg({'
-            agg_fields = []
+            agg_fields = {}
             for field in self.aggregation_fields:
                 for field in re.findall(r'[^,\s][^,]*?(?=\s*,|\s*$)', field):
                     FuncNode.create(field)
                     if FuncNode.stack:
                         node:FuncNode = FuncNode.stack[0]
                         func  = node.func_name
-                        field = node.field
-                        result += "{}'{}': ['{}']".format(
-                            self.TABULATION, field,
-                            PANDAS_AGG_FUNC.get(func.upper(), func)
+                        agg_fields.setdefault(node.field, []).append(
+                            PANDAS_AGG_FUNC.get(func.upper(), func.lower())
                         )
+            result += ','.join(
+                "{}'{}': {}".format(self.TABULATION, field, funcs)
+                for field, funcs in agg_fields.items()
+            )
             result += '\n})'
         return result
     
@@ -2244,7 +3193,8 @@ class PolarsLanguage(DataAnalysisLanguage):
     LIB_INITIALIZATION = ''
     FIELD_LIST_FMT = '.select({}{})'
     PREFIX_LIBRARY = 'pl.'
-    POLARS_FUNCTIONS = {'Avg': '.avg()', 'Count': '.count()', 'Sum': '.sum()', 'Year': '.dt.year()'}
+    lazy: bool = False
+    POLARS_FUNCTIONS = {'Avg': '.mean()', 'Count': '.count()', 'Sum': '.sum()', 'Year': '.dt.year()'}
 
     def line_field_fmt(self, field: str, func: str='') -> str:
         found = re.findall(r'(.*)\s+AS\s+(.*)', field, re.IGNORECASE)
@@ -2255,7 +3205,7 @@ class PolarsLanguage(DataAnalysisLanguage):
         else:
             alias = ''
         if func:
-            func = self.POLARS_FUNCTIONS.get(func, func)            
+            func = self.POLARS_FUNCTIONS.get(func, f'.{func.lower()}()')
         return "{}pl.col('{}'){}{}".format(
             self.TABULATION, field, func, alias
         )
@@ -2263,6 +3213,7 @@ class PolarsLanguage(DataAnalysisLanguage):
     def add_field(self, values: list) -> str:
         common_fields = self.split_agg_fields(values)
         if common_fields:
+            common_fields += self.aggregated_columns(common_fields)
             return self.FIELD_LIST_FMT.format(
                 ','.join(self.line_field_fmt(fld) for fld in common_fields),
                 self.LINE_BREAK
@@ -2281,13 +3232,17 @@ class PolarsLanguage(DataAnalysisLanguage):
             result += f'\n{self.LIB_INITIALIZATION}'
         self.names = {}
         suffix = ''
-        REGEX_JOIN = re.compile('JOIN|LEFT|RIGHT|ON', re.IGNORECASE)
+        REGEX_JOIN = re.compile(r'\b(?:JOIN|LEFT|RIGHT|ON)\b', re.IGNORECASE)
         for table in values:
             table, *join = [t.strip() for t in REGEX_JOIN.split(table) if t.strip()]
             alias, table = DQL_Object.split_alias(table)
-            result += "\ndf_{table} = {prefix}{func}('{table}.{ext}')".format(
-                prefix=self.PREFIX_LIBRARY, func=self.file_extension.value,
-                table=table, ext=self.file_extension.name.lower()
+            folder, table, extension = DQL_Object.split_filename(table)
+            file_extension = FileExtension( extension.lower() ) if extension else self.file_extension
+            func = file_extension.function(self.lazy)
+            result += "\ndf_{table} = {prefix}{func}('{folder}{table}{ext}'){to_lazy}".format(
+                prefix=self.PREFIX_LIBRARY, func=func, folder=folder,
+                table=table, ext=file_extension.value,
+                to_lazy='.lazy()' if self.lazy and not func.startswith('scan_') else ''
             )
             self.names[alias] = table
             if join:
@@ -2296,6 +3251,7 @@ class PolarsLanguage(DataAnalysisLanguage):
                 ], self.target.join_type.value.strip().lower() )
             last_table = table
         _, table = DQL_Object.split_alias(values[0])
+        table = DQL_Object.split_filename(table)[1]
         result += f'\ndf = df_{table}\n\ndf = df{suffix}'
         return result
     
@@ -2337,10 +3293,9 @@ class PolarsLanguage(DataAnalysisLanguage):
         )
     
     def clean_values(self, values: list) -> str:
-        for i in range(len(values)):
-            content = self.remove_alias(values[i])
-            values[i] = f"'{content}'"
-        return ','.join(values)
+        return ','.join(
+            "'{}'".format( self.remove_alias(value) ) for value in values
+        )
 
     def sort_by(self, values: list) -> str:
         if not values:
@@ -2360,9 +3315,10 @@ class PolarsLanguage(DataAnalysisLanguage):
         )
         if self.aggregation_fields:
             result += '.agg('
-            for field in self.aggregation_fields:
-                func, *rest = re.split('[()]', field)
-                result += self.line_field_fmt(' '.join(rest), func)
+            result += ','.join(
+                self.line_field_fmt(' '.join(rest).strip(), func)
+                for func, *rest in (re.split('[()]', field) for field in self.aggregation_fields)
+            )
             result += '\n)'
         return result
     
@@ -2374,6 +3330,19 @@ class PolarsLanguage(DataAnalysisLanguage):
         return ''
 
 
+class PolarsLazyLanguage(PolarsLanguage):
+    """
+    PolarsLanguage over LazyFrames (`pl.scan_csv`, `pl.scan_parquet`...):
+    filters, projections and joins are pushed down to the scans
+    and the result is collected by the streaming engine.
+    """
+    lazy = True
+    COLLECT = ".collect(engine='streaming')"
+
+    def convert(self) -> str:
+        return '{}\n\ndf = df{}'.format(super().convert(), self.COLLECT)
+
+
 class SparkLanguage(PandasLanguage):
     HEADER_IMPORT_LIB = [
         'from pyspark.sql import SparkSession',
@@ -2441,9 +3410,9 @@ class SparkLanguage(PandasLanguage):
         return result
 
 
-class Parser:
+class Parser(metaclass=ContextMeta):
     REGEX = {}
-    public_schema: 'Schema' = None
+    public_schema: 'Schema' = ScopedAttribute(None)
 
     def prepare(self):
         ...
@@ -2497,103 +3466,226 @@ class JoinType(Enum):
     FULL = 'FULL '
 
 
+class SQLLexer:
+    """
+    Splits a SQL script into tokens in a single pass.
+    Each token is a pair (kind, text); comments
+    are discarded and strings use single quotes.
+    """
+    REGEX = re.compile(r"""
+        (?P<comment>/[*][\s\S]*?[*]/|--[^\n]*(?:\n|$))
+        |(?P<string>'(?:[^']|'')*'|"[^"]*")
+        |(?P<space>\s+)
+        |(?P<open>[(])
+        |(?P<close>[)])
+        |(?P<word>\w+(?:[.]\w+)*)
+        |(?P<symbol>.)
+    """, re.VERBOSE)
+
+    def __init__(self, txt: str):
+        self.tokens = []
+        for found in self.REGEX.finditer(txt):
+            kind, text = found.lastgroup, found.group()
+            if kind == 'comment':
+                kind, text = 'space', ' '
+            elif kind == 'string' and text[0] == '"':
+                text = "'" + text[1:-1] + "'"
+            self.tokens.append( (kind, text) )
+
+
 class SQLParser(Parser):
     REGEX = {}
     SUB_QUERIES_AS_CONDITIONS = True
 
     def prepare(self):
-        keywords = '|'.join(k + r'\b' for k in KEYWORD)
         tbl_join = [fr"\b{expr}\b" for expr in ('JOIN','LEFT','RIGHT','ON')]
         flags = re.IGNORECASE + re.MULTILINE
-        self.REGEX['keywords'] = re.compile(f'({keywords})', flags)
-        self.REGEX['subquery'] = re.compile(r'(\w+[.])*\w+\s+in\s*[(]\s*SELECT\s+', flags)
         self.REGEX['tbl_join'] = re.compile(r"|".join(tbl_join), flags)
 
-    def eval(self, txt: str):
-        result, subqueries = {}, {}
-        # txt = re.sub(r'[\[\]]', '', txt.replace('"', "'"))
-        txt = txt.replace('"', "'")
-        txt = re.sub(r"\/\*.*\*\/", '', txt) # remove comments /* */
-        txt = re.sub(r'[-][-].*\n', '', txt) # remove comments --
-        # -----------------------------------------------------------------------
-        def find_last_word(pos: int) -> int:
-            SPACE, WORD = 1, 2
-            found = set()
-            for i in range(pos, 0, -1):
-                if txt[i] in [' ', '\t', '\n']:
-                    if sum(found) == 3:
-                        return i
-                    found.add(SPACE)
-                if txt[i].isalpha():
-                    found.add(WORD)
-                elif txt[i] == '.':
-                    found.remove(WORD)
-        def find_parenthesis(found) -> tuple:
-            start, end = found.span()
-            CHAR_VALUES = {
-                '(': +1,
-                ')': -1
-            }
-            remaining = 1
-            for i, char in enumerate(txt[end:]):
-                remaining += CHAR_VALUES.get(char, 0)
-                if char == ')' and not remaining:
-                    end += i
+    @staticmethod
+    def next_token(tokens: list, pos: int) -> int:
+        while pos < len(tokens) and tokens[pos][0] == 'space':
+            pos += 1
+        return pos
+
+    @staticmethod
+    def last_words(source: list, count: int) -> list:
+        """
+        Positions in `source` of the last `count` non-space texts.
+        """
+        result = []
+        for i in range(len(source)-1, -1, -1):
+            if len(result) == count:
+                break
+            if not source[i].isspace():
+                result.insert(0, i)
+        return result
+
+    def derived_table(self, tokens: list, pos: int, source: list) -> int:
+        """
+        `FROM (SELECT ...) AS name` is read as the table `name`
+        (as CTEFactory does). Returns the position after the name.
+        """
+        level = 0
+        while pos < len(tokens):
+            kind = tokens[pos][0]
+            level += {'open': 1, 'close': -1}.get(kind, 0)
+            pos += 1
+            if not level:
+                break
+        pos = self.next_token(tokens, pos)
+        if pos < len(tokens) and tokens[pos][1].upper() == 'AS':
+            pos = self.next_token(tokens, pos+1)
+        if pos < len(tokens) and tokens[pos][0] == 'word':
+            name = tokens[pos][1]
+            source.append(f'{name} {name}')
+            pos += 1
+        return pos
+
+    def split_clauses(self, tokens: list, pos: int=0) -> tuple:
+        """
+        Reads one query starting at `pos` until the end of the
+        tokens or the parenthesis that closes it. Subqueries
+        `field [NOT] IN (SELECT ...)` are read recursively.
+        Returns:  (clauses, subqueries, end position)
+        """
+        clauses, subqueries = {}, []
+        current: list = None
+        skip_and: bool = False
+        depth: int = 0
+        while pos < len(tokens):
+            kind, text = tokens[pos]
+            word = text.upper() if kind == 'word' else ''
+            if kind == 'close':
+                if not depth:
                     break
-            return start, end
-        def and_without_where() -> tuple:
-            found = re.search(r'\band\b', txt, re.IGNORECASE)
+                depth -= 1
+            elif kind == 'open' and current is not None:
+                nxt = self.next_token(tokens, pos+1)
+                found = self.last_words(current, 3)
+                is_subquery = (
+                    nxt < len(tokens) and tokens[nxt][1].upper() == 'SELECT'
+                    and len(found) > 1 and current[found[-1]].upper() == 'IN'
+                )
+                if is_subquery:
+                    negated = len(found) > 2 and current[found[-2]].upper() == 'NOT'
+                    field = current[found[0] if negated else found[-2]]
+                    del current[found[0] if negated else found[-2]:]
+                    found = self.last_words(current, 1)
+                    if found and current[found[0]].upper() == 'AND':
+                        del current[found[0]:]
+                    else:
+                        del current[found[0]+1 if found else 0:]
+                        skip_and = True
+                    inner = self.split_clauses(tokens, nxt)
+                    subqueries.append( (field, negated) + inner[:2] )
+                    pos = inner[-1] + 1
+                    continue
+                is_derived = (
+                    not depth and current is clauses.get(CMD_FROM)
+                    and nxt < len(tokens) and tokens[nxt][1].upper() == 'SELECT'
+                )
+                if is_derived:
+                    pos = self.derived_table(tokens, pos, current)
+                    continue
+                depth += 1
+            elif word and not depth:
+                if word in ('GROUP', 'ORDER'):
+                    nxt = self.next_token(tokens, pos+1)
+                    if nxt < len(tokens) and tokens[nxt][1].upper() == 'BY':
+                        word, pos = f'{word} BY', nxt
+                elif word == 'AND' and current is not None:
+                    if skip_and:
+                        skip_and = False
+                        pos = self.next_token(tokens, pos+1)
+                        continue
+                    if CMD_WHERE not in clauses and clauses.get(CMD_FROM) is current:
+                        word = CMD_WHERE # --- AND without WHERE
+                if word in KEYWORD:
+                    current = clauses[word] = []
+                    skip_and = False
+                    pos += 1
+                    continue
+            if current is not None:
+                current.append(text)
+            pos += 1
+        return clauses, subqueries, pos
+
+    def eval(self, txt: str):
+        clauses, subqueries, _ = self.split_clauses( SQLLexer(txt).tokens )
+        self.queries = self.build(clauses, subqueries, self.class_type)
+
+    @staticmethod
+    def is_string(text: str) -> bool:
+        return len(text) > 1 and text[0] == "'"
+
+    def split_fields(self, source: list, key: str, obj: DQL_Object) -> list:
+        """
+        Splits the tokens of a clause by its separator -- out of
+        parenthesis and never inside strings. Fields prefixed by
+        the table name (e.g. of a derived table) use its alias.
+        """
+        prefix = obj.table_name + '.'
+        source = [
+            obj.alias + text[len(prefix)-1:] if text.startswith(prefix) and not self.is_string(text)
+            else ' ' if text.isspace() else text
+            for text in source
+        ]
+        words = [text.upper() for text in source if not self.is_string(text)]
+        if key == CMD_LIMIT or (key == CMD_SELECT and ('(' in words or 'CASE' in words)):
+            return obj.split_fields(''.join(source).strip(), key)
+        separator = 'AND' if key == CMD_WHERE else ','
+        result, current = [], []
+        depth, between = 0, False
+        for text in source:
+            word = '' if self.is_string(text) else text.upper()
+            if word == '(':
+                depth += 1
+            elif word == ')':
+                depth -= 1
+            elif word == 'BETWEEN':
+                between = True
+            elif word == separator and not depth:
+                if not between:
+                    result.append( ''.join(current).strip() )
+                    current = []
+                    continue
+                between = False
+            current.append(text)
+        result.append( ''.join(current).strip() )
+        return [field for field in result if field]
+
+    def build(self, clauses: dict, subqueries: list, class_type: type) -> list:
+        result, conditions = {}, {}
+        def find_table(name: str) -> Select:
+            found = result.get(name) or next((
+                obj for obj in result.values() if obj.table_name == name
+            ), None)
             if not found:
-                return None
-            start, end = found.span()
-            found = re.search(r'\bwhere\b', txt[:start], re.IGNORECASE)
-            if found:
-                return None
-            return start, end
-        def raise_table_not_found(table: str):
-            raise KeyError("Table '{}' not found in [{}]".format(
-                table, ', '.join(result.keys())
-            ))
-        # -----------------------------------------------------------------------
-        found = and_without_where()
-        if found:
-            start, end = found
-            txt = txt[:start] + 'WHERE' + txt[end:]
-        found = self.REGEX['subquery'].search(txt)
-        while found:
-            start, end = find_parenthesis(found)
-            fld, _, *inner = re.split(r'\s+(in|IN)\s+', txt[start: end], maxsplit=1)
-            if fld.upper() == 'NOT':
-                pos = find_last_word(start)
-                fld = txt[pos: start].strip()
-                start = pos
-                target_class = NotSelectIN
-            else:
-                target_class = SelectIN
-            obj = SQLParser(
-                ' '.join(re.sub(r'^\(', '', s.strip()) for s in inner),
-                class_type=target_class
-            ).queries[0]
+                raise KeyError("Table '{}' not found in [{}]".format(
+                    name, ', '.join(result.keys())
+                ))
+            return found
+        for fld, negated, inner, inner_subqueries in subqueries:
+            target_class = NotSelectIN if negated else SelectIN
+            obj = self.build(inner, inner_subqueries, target_class)[0]
             if self.SUB_QUERIES_AS_CONDITIONS:
                 *alias, fld = fld.split('.')
                 alias = '' if not alias else alias[0]
-                subqueries.setdefault(alias, {})[fld] = obj
+                conditions.setdefault(alias, {})[fld] = obj
             else:
                 result[obj.alias] = obj
-            txt = txt[:start-1] + txt[end+1:]
-            found = self.REGEX['subquery'].search(txt)
-        tokens = [t.strip() for t in self.REGEX['keywords'].split(txt) if t.strip()]
-        values = {k.upper(): v for k, v in zip(tokens[::2], tokens[1::2])}
+        values = {
+            key: ''.join(source).strip()
+            for key, source in clauses.items()
+        }
+        values = {key: text for key, text in values.items() if text}
         tables = [t.strip() for t in self.REGEX['tbl_join'].split(values[CMD_FROM]) if t.strip()]
         for curr_table_name in tables:
             if '=' in curr_table_name:
                 a1, f1, a2, f2 = [r.strip() for r in re.split('[().=]', curr_table_name) if r]
-                if a1 not in result:
-                    raise_table_not_found(a1)
-                if a2 not in result:
-                    raise_table_not_found(a2)
-                obj1: Select = result[a1]
-                obj2: Select = result[a2]
+                obj1: Select = find_table(a1)
+                obj2: Select = find_table(a2)
                 join_direction =  self.REGEX['tbl_join'].findall(values[CMD_FROM])[0].upper()
                 if join_direction in ('LEFT', 'RIGHT'):
                     obj1.join_type = JoinType[join_direction]
@@ -2608,7 +3700,7 @@ class SQLParser(Parser):
                     curr_table_name = '{} {}'.format(
                         new_name, alias[0] if alias else old_name
                     )
-                obj = self.class_type(curr_table_name)
+                obj = class_type(curr_table_name)
                 for key in USUAL_KEYS:
                     if not key in values:
                         continue
@@ -2617,13 +3709,13 @@ class SQLParser(Parser):
                     }.get(key, Where if key == 'WHERE' else Field)
                     obj.values[key] = [
                         cls.format(fld, obj)
-                        for fld in self.class_type.split_fields(values[key], key)
+                        for fld in self.split_fields(clauses[key], key, obj)
                         if (fld != '*' and len(tables) == 1) or obj.match(fld, key)
                     ]
-                if obj.alias in subqueries:
-                    obj.__call__(**subqueries[obj.alias])                    
+                if obj.alias in conditions:
+                    obj.__call__(**conditions[obj.alias])                    
                 result[obj.alias] = obj
-        self.queries = list( result.values() )
+        return list( result.values() )
 
 
 class CypherParser(Parser):
@@ -2986,6 +4078,7 @@ class LanguageEnum(Enum):
     MongoDB = MongoDBLanguage
     Pandas = PandasLanguage
     Polar = PolarsLanguage
+    PolarsLazy = PolarsLazyLanguage
     Databricks = DatabricksLanguage
     Spark = SparkLanguage
     Neo4J = Neo4JLanguage
@@ -3005,15 +4098,75 @@ class LanguageEnum(Enum):
     def by_name(cls, search: str) -> 'LanguageEnum':
         search = search.lower()
         for class_type in cls:
-            name = class_type.name
-            if name.lower().startswith(search):
+            if class_type.name.lower() == search:
+                return class_type
+        for class_type in cls:
+            name = class_type.name.lower()
+            if name.startswith(search) or search.startswith(name):
                 return class_type
         return cls.SQL
 
 
+class CompiledQuery:
+    """
+    A Pandas or Polars script (see `Select.compile_to`) compiled
+    only once. Calling it runs the script over the given sources:
+        query.compile_to('Pandas')({'Sales': df_sales, 'Product': 'products.csv'})
+    The tables that are not informed are read from their files.
+    """
+    cache = Registry(max_size=256)
+    lock = Lock()
+    LANGUAGES = (PandasLanguage, PolarsLanguage, PolarsLazyLanguage)
+    REGEX_READ = re.compile(r"^df_(\w+) = ((?:pd|pl)[.]\w+)[(]('.*')[)]((?:[.]lazy[(][)])?)$", re.MULTILINE)
+
+    def __init__(self, script: str):
+        self.tables = self.REGEX_READ.findall(script)
+        self.script = self.REGEX_READ.sub(r"df_\1 = _read('\1', \2, \3)\4", script)
+        self.code = compile(self.script, '<sql_blocks>', 'exec')
+
+    def __call__(self, sources=None, **frames):
+        """
+        `sources` maps the table names to DataFrames (or file names);
+        a single DataFrame is the source of the main table.
+        """
+        if sources is not None and not isinstance(sources, dict):
+            sources = {self.tables[0][0]: sources}
+        sources = {**(sources or {}), **frames}
+        # ---------------------------------------------------------------------------
+        def read(table: str, function, file_name: str):
+            found = sources.get(table, file_name)
+            if isinstance(found, str):
+                return function(found)
+            if function.__name__.startswith('scan_') and hasattr(found, 'lazy'):
+                return found.lazy()  # --- DataFrame to LazyFrame
+            return found
+        # ---------------------------------------------------------------------------
+        namespace = {'_read': read}
+        exec(self.code, namespace)
+        return namespace['df']
+
+    @classmethod
+    def create(cls, query: 'Select', language: QueryLanguage) -> 'CompiledQuery':
+        """
+        The compiled scripts are kept by the translated script
+        (that `translate_to` renders only once for each query).
+        """
+        script = query.translate_to(language)
+        key = (language, script)
+        with cls.lock:
+            found = cls.cache.get(key)
+        if found is None:
+            found = cls(script)
+            with cls.lock:
+                cls.cache[key] = found
+        return found
+
+
 class Select(DQL_Object):
     join_type: JoinType = JoinType.INNER
-    EQUIVALENT_NAMES = {}
+    EQUIVALENT_NAMES: Registry = ScopedAttribute(
+        Registry(), scope=lambda names: ChainMap(Registry(), names)
+    )
     DefaultLanguage = QueryLanguage
 
     def __init__(self, table_name: str='', **values):
@@ -3078,8 +4231,8 @@ class Select(DQL_Object):
             main.update_values(key, self)
 
     def copy(self) -> DQL_Object:
-        from copy import deepcopy
-        return deepcopy(self)
+        values = self.values
+        return deepcopy(self, {id(values): values.copy()})
 
     def relation_error(self, other: DQL_Object):
         raise ValueError(f'No relationship found between {self.table_name} and {other.table_name}.')
@@ -3115,7 +4268,7 @@ class Select(DQL_Object):
 
     def __eq__(self, other: DQL_Object) -> bool:
         for key in KEYWORD:
-            if self.diff(key, other.values.get(key, []), True):
+            if self.normalized(key) != other.normalized(key):
                 return False
         return True
     
@@ -3167,27 +4320,224 @@ class Select(DQL_Object):
             else:
                 self.values[CMD_SELECT] = [f'SELECT TOP({row_count}) *']
             return self
-        if Function.dialect == Dialect.ORACLE:
-            Where.gte(row_count).add(SQL_ROW_NUM, self)
-            if offset > 0:
-                Where.lte(row_count+offset).add(SQL_ROW_NUM, self)
+        if Function.dialect == Dialect.ORACLE and not offset and not self.values.get(CMD_ORDER_BY):
+            Where.lte(row_count).add(SQL_ROW_NUM, self)
             return self
+        # --- Oracle with ORDER BY or OFFSET: see OracleLanguage (FETCH)
         self.values[CMD_LIMIT] = ['{}{}'.format(
             row_count, f' OFFSET {offset}' if offset > 0 else ''
         )]
         return self
 
+    ROW_VALUE_DIALECTS = (Dialect.ANSI, Dialect.POSTGRESQL, Dialect.MYSQL)
+
+    def paginate(self, order_fields: str|list, after=None, size: int=100, dialect: Dialect=None) -> tuple:
+        '''
+        Keyset (seek) pagination -- instead of OFFSET, the page
+        starts after the last row of the previous one:
+            (query, next_cursor)
+        `after` is the list of values of the order fields in
+        the last row or the token returned by next_cursor(rows).
+        The order fields must be NOT NULL and end with a unique key.
+        Without a `dialect`, the one of DefaultLanguage (the
+        language of str and to_params) or Function.dialect is used.
+        '''
+        if isinstance(order_fields, str):
+            order_fields = order_fields.split(',')
+        fields = []
+        for field in order_fields:
+            name, *sort = re.split(r'\s+(ASC|DESC)\s*$', field.strip(), flags=re.IGNORECASE)
+            if '.' not in name and self.alias:
+                name = f'{self.alias}.{name}'
+            fields.append( (name, bool(sort) and sort[0].upper() == 'DESC') )
+        query = self.copy()
+        if isinstance(after, str):
+            after = self.read_cursor(after)
+        if after:
+            query.values.setdefault(CMD_WHERE, []).append(
+                self.seek_condition(fields, after, dialect or getattr(
+                    self.DefaultLanguage, 'dialect', Function.dialect
+                ))
+            )
+        query.values[CMD_ORDER_BY] = [name + (' DESC' if desc else ' ASC') for name, desc in fields]
+        query.values[CMD_LIMIT] = [str(size)]
+        positions = []
+        for name, _ in fields:
+            name = name.split('.')[-1]
+            found = [
+                i for i, field in enumerate(query.values.get(CMD_SELECT, []))
+                if re.split(r'\s+as\s+', field, flags=re.IGNORECASE)[-1].split('.')[-1].strip() == name
+            ]
+            positions.append( (name, found[0] if found else None) )
+        # ---------------------------------------------------------------------------
+        def next_cursor(rows: list) -> str:
+            if len(rows) < size:
+                return None  # --- last page
+            row = rows[-1]
+            if hasattr(row, 'keys'):
+                return self.cursor_token([row[name] for name, _ in positions])
+            if None in (pos for _, pos in positions):
+                raise ValueError('The order fields must be in the SELECT clause.')
+            return self.cursor_token([row[pos] for _, pos in positions])
+        # ---------------------------------------------------------------------------
+        return query, next_cursor
+
+    @classmethod
+    def seek_condition(cls, fields: list, values: list, dialect: Dialect) -> str:
+        if len(values) != len(fields) or None in values:
+            raise ValueError('One value (not NULL) is expected for each order field.')
+        literals = [Insert.literal(value) for value in values]
+        operators = ['<' if desc else '>' for _, desc in fields]
+        if len(fields) == 1:
+            return f'{fields[0][0]} {operators[0]} {literals[0]}'
+        if dialect in cls.ROW_VALUE_DIALECTS and len(set(operators)) == 1:
+            return '({}) {} ({})'.format(
+                ', '.join(name for name, _ in fields), operators[0], ', '.join(literals)
+            )
+        options = []
+        for i, ((name, _), operator, literal) in enumerate(zip(fields, operators, literals)):
+            equals = [f'{prev} = {val}' for (prev, _), val in zip(fields[:i], literals)]
+            options.append( ' AND '.join(equals + [f'{name} {operator} {literal}']) )
+        return '({})'.format( ' OR '.join(f'({option})' for option in options) )
+
+    @staticmethod
+    def cursor_token(values: list) -> str:
+        from base64 import urlsafe_b64encode
+        from json import dumps
+        return urlsafe_b64encode( dumps(values, default=str).encode() ).decode()
+
+    @staticmethod
+    def read_cursor(token: str) -> list:
+        from base64 import urlsafe_b64decode
+        from json import loads
+        return loads( urlsafe_b64decode(token.encode()) )
+
+    def split(self, by: str='id', parts: int=4, bounds: tuple=None, granularity: str='', nulls: bool=False) -> list:
+        '''
+        Splits the query into disjoint ranges of `by` (sqoop-like):
+            * numbers: `parts` ranges between bounds=(lo, hi);
+            * dates: one range per day, month or year (`granularity`)
+              or `parts` ranges of days, if there is no granularity.
+        The first range is open below and the last, above, so the
+        union of the queries is the original one (plus `by IS NULL`,
+        if nulls=True). The bounds are required: use the MIN and MAX
+        of `by` (or any estimate of them).
+        '''
+        from datetime import date, timedelta
+        if not bounds or len(bounds) != 2:
+            raise ValueError(f'Inform the bounds=(lo, hi) of {by} to split the query.')
+        if parts < 1:
+            raise ValueError(f'The query cannot be split into {parts} parts.')
+        lo, hi = bounds
+        if isinstance(lo, str):
+            lo, hi = date.fromisoformat(lo[:10]), date.fromisoformat(hi[:10])
+        if isinstance(lo, date):
+            # ---------------------------------------------------------------------------
+            def next_edge(value: date) -> date:
+                if granularity == 'year':
+                    return value.replace(year=value.year+1, month=1, day=1)
+                if granularity == 'month':
+                    return (value.replace(day=1) + timedelta(days=32)).replace(day=1)
+                if granularity == 'day':
+                    return value + timedelta(days=1)
+                return value + timedelta(days=-(-((hi - lo).days + 1) // parts))
+            # ---------------------------------------------------------------------------
+            edges = [lo]
+            while next_edge(edges[-1]) <= hi:
+                edges.append( next_edge(edges[-1]) )
+            edges = [str(edge) for edge in edges]
+        elif isinstance(lo, int) and isinstance(hi, int):
+            step = -(-(hi - lo + 1) // parts)
+            edges = list( range(lo, hi + 1, step) )
+        else:
+            edges = [lo + (hi - lo) * i / parts for i in range(parts)]
+        result = []
+        for i, start in enumerate(edges):
+            end = edges[i+1] if i+1 < len(edges) else None
+            conditions = []
+            if isinstance(start, int) and i and end is not None:
+                conditions.append( Between(start, end - 1) )
+            else:
+                if i:
+                    conditions.append( Where.gte(start) )
+                if end is not None:
+                    conditions.append( Where.lt(end) )
+            result.append( self.copy()(**{by: conditions}) if conditions else self.copy() )
+        if nulls:
+            result.append( self.copy()(**{by: Where.is_null()}) )
+        return result
+
+    def run(self, pool: 'ConnectionPool', arraysize: int=500):
+        '''
+        Executes the query in a connection of the pool and
+        yields its rows (fetchmany of `arraysize` rows).
+        '''
+        return pool.select(self, arraysize)
+
+    def evaluate(self, sources: dict=None, folder: str='') -> list:
+        '''
+        Runs the query in-process (see RowEngine) over lists of dicts
+        in `sources` or the CSV files of FROM, found in `folder`.
+        '''
+        return list( RowEngine(sources, folder).rows(self) )
+
+    def evaluate_arrays(self, sources: dict=None, folder: str='') -> dict:
+        '''
+        Vectorized `evaluate` over dicts of NumPy arrays (see ArrayEngine):
+        returns the result as arrays by field name or alias.
+        '''
+        return ArrayEngine(sources, folder).columns(self)
+
+    @staticmethod
+    def run_parallel(queries: list, connect, workers: int=4, style: ParamStyle|str=ParamStyle.QMARK) -> list:
+        '''
+        Runs the queries in a thread pool, each one in a new
+        connection given by `connect()` (any PEP 249 driver).
+        Returns the rows of each query, in the same order.
+        '''
+        from concurrent.futures import ThreadPoolExecutor
+        # ---------------------------------------------------------------------------
+        def fetch(query: Select) -> list:
+            conn = connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute( *query.to_params(style) )
+                return cursor.fetchall()
+            finally:
+                conn.close()
+        # ---------------------------------------------------------------------------
+        with ThreadPoolExecutor(workers) as executor:
+            return list( executor.map(fetch, queries) )
+
+    def to_params(self, style: ParamStyle|str=ParamStyle.QMARK, language: QueryLanguage=None) -> tuple:
+        '''
+        Returns the script with placeholders instead of
+        the literals of the conditions, plus their values:
+            (sql, params)
+        '''
+        if isinstance(style, str):
+            style = ParamStyle(style)
+        params = []
+        query = self.copy()
+        query.values.update( self.conditions_without_literals(params) )
+        return style.bind(
+            query.translate_to(language or self.DefaultLanguage), params
+        )
+
     def match(self, field: str, key: str) -> bool:
         '''
         Recognizes if the field is from the current table
         '''
         if key in (CMD_ORDER_BY, CMD_GROUP_BY) and '.' not in field:
             return self.has_named_field(field)
-        return re.findall(f'\b*{self.alias}[.]', field) != []
+        return ClauseNode.parse(key, field).has_prefix(self.alias)
 
     @classmethod
     def parse(cls, txt: str, parser: Parser = SQLParser) -> list[DQL_Object]:
-        return parser(txt, cls).queries
+        return ParseCache.find(
+            ParseCache.key(txt, cls, parser),
+            lambda: parser(txt, cls).queries
+        )
 
     def optimize(self, rules: list[Rule]=None):
         if isinstance(rules, str):
@@ -3229,7 +4579,37 @@ class Select(DQL_Object):
                 return
         if isinstance(language, LanguageEnum):
             language = language.value
-        return language(self).convert()
+        key = self.render_key(language)
+        memo = self.values.memo
+        if key not in memo:
+            memo[key] = language(self).convert()
+        return memo[key]
+
+    def render_key(self, language: QueryLanguage) -> tuple:
+        '''
+        Everything but the values that the text rendered by
+        `language` depends on (see translate_to).
+        '''
+        schema: Schema = Parser.public_schema
+        return (
+            language, Function.dialect, OrderBy.sort, DQL_Object.ALIAS_FUNC,
+            type(self), self.break_lines, self.join_type, self.aka(), self.alias,
+            # --- the schema only matters for the DATE literals of DialectLanguage:
+            frozenset(schema.date_fields()) if schema and getattr(language, 'DATE_TYPES', None) else None,
+        )
+
+    def compile_to(self, language: QueryLanguage|str|LanguageEnum='Pandas') -> CompiledQuery:
+        '''
+        Returns a function that runs the query translated to Pandas
+        or Polars over DataFrames (see CompiledQuery).
+        '''
+        if isinstance(language, str):
+            language = LanguageEnum.by_name(language)
+        if isinstance(language, LanguageEnum):
+            language = language.value
+        if language not in CompiledQuery.LANGUAGES:
+            raise ValueError(f'{language.__name__} cannot be compiled: use Pandas or Polars.')
+        return CompiledQuery.create(self, language)
 
 
 # -------------------------------------------------------
@@ -3264,7 +4644,7 @@ class NotSelecExists(SelectExists):
 
 class CTE(Select):
     prefix = ''
-    show_query = True
+    show_query: bool = ScopedAttribute(True, local=True)
     LINE_SIZE = 30
 
     def __init__(self, table_name: str, query_list: list[Select]=[]):
@@ -3272,17 +4652,26 @@ class CTE(Select):
         self.query_list = query_list
         self.break_lines = False        
 
-    def __str__(self) -> str:
+    def with_block(self) -> str:
         size = 0
         for key in USUAL_KEYS:
             size += sum(len(v) for v in self.values.get(key, []) if '\n' not in v)
         if size > 70:
             self.break_lines = True
-        return 'WITH {}{} AS (\n    {}\n){}'.format(
+        return 'WITH {}{} AS (\n    {}\n)'.format(
             self.prefix, self.table_name, 
             '\n\tUNION ALL\n    '.join(
                 q.justify(self.LINE_SIZE) for q in self.query_list
-            ), super().__str__() if self.show_query else ''
+            )
+        )
+
+    def __str__(self) -> str:
+        head = self.with_block()
+        return head + (super().__str__() if self.show_query else '')
+
+    def render_key(self, language: QueryLanguage) -> tuple:
+        return super().render_key(language) + (
+            self.show_query, *(query.values.version for query in self.query_list)
         )
 
     def join(self, pattern: str, fields: list | str, format: str=''):
@@ -3301,12 +4690,12 @@ class Recursive(CTE):
     prefix = 'RECURSIVE '
     AUTO_ADD_FIELDS: bool = False
 
-    def __str__(self) -> str:
+    def with_block(self) -> str:
         if len(self.query_list) > 1:
             new_alias = self.increment_alias()
             self.query_list[-1].values[CMD_FROM].append(
                 f', {self.table_name} {new_alias}')
-        return super().__str__()
+        return super().with_block()
 
     @staticmethod
     def get_field(obj: DQL_Object, pos: int) -> str:
@@ -3622,7 +5011,7 @@ class CTEFactory:
             elif node.has_join():
                 query_list = [query]
                 self.main = generic_query(node)
-        DQL_Object.catalog = {}
+        DQL_Object.catalog.clear()
         if query_list:
             self.cte_list.append( CTE(node.description, query_list) )
 
@@ -3855,6 +5244,148 @@ class RuleReplaceJoinBySubselect(Rule):
             target.values = main.values.copy()
 
 
+class BuildContext:
+    """
+    Keeps the builder settings inside a `with` block,
+    isolated from other threads and asyncio tasks:
+        with BuildContext(dialect=Dialect.ORACLE, schema=schema):
+            query = Select(...)
+    The alias catalog, references and equivalent names
+    registered inside the block belong to the context object:
+    they are kept while it is reused (a session) and
+    limited to `max_size` entries, if informed.
+    """
+    OPTIONS = {
+        'dialect':      (Function, 'dialect'),
+        'schema':       (Parser, 'public_schema'),
+        'alias_func':   (DQL_Object, 'ALIAS_FUNC'),
+        'use_catalog':  (DQL_Object, 'USE_CATALOG'),
+        'sort':         (OrderBy, 'sort'),
+    }
+
+    def __init__(self, max_size: int=None, **options):
+        invalid = set(options) - set(self.OPTIONS)
+        if invalid:
+            raise TypeError('Invalid BuildContext options: ' + ', '.join(sorted(invalid)))
+        self.max_size = max_size
+        self.options = options
+        self.state = {}
+
+    @staticmethod
+    def current() -> 'BuildContext':
+        return CURRENT_CONTEXT.get()
+
+    def registries(self) -> list:
+        return [
+            value.maps[0] if isinstance(value, ChainMap) else value
+            for value in self.state.values()
+        ]
+
+    def clear(self):
+        """Discards the registries kept by this context."""
+        self.state.clear()
+
+    def __enter__(self) -> 'BuildContext':
+        tokens = [ (CURRENT_CONTEXT, CURRENT_CONTEXT.set(self)) ]
+        for attr in ScopedAttribute.SCOPED:
+            tokens.append( attr.enter(self.state) )
+        for registry in self.registries():
+            registry.max_size = self.max_size
+        for option, value in self.options.items():
+            cls, name = self.OPTIONS[option]
+            attr: ScopedAttribute = cls.__dict__[name]
+            tokens.append( (attr.var, attr.var.set(value)) )
+        # --- the tokens belong to the thread/task (the same session can be shared):
+        tokens.append( (CONTEXT_TOKENS, CONTEXT_TOKENS.set(CONTEXT_TOKENS.get() + (tokens,))) )
+        return self
+
+    def __exit__(self, *args):
+        for var, token in reversed( CONTEXT_TOKENS.get()[-1] ):
+            var.reset(token)
+
+
+class ParseCache:
+    """
+    Optional LRU cache for `Select.parse` and `detect`:
+        ParseCache.enabled = True
+    Each hit returns new copies of the cached queries and
+    replays the relationships/names registered by the parse.
+    """
+    enabled: bool = False
+    max_size: int = 256
+    hits: int = 0
+    misses: int = 0
+    entries = OrderedDict()
+    lock = Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        func = lambda token: [re.sub(r'\s+', ' ', token)]
+        return ''.join( Parser.strings_and_tokens(text, {False: func}) ).strip()
+
+    @staticmethod
+    def registries() -> tuple:
+        return ForeignKey.references, Select.EQUIVALENT_NAMES, DQL_Object.catalog
+
+    @classmethod
+    def key(cls, text: str, *args) -> tuple:
+        return (
+            cls.normalize(text), Parser.public_schema,
+            DQL_Object.ALIAS_FUNC, DQL_Object.USE_CATALOG,
+            str(DQL_Object.catalog) if DQL_Object.USE_CATALOG else '',
+            OrderBy.sort, SQLParser.SUB_QUERIES_AS_CONDITIONS,
+        ) + args
+
+    @staticmethod
+    def copy(result):
+        if isinstance(result, Select):
+            return result.copy()
+        if isinstance(result, list):
+            return [ParseCache.copy(item) for item in result]
+        return deepcopy(result)
+
+    @classmethod
+    def find(cls, key: tuple, build: callable):
+        if not cls.enabled:
+            return build()
+        with cls.lock:
+            found = cls.entries.get(key)
+            if found:
+                cls.entries.move_to_end(key)
+                cls.hits += 1
+        if found:
+            result, changes, sort = found
+            for registry, new_items in zip(cls.registries(), changes):
+                registry.update(new_items)
+            OrderBy.sort = sort
+            return cls.copy(result)
+        before = [dict(registry) for registry in cls.registries()]
+        result = build()
+        changes = [
+            {k: v for k, v in registry.items() if old.get(k) != v}
+            for registry, old in zip(cls.registries(), before)
+        ]
+        with cls.lock:
+            cls.misses += 1
+            cls.entries[key] = (cls.copy(result), changes, OrderBy.sort)
+            while len(cls.entries) > cls.max_size:
+                cls.entries.popitem(last=False)
+        return result
+
+    @classmethod
+    def info(cls) -> dict:
+        return {
+            'hits': cls.hits, 'misses': cls.misses,
+            'size': len(cls.entries), 'max_size': cls.max_size,
+        }
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.entries.clear()
+            cls.hits = cls.misses = 0
+
+
 def parser_class(text: str) -> Parser:
     PARSER_REGEX = [
         (r'\bselect\b|\bfrom\b', SQLParser),
@@ -3891,40 +5422,44 @@ def join_and_configure(query_list: list[Select]) -> Select:
     return result
 
 def detect(text: str, **args) -> Select | list[Select]:
-    from collections import Counter
-    parser = parser_class(text)
-    if not parser:
-        raise SyntaxError('Unknown parser class')
-    auto_config = args.get('auto_config')
-    if auto_config:
-        DQL_Object.USE_CATALOG = True
-        DQL_Object.ALIAS_FUNC = lambda t: t[0].lower()
-        join_method = join_and_configure
-    else:
-        join_method = args.get('join_method', join_queries)
-    # -----------------------------------------------------------------------------------
-    if parser == CypherParser:
-        for table, count in Counter( re.findall(r'(\w+)[(]', text) ).most_common():
-            if count < 2:
-                continue
-            pos = [ f.span() for f in re.finditer(fr'({table})[(]', text) ]
-            for begin, end in pos[::-1]:
-                new_name = f'{table}_{count}'  # See set_table (line 55)
-                Select.EQUIVALENT_NAMES[new_name] = table
-                text = text[:begin] + new_name + '(' + text[end:]
-                count -= 1
-    result = Select.parse(text, parser)
-    # -----------------------------------------------------------------------------------
-    format: str = args.get('format')
-    if format:
-        for query in result:
-            query.set_file_format(format)
-    if join_method:
-        result = join_method(result)
-    if auto_config:
-        DQL_Object.USE_CATALOG = False
-        DQL_Object.ALIAS_FUNC  = None
-    return result
+    def parse_and_join(text: str) -> Select | list[Select]:
+        parser = parser_class(text)
+        if not parser:
+            raise SyntaxError('Unknown parser class')
+        auto_config = args.get('auto_config')
+        if auto_config:
+            DQL_Object.USE_CATALOG = True
+            DQL_Object.ALIAS_FUNC = lambda t: t[0].lower()
+            join_method = join_and_configure
+        else:
+            join_method = args.get('join_method', join_queries)
+        # -----------------------------------------------------------------------------------
+        if parser == CypherParser:
+            for table, count in Counter( re.findall(r'(\w+)[(]', text) ).most_common():
+                if count < 2:
+                    continue
+                pos = [ f.span() for f in re.finditer(fr'({table})[(]', text) ]
+                for begin, end in pos[::-1]:
+                    new_name = f'{table}_{count}'  # See set_table (line 55)
+                    Select.EQUIVALENT_NAMES[new_name] = table
+                    text = text[:begin] + new_name + '(' + text[end:]
+                    count -= 1
+        result = Select.parse(text, parser)
+        # -----------------------------------------------------------------------------------
+        format: str = args.get('format')
+        if format:
+            for query in result:
+                query.set_file_format(format)
+        if join_method:
+            result = join_method(result)
+        if auto_config:
+            DQL_Object.USE_CATALOG = False
+            DQL_Object.ALIAS_FUNC  = None
+        return result
+    return ParseCache.find(
+        ParseCache.key(text, 'detect', tuple(sorted(args.items()))),
+        lambda: parse_and_join(text)
+    )
 
 def extract_comments(query: Select, text: str) -> bool:
     REGEX_COMMENT = re.compile(r'(\w+)\s*[,]*\s*/\*([\s\S]*?)\*/')
@@ -4160,6 +5695,14 @@ class Schema(DDL_Object):
     def field_for_function(self, table_name: str, function: Function) -> str:
         table: Table = self.summary.get(table_name)
         return table.field_for_function(function) if table else ''
+
+    def date_fields(self) -> set:
+        return {
+            field.lower()
+            for table in self.summary.values()
+            for field, cls in zip(table.fields, table.class_types)
+            if cls is DateField or isinstance(cls, DateField)
+        }
     
     def find_table(self, field_list: list) -> str:
         table: Table = None
@@ -4178,7 +5721,7 @@ class DML_Object:
         self.filter = []
         self.where_fields = []
         for name, condition in conditions.items():
-            self.filter.append( '\n\t' + condition.format(name) )
+            self.filter.append( '\n\t' + condition.format(name, condition) )
             self.where_fields.append(name)
         self.table = table_name
         self.record_count = 1
@@ -4187,12 +5730,88 @@ class DML_Object:
   
     def __str__(self):
         return self.command
+
+    def to_params(self, style: ParamStyle|str=ParamStyle.QMARK, command: str='') -> tuple:
+        '''
+        Returns the command (or one of its `statements`)
+        with placeholders instead of values: (sql, params)
+        '''
+        if isinstance(style, str):
+            style = ParamStyle(style)
+        params = []
+        return style.bind(
+            extract_params(command or self.command, params), params
+        )
+
+    def statements(self) -> list:
+        '''
+        The commands that `run` executes one by one
+        (drivers like sqlite3 reject a multi-statement text).
+        '''
+        return [self.command]
   
+    def run(self, pool: 'ConnectionPool', commit: bool=True) -> int:
+        '''
+        Executes the statements in a connection of
+        the pool and returns the number of rows.
+        '''
+        return pool.execute(self, commit)
+
+    @staticmethod
+    def chunk_size(dialect: Dialect, max_rows: int, max_params: int, row_params: int) -> int:
+        """
+        Records per statement, by the limits of the
+        dialect (see Insert.BATCH_LIMITS) or the given ones.
+        Raises ValueError if not even one record fits.
+        """
+        default_rows, default_params, _ = Insert.BATCH_LIMITS[dialect]
+        max_rows, max_params = max_rows or default_rows, max_params or default_params
+        if max_params:
+            if max_params < row_params:
+                raise ValueError(
+                    f'One record needs {row_params} parameters, but max_params is {max_params}.'
+                )
+            max_rows = min(max_rows or max_params, max_params // row_params)
+        return max_rows
+
+    @staticmethod
+    def bound_chunks(records, max_rows: int, style: ParamStyle, build, max_bytes: int=None):
+        """
+        Yields build(chunk, value) for every `max_rows` records:
+        `value` returns the literal of a value or, with a `style`,
+        a placeholder -- then a tuple (sql, params) is yielded.
+        A chunk whose text (with literals) has more than `max_bytes`
+        bytes is split in halves, as in Insert.batches.
+        """
+        def split(chunk: list):
+            if max_bytes and len(chunk) > 1:
+                text = build(chunk, Insert.literal)
+                if len( text.encode('utf-8') ) > max_bytes:
+                    middle = len(chunk) // 2
+                    yield from split(chunk[:middle])
+                    yield from split(chunk[middle:])
+                    return
+            yield chunk
+        while True:
+            chunk = list( itertools.islice(records, max_rows) )
+            if not chunk:
+                break
+            for part in split(chunk):
+                params = []
+                def value(val) -> str:
+                    if not style:
+                        return Insert.literal(val)
+                    params.append(val)
+                    return PARAM_MARK
+                text = build(part, value)
+                yield style.bind(text, params) if style else text
+
     def get_values(self, values) -> list:
         if not values:
             return
         schema: Schema = Parser.public_schema
-        if isinstance(values, list):
+        if not isinstance(values, dict):
+            values = list(values) # --- for large sources, see Insert.batches
             self.record_count = len(values)
             entity: Table = None
             if schema:
@@ -4261,6 +5880,229 @@ class Insert(DML_Object):
             return ''
         return values_to_str( super().get_values(values) )
 
+    BATCH_LIMITS = {
+        # --- dialect:      (max_rows, max_params, max_bytes)
+        Dialect.ANSI:       (None, 32766, None), # --- SQLite 3.32+ (999 before)
+        Dialect.SQL_SERVER: (1000, 2100, None),
+        Dialect.ORACLE:     (1000, 65535, None),
+        Dialect.POSTGRESQL: (None, 65535, None),
+        Dialect.MYSQL:      (None, 65535, 4 * 1024 * 1024), # --- max_allowed_packet
+        Dialect.BIGQUERY:   (None, 10000, 1024 * 1024),
+    }
+
+    @staticmethod
+    def literal(value) -> str:
+        if value is None:
+            return 'NULL'
+        if isinstance(value, bool):
+            return str( int(value) )
+        if isinstance(value, (int, float)):
+            return str(value)
+        return "'{}'".format( str(value).replace("'", "''") )
+
+    @staticmethod
+    def field_names(table_name: str, first_row) -> list:
+        if isinstance(first_row, dict):
+            return list(first_row)
+        schema: Schema = Parser.public_schema
+        entity: Table = schema.summary.get(table_name) if schema else None
+        if not entity:
+            raise ValueError('The field definitions for this table are missing in Parser.public_schema.')
+        pk_field = entity.find_attribute(PrimaryKey)
+        return [field for field in entity.fields if field != pk_field]
+
+    @classmethod
+    def batches(
+        cls, rows, table_name: str, fields: list=None,
+        max_rows: int=None, max_params: int=None, max_bytes: int=None,
+        dialect: Dialect=None, style: ParamStyle|str=None
+    ):
+        """
+        Splits `rows` (tuples or dicts) into multi-row INSERT
+        statements that respect the limits of the dialect.
+        Yields the text of each statement or, if a `style` is
+        given, a tuple (sql, params) -- every full batch has
+        the same sql, so it can be prepared once.
+        """
+        dialect = dialect or Function.dialect
+        if isinstance(style, str):
+            style = ParamStyle(style)
+        max_rows, max_params, max_bytes = [
+            given or default for given, default in zip(
+                (max_rows, max_params, max_bytes), cls.BATCH_LIMITS[dialect]
+            )
+        ]
+        rows = iter(rows)
+        first_row = next(rows, None)
+        if first_row is None:
+            return
+        fields = fields or cls.field_names(table_name, first_row)
+        max_rows = cls.chunk_size(dialect, max_rows, max_params, len(fields))
+        columns = '{} ({})'.format( table_name, ', '.join(fields) )
+        if dialect == Dialect.ORACLE:
+            header, row_format, separator, footer = (
+                'INSERT ALL', f'\n\tINTO {columns} VALUES ({{}})', '', '\nSELECT 1 FROM DUAL'
+            )
+        else:
+            header, row_format, separator, footer = (
+                f'INSERT INTO {columns} VALUES', '\n\t({})', ',', ''
+            )
+        if not style:
+            footer += ';'
+        placeholders = row_format.format( ', '.join([PARAM_MARK] * len(fields)) )
+        statements = {} # --- bound sql by number of rows
+        empty_size = len( (header + footer).encode('utf-8') )  # --- max_bytes counts bytes
+        size = empty_size
+        batch, params = [], []
+        # ---------------------------------------------------------------------------
+        def flush():
+            if not style:
+                return header + separator.join(batch) + footer
+            count = len(batch)
+            if count not in statements:
+                statements[count] = style.bind(
+                    header + separator.join([placeholders] * count) + footer, []
+                )[0]
+            if style == ParamStyle.NAMED:
+                return statements[count], {f'p{pos}': value for pos, value in enumerate(params, 1)}
+            return statements[count], params
+        # ---------------------------------------------------------------------------
+        for row in itertools.chain([first_row], rows):
+            values = [row[field] for field in fields] if isinstance(row, dict) else list(row)
+            text, length = None, 0
+            if max_bytes or not style:
+                text = row_format.format( ', '.join(cls.literal(val) for val in values) )
+                length = len( (text + separator).encode('utf-8') )
+            if batch and (
+                len(batch) == max_rows or (max_bytes and size + length > max_bytes)
+            ):
+                yield flush()
+                batch, params, size = [], [], empty_size
+            batch.append(text)
+            params += values
+            size += length
+        yield flush()
+
+    @classmethod
+    def executemany(
+        cls, pool: 'ConnectionPool', rows, table_name: str,
+        fields: list=None, batch_size: int=1000, commit: bool=True
+    ) -> int:
+        """
+        Inserts the rows (any iterable of tuples or dicts) with
+        `executemany` of the driver -- one prepared statement.
+        """
+        rows = iter(rows)
+        first_row = next(rows, None)
+        if first_row is None:
+            return 0
+        fields = fields or cls.field_names(table_name, first_row)
+        sql, _ = pool.style.bind('INSERT INTO {} ({}) VALUES ({})'.format(
+            table_name, ', '.join(fields), ', '.join([PARAM_MARK] * len(fields))
+        ), [])
+        params = (
+            pool.style.bind('', [row[field] for field in fields] if isinstance(row, dict) else row)[1]
+            for row in itertools.chain([first_row], rows)
+        )
+        return pool.executemany(sql, params, batch_size, commit)
+
+    @classmethod
+    def from_csv(cls, source, table_name: str='', delimiter: str=',', **options):
+        """
+        Reads a CSV file (path or open file) line by line
+        and yields the statements of `batches`. The header
+        gives the fields; empty values are inserted as NULL.
+        """
+        if isinstance(source, str):
+            table_name = table_name or os.path.splitext( os.path.basename(source) )[0]
+            with open(source, newline='', encoding='utf-8') as file:
+                yield from cls.from_csv(file, table_name, delimiter, **options)
+            return
+        reader = csv.reader(source, delimiter=delimiter)
+        header = next(reader, None)
+        if not header:
+            return
+        options.setdefault('fields', [name.strip() for name in header])
+        rows = (
+            [value if value != '' else None for value in row]
+            for row in reader if row
+        )
+        yield from cls.batches(rows, table_name, **options)
+
+    BULK_FORMAT = {
+        Dialect.POSTGRESQL: 'COPY {table} ({fields}) FROM STDIN;',
+        Dialect.MYSQL: (
+            "LOAD DATA LOCAL INFILE '{file}' INTO TABLE {table} CHARACTER SET utf8mb4"
+            "\n\tFIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n'"
+            "\n\t({fields});"
+        ),
+        Dialect.SQL_SERVER: (
+            "BULK INSERT {table} FROM '{file}' WITH ("
+            "\n\tFORMAT = 'CSV', FIELDQUOTE = '\"', FIELDTERMINATOR = ','"
+            ", ROWTERMINATOR = '0x0a', CODEPAGE = '65001', KEEPNULLS\n);"
+        ),
+    }
+    TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+    @classmethod
+    def text_field(cls, value) -> str:
+        """
+        Text format of COPY (PostgreSQL) and LOAD DATA (MySQL).
+        """
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            value = int(value)
+        return str(value).translate(cls.TEXT_ESCAPES)
+
+    @staticmethod
+    def csv_field(value) -> str:
+        """
+        RFC 4180 field of BULK INSERT (SQL Server):
+        NULL is an empty field, strings are always quoted.
+        """
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return str( int(value) )
+        if isinstance(value, (int, float)):
+            return str(value)
+        return '"{}"'.format( str(value).replace('"', '""') )
+
+    @classmethod
+    def bulk_load(
+        cls, rows, table_name: str, fields: list=None,
+        dialect: Dialect=None, file_name: str=''
+    ) -> tuple:
+        """
+        Returns the native bulk-load command and a generator
+        of the lines of its data file (or STDIN payload):
+        COPY for PostgreSQL, LOAD DATA for MySQL and
+        BULK INSERT for SQL Server.
+        """
+        dialect = dialect or Function.dialect
+        if dialect not in cls.BULK_FORMAT:
+            raise ValueError(f'There is no bulk-load command for {dialect.name}.')
+        rows = iter(rows)
+        first_row = next(rows, None)
+        fields = fields or cls.field_names(table_name, first_row or {})
+        file_name = file_name or f'{table_name}.csv'
+        command = cls.BULK_FORMAT[dialect].format(
+            table=table_name, fields=', '.join(fields),
+            file=file_name.replace("'", "''")
+        )
+        if dialect == Dialect.SQL_SERVER:
+            to_field, separator = cls.csv_field, ','
+        else:
+            to_field, separator = cls.text_field, '\t'
+        def lines():
+            if first_row is None:
+                return
+            for row in itertools.chain([first_row], rows):
+                values = [row[field] for field in fields] if isinstance(row, dict) else row
+                yield separator.join(to_field(val) for val in values) + '\n'
+        return command, lines()
+
 
 class Update(DML_Object):
     def get_command(self):
@@ -4268,7 +6110,211 @@ class Update(DML_Object):
         return 'UPDATE {} SET {} \nWHERE {};'.format(
             self.table, ', '.join(fields), ' AND '.join(self.filter)
         )
-    
+
+    @classmethod
+    def bulk(
+        cls, records, key: str='id', table_name: str='',
+        max_rows: int=None, max_params: int=None, max_bytes: int=None,
+        dialect: Dialect=None, style: ParamStyle|str=None
+    ):
+        """
+        Updates many records (dicts with the `key` field)
+        with a few set-based statements, chunked by the
+        limits of the dialect (see Insert.BATCH_LIMITS):
+        * PostgreSQL: UPDATE ... FROM (VALUES ...)
+        * SQL Server and Oracle: MERGE
+        * others: SET field = CASE key WHEN ... END
+        Yields the text of each statement or, if a `style`
+        is given, a tuple (sql, params).
+        """
+        dialect = dialect or Function.dialect
+        if isinstance(style, str):
+            style = ParamStyle(style)
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            return
+        fields = [field for field in first if field != key]
+        if not table_name:
+            schema: Schema = Parser.public_schema
+            if not schema:
+                raise ValueError('The table name could not be found.')
+            table_name = schema.find_table([key] + fields)
+        if dialect in (Dialect.POSTGRESQL, Dialect.SQL_SERVER, Dialect.ORACLE):
+            row_params = len(fields) + 1
+        else:
+            row_params = 2 * len(fields) + 1
+        yield from cls.bound_chunks(
+            itertools.chain([first], records),
+            cls.chunk_size(dialect, max_rows, max_params, row_params), style,
+            lambda chunk, value: cls.bulk_command(chunk, key, fields, table_name, dialect, value),
+            max_bytes or Insert.BATCH_LIMITS[dialect][2]
+        )
+
+    @staticmethod
+    def bulk_command(
+        chunk: list, key: str, fields: list,
+        table: str, dialect: Dialect, value
+    ) -> str:
+        columns = [key] + fields
+        # ---------------------------------------------------------------------------
+        def row_values(record: dict) -> str:
+            return '({})'.format(', '.join(value(record[name]) for name in columns))
+        # ---------------------------------------------------------------------------
+        if dialect == Dialect.POSTGRESQL:
+            return 'UPDATE {} AS t SET {}\nFROM (VALUES\n\t{}\n) AS v ({})\nWHERE t.{} = v.{};'.format(
+                table, ', '.join(f'{name} = v.{name}' for name in fields),
+                ',\n\t'.join(row_values(record) for record in chunk),
+                ', '.join(columns), key, key
+            )
+        if dialect == Dialect.SQL_SERVER:
+            return 'MERGE INTO {} AS t\nUSING (VALUES\n\t{}\n) AS v ({})\nON t.{} = v.{}\nWHEN MATCHED THEN UPDATE SET {};'.format(
+                table, ',\n\t'.join(row_values(record) for record in chunk),
+                ', '.join(columns), key, key,
+                ', '.join(f'{name} = v.{name}' for name in fields)
+            )
+        if dialect == Dialect.ORACLE:
+            return 'MERGE INTO {} t\nUSING (\n\t{}\n) v\nON (t.{} = v.{})\nWHEN MATCHED THEN UPDATE SET {};'.format(
+                table, '\n\tUNION ALL '.join(
+                    'SELECT {} FROM DUAL'.format(', '.join(
+                        f'{value(record[name])} {name}' for name in columns
+                    ))
+                    for record in chunk
+                ), key, key,
+                ', '.join(f't.{name} = v.{name}' for name in fields)
+            )
+        cases = [
+            '\n\t{} = CASE {} {} ELSE {} END'.format(name, key, ' '.join(
+                f'WHEN {value(record[key])} THEN {value(record[name])}'
+                for record in chunk
+            ), name)
+            for name in fields
+        ]
+        return 'UPDATE {} SET {}\nWHERE {} IN ({});'.format(
+            table, ','.join(cases), key,
+            ', '.join(value(record[key]) for record in chunk)
+        )
+
+
+class Upsert(DML_Object):
+    """
+    Inserts the records or updates the existing ones
+    (by the primary key) in a single round trip.
+    """
+    def __init__(self, values: list | dict, table_name: str='', key: str='', dialect: Dialect=None):
+        self.key = key
+        self.dialect = dialect
+        super().__init__(values, table_name)
+
+    def get_values(self, values) -> list:
+        if isinstance(values, dict):
+            values = [values]
+        return list(values)
+
+    def get_command(self):
+        if self.values:  # --- the table and key may come from Parser.public_schema
+            self.table, _, self.key = self.table_info(self.table, self.values[0], [], self.key)
+        self.chunks = list( self.batches(
+            self.values, self.table, key=self.key, dialect=self.dialect
+        ) )
+        return '\n'.join(self.chunks)
+
+    def statements(self) -> list:
+        return self.chunks
+
+    @staticmethod
+    def table_info(table_name: str, first_row, fields: list, key: str) -> tuple:
+        schema: Schema = Parser.public_schema
+        if isinstance(first_row, dict):
+            fields = fields or list(first_row)
+        if schema and not table_name:
+            table_name = schema.find_table(fields or [])
+        entity: Table = schema.summary.get(table_name) if schema else None
+        if entity:
+            fields = fields or entity.fields
+            key = key or entity.find_attribute(PrimaryKey)
+        if not table_name or not fields:
+            raise ValueError('The field definitions for this table are missing in Parser.public_schema.')
+        if not key:
+            raise ValueError(f'The primary key of {table_name} was not found.')
+        return table_name, fields, key
+
+    @classmethod
+    def batches(
+        cls, rows, table_name: str='', fields: list=None, key: str='',
+        max_rows: int=None, max_params: int=None, max_bytes: int=None,
+        dialect: Dialect=None, style: ParamStyle|str=None
+    ):
+        """
+        Yields batched upserts (like Insert.batches):
+        * PostgreSQL and SQLite (ANSI): ON CONFLICT DO UPDATE
+        * MySQL: ON DUPLICATE KEY UPDATE
+        * SQL Server, Oracle and BigQuery: MERGE
+        The `key` comes from the PrimaryKey in Parser.public_schema.
+        """
+        dialect = dialect or Function.dialect
+        if isinstance(style, str):
+            style = ParamStyle(style)
+        rows = iter(rows)
+        first_row = next(rows, None)
+        if first_row is None:
+            return
+        table_name, fields, key = cls.table_info(table_name, first_row, fields, key)
+        yield from cls.bound_chunks(
+            itertools.chain([first_row], rows),
+            cls.chunk_size(dialect, max_rows, max_params, len(fields)), style,
+            lambda chunk, value: cls.upsert_command(chunk, key, fields, table_name, dialect, value),
+            max_bytes or Insert.BATCH_LIMITS[dialect][2]
+        )
+
+    @staticmethod
+    def upsert_command(
+        chunk: list, key: str, fields: list,
+        table: str, dialect: Dialect, value
+    ) -> str:
+        columns = ', '.join(fields)
+        others = [name for name in fields if name != key]
+        # ---------------------------------------------------------------------------
+        def row_values(row) -> list:
+            if isinstance(row, dict):
+                return [value(row[name]) for name in fields]
+            return [value(val) for val in row]
+        # ---------------------------------------------------------------------------
+        if dialect in (Dialect.ORACLE, Dialect.BIGQUERY):
+            select = 'SELECT {} FROM DUAL' if dialect == Dialect.ORACLE else 'SELECT {}'
+            source = '(\n\t{}\n) source'.format('\n\tUNION ALL '.join(
+                select.format(', '.join(
+                    f'{val} {name}' for val, name in zip(row_values(row), fields)
+                ))
+                for row in chunk
+            ))
+        else:
+            source = ',\n\t'.join(
+                '({})'.format(', '.join(row_values(row))) for row in chunk
+            )
+        if dialect in (Dialect.ANSI, Dialect.POSTGRESQL):
+            action = 'DO UPDATE SET {}'.format(
+                ', '.join(f'{name} = excluded.{name}' for name in others)
+            ) if others else 'DO NOTHING'
+            return 'INSERT INTO {} ({}) VALUES\n\t{}\nON CONFLICT ({}) {};'.format(
+                table, columns, source, key, action
+            )
+        if dialect == Dialect.MYSQL:
+            return 'INSERT INTO {} ({}) VALUES\n\t{}\nON DUPLICATE KEY UPDATE {};'.format(
+                table, columns, source, ', '.join(
+                    f'{name} = VALUES({name})' for name in others or [key]
+                )
+            )
+        if dialect == Dialect.SQL_SERVER:
+            source = f'(VALUES\n\t{source}\n) AS source ({columns})'
+        matched = '\nWHEN MATCHED THEN UPDATE SET {}'.format(
+            ', '.join(f'{name} = source.{name}' for name in others)
+        ) if others else ''
+        return 'MERGE INTO {} target\nUSING {}\nON (target.{} = source.{}){}\nWHEN NOT MATCHED THEN INSERT ({}) VALUES ({});'.format(
+            table, source, key, key, matched, columns,
+            ', '.join(f'source.{name}' for name in fields)
+        )
+
 
 class Delete(DML_Object):
     def __init__(self, table_name: str, **conditions):
@@ -4278,6 +6324,1127 @@ class Delete(DML_Object):
         return 'DELETE FROM {} WHERE {}\n;'.format(
             self.table, ' AND '.join(self.filter)
         )
+
+
+class StatementCache(Registry):
+    """
+    Cursors of one connection by statement key: drivers that
+    prepare statements (pyodbc, oracledb...) reuse the plan
+    when the same cursor runs the same sql again.
+    """
+    def __init__(self, connection, max_size: int=256):
+        super().__init__(max_size=max_size)
+        self.connection = connection
+
+    def cursor(self, key):
+        cursor = self.get(key)
+        if cursor is None:
+            cursor = self[key] = self.connection.cursor()
+        else:
+            self.move_to_end(key)
+        return cursor
+
+    def popitem(self, last: bool=True):
+        key, cursor = super().popitem(last)
+        cursor.close()
+        return key, cursor
+
+
+class ResultCache:
+    """
+    LRU cache of the rows of queries run by a ConnectionPool,
+    by sql and parameters. Entries expire after `ttl` seconds
+    and are discarded when a command of the same pool writes
+    to one of the tables they read.
+    """
+    REGEX_TABLE = re.compile(r'\b(?:FROM|JOIN)\s+([\w.]+)', re.IGNORECASE)
+
+    def __init__(self, max_size: int=256, ttl: float=60.0, max_rows: int=10_000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.entries = OrderedDict()  # --- key: (expires, tables, rows)
+        self.by_table = {}
+        self.versions = Counter()
+        self.hits = self.misses = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def table_key(name: str) -> str:
+        return name.split('.')[-1].lower()
+
+    @classmethod
+    def tables(cls, query: Select, sql: str) -> frozenset:
+        """
+        Read set: the tables of FROM/JOIN and of the subqueries.
+        """
+        names = [node.table for node in query.nodes(CMD_FROM) if node.table]
+        names += cls.REGEX_TABLE.findall(sql)
+        return frozenset(cls.table_key(name) for name in names)
+
+    def snapshot(self, tables: frozenset) -> tuple:
+        with self.lock:
+            return tuple(self.versions[table] for table in tables)
+
+    def get(self, key: tuple):
+        with self.lock:
+            found = self.entries.get(key)
+            if found and found[0] < time.monotonic():
+                self.discard(key)
+                found = None
+            if not found:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return found[2]
+
+    def put(self, key: tuple, tables: frozenset, rows: list, snapshot: tuple):
+        with self.lock:
+            if snapshot != tuple(self.versions[table] for table in tables):
+                return  # --- a table was changed while the rows were read
+            self.discard(key)
+            self.entries[key] = (time.monotonic() + self.ttl, tables, rows)
+            for table in tables:
+                self.by_table.setdefault(table, set()).add(key)
+            while len(self.entries) > self.max_size:
+                self.discard( next(iter(self.entries)) )
+
+    def discard(self, key: tuple):
+        found = self.entries.pop(key, None)
+        if not found:
+            return
+        for table in found[1]:
+            keys = self.by_table.get(table, set())
+            keys.discard(key)
+            if not keys:
+                self.by_table.pop(table, None)
+
+    def invalidate(self, table: str):
+        table = self.table_key(table)
+        with self.lock:
+            self.versions[table] += 1
+            for key in list( self.by_table.get(table, []) ):
+                self.discard(key)
+
+    def info(self) -> dict:
+        return {
+            'hits': self.hits, 'misses': self.misses,
+            'size': len(self.entries), 'max_size': self.max_size,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_table.clear()
+            self.hits = self.misses = 0
+
+
+class ConnectionPool:
+    """
+    A small pool of PEP 249 connections given by `connect()`.
+    The sql of each query shape is rendered once (see `statement`)
+    and every connection keeps its cursors in a StatementCache.
+    """
+    REGEX_DML_TABLE = re.compile(
+        r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|MERGE\s+INTO|REPLACE\s+INTO)\s+([\w.]+)',
+        re.IGNORECASE
+    )
+
+    def __init__(
+        self, connect, max_size: int=8, style: ParamStyle|str=ParamStyle.QMARK,
+        language: QueryLanguage=None, cache_size: int=256, timeout: float=None,
+        result_cache: ResultCache=None
+    ):
+        self.connect = connect
+        self.result_cache = result_cache
+        self.max_size = max_size
+        self.style = ParamStyle(style) if isinstance(style, str) else style
+        self.language = language
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.statements = Registry(max_size=cache_size)
+        self.idle = queue.LifoQueue()
+        self.size = 0
+        self.lock = Lock()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection (StatementCache) -- in case
+        of error, its transaction is rolled back.
+        """
+        with self.lock:
+            create = self.idle.empty() and self.size < self.max_size
+            if create:
+                self.size += 1
+        try:
+            if create:
+                cache = StatementCache(self.connect(), self.cache_size)
+            else:
+                cache = self.idle.get(timeout=self.timeout)
+        except Exception:
+            if create:
+                with self.lock:
+                    self.size -= 1
+            raise
+        try:
+            yield cache
+        except Exception:
+            cache.connection.rollback()
+            raise
+        finally:
+            self.idle.put(cache)
+
+    def close(self):
+        while not self.idle.empty():
+            cache: StatementCache = self.idle.get()
+            cache.clear()
+            cache.connection.close()
+            with self.lock:
+                self.size -= 1
+
+    def statement(self, query: Select) -> tuple:
+        """
+        Returns (fingerprint, sql, params): only the literals are
+        extracted if the same shape was rendered before.
+        """
+        params = []
+        shape = query.conditions_without_literals(params)
+        key = (
+            query.fingerprint(), self.language, Function.dialect, OrderBy.sort,
+            DQL_Object.ALIAS_FUNC, type(query), query.break_lines, query.join_type,
+            query.aka(), *(
+                tuple(shape.get(cmd) or query.values.get(cmd, []))
+                for cmd in KEYWORD
+            )
+        )
+        with self.lock:
+            sql = self.statements.get(key)
+        if sql is None:
+            sql, _ = query.to_params(self.style, self.language)
+            with self.lock:
+                self.statements[key] = sql
+        return key[0], sql, self.style.bind('', params)[1]
+
+    def select(self, query: Select, arraysize: int=500):
+        """
+        Yields the rows of the query, fetching `arraysize` rows
+        at a time -- the connection is borrowed until the end.
+        """
+        fingerprint, sql, params = self.statement(query)
+        results, found = self.result_cache, []
+        if results:
+            key = (sql, tuple(params.items()) if isinstance(params, dict) else tuple(params))
+            rows = results.get(key)
+            if rows is not None:
+                yield from rows
+                return
+            tables = results.tables(query, sql)
+            snapshot = results.snapshot(tables)
+        with self.connection() as cache:
+            cursor = cache.cursor(fingerprint)
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(arraysize)
+                if not rows:
+                    break
+                if results and found is not None:
+                    found += rows
+                    if len(found) > results.max_rows:
+                        found = None
+                yield from rows
+        if results and found is not None:
+            results.put(key, tables, found, snapshot)
+
+    def execute(self, command: DML_Object, commit: bool=True) -> int:
+        count = 0
+        with self.connection() as cache:
+            for text in command.statements():
+                sql, params = command.to_params(self.style, text)
+                cursor = cache.cursor(sql)
+                cursor.execute(sql, params)
+                count += cursor.rowcount
+            if commit:
+                cache.connection.commit()
+        self.invalidate(command.table)
+        return count
+
+    def invalidate(self, table: str):
+        if self.result_cache and table:
+            self.result_cache.invalidate(table)
+
+    def executemany(self, sql: str, rows, batch_size: int=1000, commit: bool=True) -> int:
+        """
+        Runs `sql` for each row of `rows` (any iterable), in
+        batches of `batch_size` -- returns the number of rows.
+        The table changed by `sql` is invalidated in the result cache.
+        """
+        count = 0
+        rows = iter(rows)
+        with self.connection() as cache:
+            cursor = cache.cursor(sql)
+            while True:
+                batch = list( itertools.islice(rows, batch_size) )
+                if not batch:
+                    break
+                cursor.executemany(sql, batch)
+                count += len(batch)
+            if commit:
+                cache.connection.commit()
+        found = self.REGEX_DML_TABLE.match(sql)
+        self.invalidate(found.group(1) if found else '')
+        return count
+
+
+class Descending:
+    """Inverts the comparison of a sort key (ORDER BY ... DESC)"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other: 'Descending') -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: 'Descending') -> bool:
+        return self.value == other.value
+
+
+class RowEngine:
+    """
+    Runs a Select over Python rows (dicts) or CSV files named
+    in FROM, without a database:
+        * hash joins for `JOIN ... ON (a.x = b.y)`;
+        * streaming filters for WHERE;
+        * hash aggregation for GROUP BY / HAVING;
+        * heap-based top-N for ORDER BY + LIMIT.
+    `sources` maps each table to a list of dicts (or a function
+    that returns an iterable of them).
+    """
+    AGGREGATED = '\x00'  # --- key of the aggregated values in a group
+    REGEX_LOGICAL = re.compile(r"('(?:[^']|'')*')|([()])|\b(AND|OR)\b", re.IGNORECASE)
+    REGEX_BETWEEN = re.compile(r"\bBETWEEN\s+('(?:[^']|'')*'|\S+)\s*$", re.IGNORECASE)
+    REGEX_NUMBER = re.compile(r'^[-+]?\d+([.]\d*)?(e[-+]?\d+)?$', re.IGNORECASE)
+    OPERATORS = {
+        '=': operator.eq, '<>': operator.ne, '!=': operator.ne,
+        '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+    }
+
+    def __init__(self, sources: dict=None, folder: str=''):
+        self.sources = sources or {}
+        self.folder = folder
+
+    # ---- Sources: -------------------------------------------
+    def source(self, table: str):
+        found = self.sources.get(table)
+        if found is None:
+            found = self.sources.get( DQL_Object.split_filename(table)[1] )
+        if found is None:
+            return self.read_csv(table)
+        return found() if callable(found) else found
+
+    def read_csv(self, table: str):
+        path = os.path.join(self.folder, table)
+        if not os.path.splitext(path)[1]:
+            path += FileExtension.CSV.value
+        if not os.path.exists(path):
+            raise ValueError(f'There is no source for the table {table}.')
+        with open(path, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                yield {name: self.csv_value(value) for name, value in row.items()}
+
+    @classmethod
+    def csv_value(cls, value: str):
+        if value == '':
+            return None
+        if not cls.REGEX_NUMBER.match(value):
+            return value
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+
+    # ---- Expressions: ---------------------------------------
+    @classmethod
+    def literal(cls, text: str) -> tuple:
+        """Returns (True, value) if the text is a literal"""
+        if text.startswith("'") and text.endswith("'") and len(text) > 1:
+            return True, text[1:-1].replace("''", "'")
+        if text.upper() == 'NULL':
+            return True, None
+        if cls.REGEX_NUMBER.match(text):
+            return True, cls.csv_value(text)
+        return False, None
+
+    @staticmethod
+    def aggregate_key(func_name: str, params) -> str:
+        return '{}({})'.format(func_name.upper(), ', '.join(params))
+
+    def operand(self, text: str):
+        text = text.strip()
+        is_literal, value = self.literal(text)
+        if is_literal:
+            return lambda env: value
+        found = FunctionCall.REGEX.match(text)
+        if found:
+            call: FunctionCall = ClauseNode.parse(CMD_SELECT, text)
+            if call.func_name.upper() not in Aggregator.FUNCTIONS:
+                raise ValueError(f'RowEngine does not run the function {call.func_name}.')
+            key, aggregated = self.aggregate_key(call.func_name, call.params), self.AGGREGATED
+            return lambda env: env[aggregated].get(key)
+        if '.' in text:
+            alias, name = text.split('.', 1)
+            return lambda env: (env.get(alias) or {}).get(name)
+        return lambda env: next(
+            (row[text] for row in env.values() if isinstance(row, dict) and text in row), None
+        )
+
+    # ---- Conditions: ----------------------------------------
+    @classmethod
+    def split_logical(cls, text: str, word: str) -> list:
+        parts, level, start = [], 0, 0
+        for found in cls.REGEX_LOGICAL.finditer(text):
+            _, paren, logical = found.groups()
+            if paren:
+                level += 1 if paren == '(' else -1
+            elif logical and level == 0 and logical.upper() == word:
+                part = text[start:found.start()]
+                if word == 'AND' and cls.REGEX_BETWEEN.search(part):
+                    continue
+                parts.append(part)
+                start = found.end()
+        parts.append(text[start:])
+        return parts
+
+    @classmethod
+    def unwrap(cls, text: str) -> str:
+        text = text.strip()
+        while text.startswith('(') and text.endswith(')'):
+            level = 0
+            for found in cls.REGEX_LOGICAL.finditer(text):
+                paren = found.group(2)
+                if paren:
+                    level += 1 if paren == '(' else -1
+                    if level == 0 and found.end() < len(text):
+                        return text
+            text = text[1:-1].strip()
+        return text
+
+    def predicate(self, text: str):
+        """
+        Compiles a condition to a function of the row (env):
+        the result is None if it is unknown (NULL).
+        """
+        text = self.unwrap(text)
+        for word in ('OR', 'AND'):
+            parts = self.split_logical(text, word)
+            if len(parts) > 1:
+                return self.combine(word, [self.predicate(part) for part in parts])
+        if re.match(r'^NOT\s*[(]', text, re.IGNORECASE):
+            func = self.predicate(text[3:])
+            return lambda env: self.negate( func(env) )
+        node: Predicate = ClauseNode.parse(CMD_WHERE, text)
+        if not node.operator:
+            raise ValueError(f'{self.__class__.__name__} does not evaluate the condition {node.text}.')
+        field, negated = node.field, node.negated
+        if field.upper().endswith(' NOT'):  # --- `field NOT IN/LIKE/BETWEEN ...`
+            field, negated = field[:-4].rstrip(), not negated
+        func = self.comparison(field, node.operator, node.value)
+        if negated:
+            return self.negation(func, field)
+        return func
+
+    @staticmethod
+    def combine(word: str, funcs: list):
+        """Three-valued AND/OR: the result is None (unknown) if it depends on a NULL"""
+        decisive = word == 'OR'  # --- True decides an OR; False decides an AND
+        # ---------------------------------------------------------------------------
+        def result(env: dict):
+            unknown = False
+            for func in funcs:
+                value = func(env)
+                if value is None:
+                    unknown = True
+                elif bool(value) == decisive:
+                    return decisive
+            return None if unknown else not decisive
+        # ---------------------------------------------------------------------------
+        return result
+
+    @staticmethod
+    def negate(value) -> bool:
+        return None if value is None else not value
+
+    def negation(self, func, field: str):
+        return lambda env: self.negate( func(env) )
+
+    def comparison(self, field: str, operator: str, value: str):
+        if operator == 'IS':
+            left, is_null = self.operand(field), value.upper() == 'NULL'
+            return lambda env: (left(env) is None) == is_null
+        if field.startswith('('):
+            fields = FunctionCall.split_params( self.unwrap(field) )
+            values = FunctionCall.split_params( self.unwrap(value) )
+            left = [self.operand(name) for name in fields]
+            right = [self.operand(val) for val in values]
+            get_left = lambda env: tuple(func(env) for func in left)
+            get_right = lambda env: tuple(func(env) for func in right)
+        else:
+            get_left, get_right = self.operand(field), None
+        if operator == 'LIKE':
+            regex = self.like_regex(value)
+            return lambda env: self.compare(get_left(env), regex, lambda a, b: bool(b.match(a)))
+        if operator == 'IN':
+            options = self.options( self.unwrap(value) )
+            found = lambda a, b: a in b or (None if None in b else False)
+            return lambda env: self.compare(get_left(env), options, found)
+        if operator == 'BETWEEN':
+            start, end = [self.operand(val) for val in self.split_logical(value, 'AND')]
+            return lambda env: self.compare(
+                get_left(env), (start(env), end(env)), lambda a, b: b[0] <= a <= b[1]
+            )
+        get_right = get_right or self.operand(value)
+        func = self.OPERATORS[operator]
+        return lambda env: self.compare(get_left(env), get_right(env), func)
+
+    @classmethod
+    def like_regex(cls, value: str):
+        _, pattern = cls.literal(value)
+        return re.compile('^{}$'.format(
+            ''.join(
+                '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+                for char in pattern
+            )
+        ), re.DOTALL)
+
+    @staticmethod
+    def compare(left, right, func):
+        if left is None or right is None:
+            return None
+        if isinstance(left, tuple) and None in left:
+            return None
+        try:
+            return func(left, right)
+        except TypeError:
+            return None
+
+    def options(self, text: str):
+        if re.match(r'^SELECT\b', text, re.IGNORECASE):
+            sub_query: Select = Select.parse(text)[0]
+            return {
+                next(iter(row.values()), None)
+                for row in self.rows(sub_query)
+            }
+        return {self.literal(item)[1] for item in FunctionCall.split_params(text)}
+
+    # ---- Clauses: -------------------------------------------
+    def scan(self, query: Select):
+        main, *joins = query.nodes(CMD_FROM)
+        alias = main.alias or main.table
+        stream = ({alias: row} for row in self.source(main.table))
+        for node in joins:
+            stream = self.hash_join(stream, node)
+        for text in query.values.get(CMD_WHERE, []):
+            func = self.predicate(text)
+            stream = filter(func, stream)
+        return stream
+
+    def hash_join(self, stream, node: Join):
+        if node.join_type not in ('', 'INNER', 'LEFT'):
+            raise ValueError(f'RowEngine does not run {node.join_type} JOIN.')
+        alias = node.alias or node.table
+        build_keys, probe = [], []
+        for equality in self.split_logical( self.unwrap(node.condition), 'AND' ):
+            sides = [side.strip() for side in self.unwrap(equality).split('=')]
+            if len(sides) != 2:
+                raise ValueError(f'RowEngine only joins by equality: {node.condition}.')
+            if not sides[0].startswith(alias + '.'):
+                sides.reverse()
+            if not sides[0].startswith(alias + '.'):
+                raise ValueError(f'Qualify the fields of the join: {node.condition}.')
+            build_keys.append( sides[0].split('.', 1)[1] )
+            probe.append( self.operand(sides[1]) )
+        table = {}
+        for row in self.source(node.table):
+            key = tuple(row.get(name) for name in build_keys)
+            if None not in key:
+                table.setdefault(key, []).append(row)
+        outer = node.join_type == 'LEFT'
+        for env in stream:
+            matches = table.get( tuple(func(env) for func in probe) )
+            if matches:
+                for row in matches:
+                    yield {**env, alias: row}
+            elif outer:
+                yield {**env, alias: None}
+
+    @staticmethod
+    def output_name(node: ClauseNode) -> str:
+        if node.alias:
+            return node.alias
+        if isinstance(node, FunctionCall):
+            return node.text.strip()
+        return node.name
+
+    def aggregate_plan(self, query: Select) -> tuple:
+        """
+        Returns the fields of GROUP BY, the HAVING conditions and
+        the aggregate functions: {key: (func_name, param, distinct)}
+        """
+        group_by, having = [], []
+        for text in query.values.get(CMD_GROUP_BY, []):
+            text, *condition = re.split(r'\s+HAVING\s+', text, maxsplit=1, flags=re.IGNORECASE)
+            group_by.append(text)
+            having += condition
+        calls = {}
+        for text in query.values.get(CMD_SELECT, []) + having:
+            for found in re.finditer(r'(\w+)[(]([^()]*)[)]', text):
+                func_name, params = found.group(1), FunctionCall.split_params(found.group(2))
+                key = self.aggregate_key(func_name, params)
+                if key in calls:
+                    continue
+                if func_name.upper() not in Aggregator.FUNCTIONS:
+                    raise ValueError(f'{self.__class__.__name__} does not run the function {func_name}.')
+                param = params[0] if params and params[0] != '*' else ''
+                found = re.match(r'^DISTINCT\s+(.+)$', param, re.IGNORECASE | re.DOTALL)
+                if found:
+                    param = found.group(1).strip()
+                calls[key] = (func_name.upper(), param, bool(found))
+        return group_by, having, calls
+
+    def aggregate(self, query: Select, stream) -> list:
+        group_by, having, calls = self.aggregate_plan(query)
+        group_by = [self.operand(text) for text in group_by]
+        calls = {
+            key: (func_name, self.operand(param) if param else None, distinct)
+            for key, (func_name, param, distinct) in calls.items()
+        }
+        new_aggregators = lambda: [
+            Aggregator(func_name, distinct) for func_name, _, distinct in calls.values()
+        ]
+        groups = {}
+        for env in stream:
+            key = tuple(func(env) for func in group_by)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = (env, new_aggregators())
+            for aggregator, (_, param, _) in zip(group[1], calls.values()):
+                aggregator.add( param(env) if param else 1 )
+        if not groups and not group_by:
+            groups[()] = ({}, new_aggregators())
+        conditions = [self.predicate(text) for text in having]
+        result = []
+        for env, aggregators in groups.values():
+            env = {**env, self.AGGREGATED: {
+                key: aggregator.result() for key, aggregator in zip(calls, aggregators)
+            }}
+            if all(func(env) for func in conditions):
+                result.append(env)
+        return result
+
+    def project(self, query: Select):
+        getters = []
+        for node in query.nodes(CMD_SELECT):
+            if isinstance(node, Column) and node.name == '*':
+                getters.append( ('*', None) )
+                continue
+            text = node.text
+            if node.alias:
+                text = re.sub(r'\s+as\s+\w+\s*$', '', text, flags=re.IGNORECASE)
+            getters.append( (self.output_name(node), self.operand(text)) )
+        # ---------------------------------------------------------------------------
+        def output(env: dict) -> dict:
+            result = {}
+            for name, func in getters:
+                if func:
+                    result[name] = func(env)
+                    continue
+                for key, row in env.items():
+                    if key != self.AGGREGATED and row:
+                        result.update(row)
+            return result
+        # ---------------------------------------------------------------------------
+        return output
+
+    @staticmethod
+    def sort_plan(query: Select) -> list:
+        """Returns the (field, descending) pairs of ORDER BY"""
+        keys = query.nodes(CMD_ORDER_BY)
+        if not keys:
+            return []
+        descending = [node.descending for node in keys]
+        last = query.values[CMD_ORDER_BY][-1]
+        if OrderBy.sort == SortType.DESC and not re.search(r'\b(ASC|DESC)\s*$', last, re.IGNORECASE):
+            descending[-1] = True  # --- same as QueryLanguage.sort_by
+        return [(node.field.strip(), desc) for node, desc in zip(keys, descending)]
+
+    @staticmethod
+    def limit_plan(query: Select) -> tuple:
+        """Returns the (rows, offset) of LIMIT -- rows is None without it"""
+        found = re.match(
+            r'^\s*(\d+)(?:\s+OFFSET\s+(\d+))?',
+            ' '.join(query.values.get(CMD_LIMIT, [])), re.IGNORECASE
+        )
+        if not found:
+            return None, 0
+        return int(found.group(1)), int(found.group(2) or 0)
+
+    @staticmethod
+    def is_aggregated(query: Select) -> bool:
+        return bool(query.values.get(CMD_GROUP_BY)) or any(
+            isinstance(node, FunctionCall) and node.func_name.upper() in Aggregator.FUNCTIONS
+            for node in query.nodes(CMD_SELECT)
+        )
+
+    def sort_key(self, query: Select, names: set):
+        plan = self.sort_plan(query)
+        if not plan:
+            return None
+        descending = [desc for _, desc in plan]
+        getters = [
+            (field, None if field in names else self.operand(field))
+            for field, _ in plan
+        ]
+        # ---------------------------------------------------------------------------
+        def key(record: tuple) -> tuple:
+            env, out = record
+            result = []
+            for (field, func), desc in zip(getters, descending):
+                value = func(env) if func else out[field]
+                value = (value is not None, value)  # --- NULLs first (last if DESC), as SQLite
+                result.append( Descending(value) if desc else value )
+            return tuple(result)
+        # ---------------------------------------------------------------------------
+        return key
+
+    def rows(self, query: Select):
+        """
+        Yields the result of the query (dicts by field name or alias).
+        """
+        nodes = query.nodes(CMD_SELECT)
+        stream = self.scan(query)
+        if self.is_aggregated(query):
+            stream = self.aggregate(query, stream)
+        output = self.project(query)
+        records = ((env, output(env)) for env in stream)
+        rows, offset = self.limit_plan(query)
+        key = self.sort_key(query, {self.output_name(node) for node in nodes})
+        if key and rows is not None:
+            records = heapq.nsmallest(rows + offset, records, key)[offset:]
+        elif key:
+            records = sorted(records, key=key)[offset:]
+        elif rows is not None:
+            records = itertools.islice(records, offset, offset + rows)
+        for _, out in records:
+            yield out
+
+
+class Aggregator:
+    """State of an aggregate function in a group of RowEngine"""
+    __slots__ = ('func_name', 'count', 'total', 'value', 'mean', 'm2', 'seen')
+    FUNCTIONS = ('SUM', 'AVG', 'MIN', 'MAX', 'COUNT', 'STDDEV')
+
+    def __init__(self, func_name: str, distinct: bool=False):
+        self.func_name = func_name
+        self.count, self.total, self.value = 0, 0, None
+        self.mean = self.m2 = 0.0
+        self.seen = set() if distinct else None
+
+    def add(self, value):
+        if value is None:
+            return
+        if self.seen is not None:  # --- DISTINCT
+            if value in self.seen:
+                return
+            self.seen.add(value)
+        self.count += 1
+        if self.func_name in ('SUM', 'AVG'):
+            self.total += value
+        elif self.func_name == 'MIN':
+            if self.value is None or value < self.value:
+                self.value = value
+        elif self.func_name == 'MAX':
+            if self.value is None or value > self.value:
+                self.value = value
+        elif self.func_name == 'STDDEV':
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+
+    def result(self):
+        if self.func_name == 'COUNT':
+            return self.count
+        if not self.count:
+            return None
+        if self.func_name == 'SUM':
+            return self.total
+        if self.func_name == 'AVG':
+            return self.total / self.count
+        if self.func_name == 'STDDEV':
+            return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else None
+        return self.value
+
+
+class ArrayEngine(RowEngine):
+    """
+    Vectorized version of RowEngine for columnar data:
+    `sources` maps each table to a dict of NumPy arrays.
+        * WHERE/HAVING conditions are pairs of boolean masks
+        (true, unknown), so NULLs follow the three-valued logic;
+        * GROUP BY uses np.unique and the aggregates
+        are ufunc.reduceat over the sorted groups;
+        * ORDER BY + LIMIT uses np.argpartition.
+    Only the main table of FROM is read (no JOINs).
+    """
+    def __init__(self, sources: dict=None, folder: str=''):
+        import numpy  # --- optional dependency
+        super().__init__(sources, folder)
+        self.np = numpy
+
+    def source(self, table: str) -> dict:
+        np = self.np
+        columns = super().source(table)
+        if not isinstance(columns, dict):
+            rows = list(columns)
+            columns = {name: [row.get(name) for row in rows] for name in (rows[0] if rows else [])}
+        return {name: np.asarray(values) for name, values in columns.items()}
+
+    # ---- Masks: ---------------------------------------------
+    def nulls(self, values):
+        np = self.np
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            return np.isnan(values)
+        if values.dtype.kind in 'mM':
+            return np.isnat(values)
+        if values.dtype.kind == 'O':
+            return np.equal(values, None)
+        return np.zeros(values.shape, bool)
+
+    def factorize(self, values, null_code: int=None) -> tuple:
+        """
+        Returns (uniques, codes): the position of each value in the
+        sorted uniques. The NULLs get `null_code` (default: the last one).
+        """
+        np = self.np
+        values = np.asarray(values)
+        if values.dtype.kind in 'biu' and len(values):
+            low, high = int(values.min()), int(values.max())
+            if high - low <= 2 * len(values):  # --- counting instead of sorting
+                present = np.bincount(values - low, minlength=high - low + 1) > 0
+                positions = np.cumsum(present) - 1
+                return np.flatnonzero(present) + low, positions[values - low]
+        valid = ~self.nulls(values)
+        uniques, inverse = np.unique(values[valid], return_inverse=True)
+        codes = np.full(len(values), len(uniques) if null_code is None else null_code, np.int64)
+        codes[valid] = inverse.ravel()
+        return uniques, codes
+
+    def known(self, func, unknown, *values):
+        """Applies `func` only to the positions where no value is NULL"""
+        np = self.np
+        if not unknown.any():
+            return np.broadcast_to( func(*values), unknown.shape )
+        result, valid = np.zeros(len(unknown), bool), ~unknown
+        result[valid] = func(*[
+            value[valid] if np.ndim(value) else value for value in values
+        ])
+        return result
+
+    def unknown(self, env: dict, *operands):
+        np = self.np
+        masks = [self.nulls( np.asarray(func(env)) ) for func in operands]
+        return np.logical_or.reduce(
+            np.broadcast_arrays(*masks, np.zeros(self.size(env), bool))
+        )
+
+    def combine(self, word: str, funcs: list):
+        """Three-valued AND/OR over (true, unknown) pairs of masks"""
+        np = self.np
+        # ---------------------------------------------------------------------------
+        def masks(env: dict) -> tuple:
+            pairs = [func(env) for func in funcs]
+            true = np.logical_and.reduce([t for t, _ in pairs])
+            unknown = np.logical_or.reduce([u for _, u in pairs])
+            if word == 'OR':
+                true = np.logical_or.reduce([t for t, _ in pairs])
+                return true, unknown & ~true
+            false = np.logical_or.reduce([~t & ~u for t, u in pairs])
+            return true, unknown & ~false
+        # ---------------------------------------------------------------------------
+        return masks
+
+    def negate(self, value: tuple) -> tuple:
+        true, unknown = value
+        return ~true & ~unknown, unknown
+
+    def negation(self, func, field: str):
+        return lambda env: self.negate( func(env) )
+
+    def comparison(self, field: str, operator: str, value: str):
+        np = self.np
+        if operator == 'IS':
+            left, is_null = self.operand(field), value.upper() == 'NULL'
+            # ---------------------------------------------------------------------------
+            def is_null_mask(env: dict) -> tuple:
+                nulls = self.unknown(env, left)
+                return (nulls if is_null else ~nulls), np.zeros(len(nulls), bool)
+            # ---------------------------------------------------------------------------
+            return is_null_mask
+        if field.startswith('('):
+            return self.row_values(field, operator, value)
+        left = self.operand(field)
+        if operator == 'LIKE':
+            return self.like(left, value)
+        if operator == 'IN':
+            options = list( self.options( self.unwrap(value) ) )
+            has_null = any(option is None for option in options)
+            options = [option for option in options if option is not None]
+            # ---------------------------------------------------------------------------
+            def in_mask(env: dict) -> tuple:
+                unknown = self.unknown(env, left)
+                true = self.known(lambda a: np.isin(a, options), unknown, left(env))
+                return true, (unknown | ~true) if has_null else unknown
+            # ---------------------------------------------------------------------------
+            return in_mask
+        if operator == 'BETWEEN':
+            start, end = [self.operand(val) for val in self.split_logical(value, 'AND')]
+            # ---------------------------------------------------------------------------
+            def between_mask(env: dict) -> tuple:
+                unknown = self.unknown(env, left, start, end)
+                true = self.known(
+                    lambda a, b, c: (a >= b) & (a <= c), unknown, left(env), start(env), end(env)
+                )
+                return true, unknown
+            # ---------------------------------------------------------------------------
+            return between_mask
+        right, func = self.operand(value), self.OPERATORS[operator]
+        # ---------------------------------------------------------------------------
+        def mask(env: dict) -> tuple:
+            unknown = self.unknown(env, left, right)
+            return self.known(func, unknown, left(env), right(env)), unknown
+        # ---------------------------------------------------------------------------
+        return mask
+
+    def like(self, left, value: str):
+        np = self.np
+        _, pattern = self.literal(value)
+        text = pattern.strip('%')
+        if '%' in text or '_' in text:
+            match = np.frompyfunc(self.like_regex(value).match, 1, 1)
+            func = lambda values: match(values).astype(bool)
+        elif pattern.startswith('%') and pattern.endswith('%') and len(pattern) > 1:
+            func = lambda values: np.char.find(values, text) >= 0
+        elif pattern.endswith('%'):
+            func = lambda values: np.char.startswith(values, text)
+        elif pattern.startswith('%'):
+            func = lambda values: np.char.endswith(values, text)
+        else:
+            func = lambda values: values == text
+        # ---------------------------------------------------------------------------
+        def mask(env: dict) -> tuple:
+            unknown = self.unknown(env, left)
+            return self.known(lambda a: func(a.astype(str)), unknown, left(env)), unknown
+        # ---------------------------------------------------------------------------
+        return mask
+
+    def row_values(self, field: str, operator: str, value: str):
+        """`(a, b) > (x, y)` is `a > x OR (a = x AND b > y)`"""
+        np = self.np
+        left = [self.operand(name) for name in FunctionCall.split_params( self.unwrap(field) )]
+        right = [self.operand(val) for val in FunctionCall.split_params( self.unwrap(value) )]
+        strict = self.OPERATORS[ operator.rstrip('=') or '=' ]
+        # ---------------------------------------------------------------------------
+        def mask(env: dict) -> tuple:
+            unknown = self.unknown(env, *left, *right)
+            values = [func(env) for pair in zip(left, right) for func in pair]
+            # ---------------------------------------------------------------------------
+            def compare(*values):
+                pairs = list( zip(values[::2], values[1::2]) )
+                equal = np.logical_and.reduce([np.asarray(a == b) for a, b in pairs])
+                if operator in ('=', '<>', '!='):
+                    return equal if operator == '=' else ~equal
+                result, prefix = np.asarray(operator.endswith('=')) & equal, True
+                for a, b in pairs:
+                    result = result | (prefix & strict(a, b))
+                    prefix = prefix & (a == b)
+                return result
+            # ---------------------------------------------------------------------------
+            return self.known(compare, unknown, *values), unknown
+        # ---------------------------------------------------------------------------
+        return mask
+
+    def options(self, text: str):
+        if re.match(r'^SELECT\b', text, re.IGNORECASE):
+            sub_query: Select = Select.parse(text)[0]
+            return next(iter( self.columns(sub_query).values() ), [])
+        return super().options(text)
+
+    # ---- Clauses: -------------------------------------------
+    @staticmethod
+    def size(env: dict) -> int:
+        for columns in env.values():
+            for values in columns.values():
+                return len(values)
+        return 0
+
+    @staticmethod
+    def select_rows(env: dict, index) -> dict:
+        return {
+            alias: {name: values[index] for name, values in columns.items()}
+            for alias, columns in env.items()
+        }
+
+    def scan(self, query: Select) -> dict:
+        main, *joins = query.nodes(CMD_FROM)
+        if joins:
+            raise ValueError('ArrayEngine does not run JOINs: use RowEngine.')
+        env = {main.alias or main.table: self.source(main.table)}
+        conditions = [self.predicate(text) for text in query.values.get(CMD_WHERE, [])]
+        if conditions:
+            mask = self.np.logical_and.reduce([func(env)[0] for func in conditions])
+            env = self.select_rows(env, mask)
+        return env
+
+    def aggregate(self, query: Select, env: dict) -> dict:
+        np = self.np
+        group_by, having, calls = self.aggregate_plan(query)
+        size = self.size(env)
+        if group_by:
+            codes = np.zeros(size, np.int64)
+            for text in group_by:
+                uniques, inverse = self.factorize( self.operand(text)(env) )
+                codes = codes * (len(uniques) + 1) + inverse
+                if len(group_by) > 1:
+                    codes = self.factorize(codes)[1]  # --- keeps the codes small
+            if size and codes.max() < 2 ** 16:
+                codes = codes.astype(np.uint16)  # --- the stable sort becomes a radix sort
+            order = np.argsort(codes, kind='stable')
+            codes = codes[order]
+            starts = np.flatnonzero( np.r_[True, codes[1:] != codes[:-1]] ) if size else order
+            first = order[starts]
+        else:
+            order, starts = slice(None), np.zeros(1, np.int64)
+            first = np.zeros(min(size, 1), np.int64)
+        lengths = np.diff( np.r_[starts, size] )
+        # ---------------------------------------------------------------------------
+        def reduce(ufunc, values):
+            if not size:
+                return np.zeros(len(starts), values.dtype)
+            return ufunc.reduceat(values, starts)
+        # ---------------------------------------------------------------------------
+        @lru_cache(maxsize=None)
+        def read(param: str, distinct: bool=False) -> tuple:
+            """(values, valid, counts) -- valid is None if there are no NULLs"""
+            if not param:
+                return np.ones(size), None, lengths
+            values = np.asarray( self.operand(param)(env) )[order]
+            nulls = self.nulls(values)
+            if distinct and size:
+                # --- only the first row of each (group, value) pair is counted:
+                uniques, codes = self.factorize(values)
+                groups = np.repeat(np.arange(len(starts)), lengths)
+                _, first = np.unique(groups * (len(uniques) + 1) + codes, return_index=True)
+                valid = np.zeros(size, bool)
+                valid[first] = True
+                valid &= ~nulls
+                return values, valid, reduce(np.add, valid.astype(np.int64))
+            if not nulls.any():
+                return values, None, lengths
+            return values, ~nulls, lengths - reduce(np.add, nulls.astype(np.int64))
+        # ---------------------------------------------------------------------------
+        results = {}
+        for key, (func_name, param, distinct) in calls.items():
+            values, valid, counts = read(param, distinct)
+            if func_name == 'COUNT':
+                results[key] = counts
+                continue
+            empty = counts == 0
+            if func_name in ('MIN', 'MAX') and values.dtype.kind in 'biuf':
+                ufunc = {'MIN': np.fmin, 'MAX': np.fmax}[func_name]  # --- ignore NaN
+                result = reduce(ufunc, values)
+                results[key] = np.where(empty, np.nan, result) if empty.any() else result
+                continue
+            if func_name in ('MIN', 'MAX'):
+                # --- reduces the ranks of the values, so that works for any sortable type
+                uniques, ranks = self.factorize(values, -1 if func_name == 'MAX' else None)
+                best = reduce(np.maximum if func_name == 'MAX' else np.minimum, ranks)
+                missing = np.nan if values.dtype.kind in 'biuf' else None
+                if not len(uniques):
+                    results[key] = np.full(len(starts), missing)
+                    continue
+                result = uniques[ np.clip(best, 0, len(uniques) - 1) ]
+                results[key] = np.where(empty, missing, result) if empty.any() else result
+                continue
+            filled = values if valid is None else np.where(valid, values, 0)
+            total = reduce(np.add, filled)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if func_name == 'SUM':
+                    result = total
+                elif func_name == 'AVG':
+                    result = total / counts
+                else:  # --- STDDEV (sample)
+                    mean = np.repeat(total / np.maximum(counts, 1), lengths)
+                    deviations = values - mean if valid is None else np.where(valid, values - mean, 0)
+                    squares = reduce(np.add, deviations ** 2)
+                    result = np.sqrt(squares / (counts - 1))
+                    empty = counts < 2
+            results[key] = np.where(empty, np.nan, result) if empty.any() else result
+        env = self.select_rows(env, first)
+        env[self.AGGREGATED] = results
+        conditions = [self.predicate(text) for text in having]
+        if conditions:
+            mask = np.logical_and.reduce([func(env)[0] for func in conditions])
+            env = self.select_rows(env, mask)
+        return env
+
+    def order(self, query: Select, env: dict, output: dict, rows: int=None):
+        """Index of the rows by ORDER BY (only the first `rows` of them)"""
+        np = self.np
+        keys = []
+        for field, desc in self.sort_plan(query):
+            values = output[field] if field in output else self.operand(field)(env)
+            values = np.asarray(values)
+            if desc or values.dtype.kind not in 'biuf' or self.nulls(values).any():
+                # --- NULLs first (last if DESC), as SQLite:
+                _, ranks = self.factorize(values, null_code=-1)
+                values = -ranks if desc else ranks
+            keys.append(values)
+        if not keys:
+            return None
+        size = len(keys[0])
+        if len(keys) == 1 and rows is not None and rows < size:
+            key = keys[0]
+            if not rows:
+                return np.arange(0)
+            # --- the same rows of a stable sort, even with ties in the last position:
+            kth = np.partition(key, rows - 1)[rows - 1]
+            below = np.flatnonzero(key < kth)
+            part = np.sort(np.r_[below, np.flatnonzero(key == kth)[:rows - len(below)]])
+            return part[ np.argsort(key[part], kind='stable') ]
+        return np.lexsort(keys[::-1])[:rows]
+
+    def columns(self, query: Select) -> dict:
+        """
+        Returns the result of the query as arrays by field name or alias.
+        """
+        env = self.scan(query)
+        if self.is_aggregated(query):
+            env = self.aggregate(query, env)
+        output = {
+            name: self.np.broadcast_to(values, self.size(env)) if self.np.ndim(values) == 0 else values
+            for name, values in self.project(query)(env).items()
+        }
+        rows, offset = self.limit_plan(query)
+        index = self.order(query, env, output, None if rows is None else rows + offset)
+        if index is None and rows is not None:
+            index = slice(offset, offset + rows)
+        elif index is not None:
+            index = index[offset:]
+        if index is None:
+            return output
+        return {name: values[index] for name, values in output.items()}
 # ===========================================================================================//
 
 
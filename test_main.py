@@ -4,7 +4,8 @@ from tests.basic import (
     query_reference, two_queries_same_table,
     select_product, extract_subqueries,
     select_expression_field, is_expected_expression, 
-    EXPR_ARR1, EXPR_ARR2, like_conditions
+    EXPR_ARR1, EXPR_ARR2, like_conditions,
+    many_subqueries, keywords_inside_text
 )
 from tests.rules import (
     optimized_select_in,
@@ -35,6 +36,7 @@ from tests.functions import (
     DateDiff_function_variants, function_list,
     create_nested_functions, compare_nested_func_text,
     create_auto_convert_function, compare_auto_convert_text,
+    median_registry, SubString, Sum,
 )
 from tests.cte import(
     basic_recursive_cte, compare_basic_recursive,
@@ -47,9 +49,60 @@ from tests.mix import (
     auto_complete_cypher
 )
 from tests.DML import (
-    compare_insert_from_dict, compare_insert_from_list, compare_insert_from_query
+    compare_insert_from_dict, compare_insert_from_list, compare_insert_from_query,
+    sqlite_batches, dialect_batches, multibyte_rows, Dialect,
+    rows_consumed_by_first_batch, streaming_peak_memory, csv_inserted_rows,
+    bulk_loaded_rows, bulk_load_command, TRICKY_ROWS,
+    bulk_update_values, bulk_update_packets, upsert_values
 )
 from tests.case import range_and_if_found
+from tests.cache import (
+    render_cache_texts, render_state_texts, fingerprint_queries, quoted_name_queries, parse_cache_queries,
+    copy_on_write_queries, shared_lists, held_list_copy
+)
+from tests.params import (
+    select_with_params, same_shape_for_other_values, delete_with_params,
+    function_args_params, rownum_params
+)
+from tests.context import (
+    expected_scripts, concurrent_builds, async_builds,
+    scoped_relationship, scoped_aliases, memory_growth,
+    session_registries, shared_session_builds, ForeignKey, DQL_Object
+)
+from tests.benchmark import wide_select
+from tests.nodes import (
+    sales_with_customer, sales_nodes, prefixed_node,
+    person_query, edit_person_fields, delete_person_fields,
+    same_as_rebuilt, NamedField
+)
+from tests.dialect import (
+    dialect_scripts, concurrent_scripts, top_script,
+    non_date_literal, cte_script, bigquery_count, traffic_query,
+    LANGUAGES, OracleLanguage, PostgreLanguage, MySqlLanguage, BigQueryLanguage,
+    Function, CMD_LIMIT
+)
+from tests.samples import PARSED_SAMPLES, parsed_sample, parsed_values
+from tests.pagination import (
+    orders_database, all_pages, ordered_rows, cursor_round_trip, oracle_limits,
+    seek_conditions, SqlServerSelect,
+)
+from tests.executor import (
+    executor_values, result_cache_values, upsert_invalidation, upsert_statements,
+    split_orders, split_rows, split_without_bounds, split_into
+)
+from tests.engine import (
+    engine_comparisons, seek_rows, left_join_rows, csv_rows, sub_query_rows,
+    null_logic_rows, count_distinct_rows, array_engine_comparisons,
+    array_deviations, array_null_logic_rows, array_count_distinct_rows, evaluate_clauses,
+    sorted_rows, parsed_rows, parsed_array_rows, sales_with_nulls,
+    evaluate_array_clauses
+)
+from tests.compiled import (
+    compiled_functions, compile_to_sql, case_sensitive_functions,
+    compiled_pandas_results, compiled_polars_results,
+    lazy_script_lines, lazy_files, compiled_lazy_frames,
+    PolarsLazyLanguage, LanguageEnum
+)
 
 
 _best_movies = best_movies()
@@ -332,4 +385,561 @@ def test_function_list():
     assert function_list() == expected
 
 def test_window_func_with_formula():
-    assert window_func_with_formula()
\ No newline at end of file
+    assert window_func_with_formula()
+
+def test_render_cache():
+    first, same_text, same_version, after_delete, after_call, after_append = render_cache_texts()
+    assert same_text == first
+    assert same_version
+    assert 'region' in first and 'region' not in after_delete
+    assert 'c.age > 18' in after_call
+    assert 'c.birth' in after_append
+
+def test_render_cache_state():
+    texts = render_state_texts()
+    assert "DATE '2024-01-01'" in texts['date']
+    assert "DATE '2024-01-01'" not in texts['text']
+    assert texts['shown'] != texts['hidden']
+    assert 'amount' not in texts['hidden'] and 'amount' in texts['changed']
+
+def test_select_params():
+    sql, params = select_with_params('numeric')
+    assert params == ['%Jo%', 1, 2, 18, 65]
+    assert 'c.region IN (:2,:3)' in sql
+
+def test_params_same_shape():
+    assert same_shape_for_other_values()
+
+def test_params_keep_function_args():
+    sql, params = function_args_params()
+    assert params == [10.5, 'x', 1, 2]
+    assert 'Round(p.price, 2) > ?' in sql
+    assert "Coalesce(p.name, 'none') <> ?" in sql
+    sql, params = rownum_params()
+    assert params == [5]
+    assert sql.endswith('FETCH FIRST 10 ROWS ONLY')
+
+def test_dml_params():
+    sql, params = delete_with_params()
+    assert params == {'p1': 5, 'p2': '%a%'}
+    assert 'serial_number = :p1' in sql
+
+def test_fingerprint():
+    q1, q2, q3, q4 = fingerprint_queries()
+    assert q1.fingerprint() == q2.fingerprint()
+    assert q1.fingerprint() != q3.fingerprint()
+    assert q1.fingerprint() != q4.fingerprint()
+    assert q1 == q1.copy()
+    assert q1 != q3
+
+def test_fingerprint_quotes():
+    literal, name = quoted_name_queries()
+    assert literal == name
+    assert literal.fingerprint() != name.fingerprint()
+
+def test_many_subqueries():
+    conditions = many_subqueries(300)
+    assert len(conditions) == 301
+    assert conditions[0].strip() == 'x.c > 1'
+    assert conditions[-1].startswith('f299 IN (SELECT t299.id')
+
+def test_keywords_inside_text():
+    values = keywords_inside_text()
+    assert values['SELECT'] == ['c.name', 'c.note']
+    assert values['WHERE'][0] == "c.note = 'from where to where' "
+    assert values['WHERE'][1].startswith('NOT c.id IN (SELECT o.customer')
+
+def test_parse_samples():
+    for file_name, expected in PARSED_SAMPLES.items():
+        assert parsed_sample(file_name) == expected, file_name
+
+def test_parse_strings_and_comments():
+    values, = parsed_values("SELECT t.id, 'a, b' as s FROM T t WHERE t.x = 'a and b'")
+    assert values['SELECT'] == ['t.id', "'a, b' as s"]
+    assert [cond.strip() for cond in values['WHERE']] == ["t.x = 'a and b'"]
+    values, = parsed_values('SELECT t.id FROM T t WHERE t.x = 1 -- tail')
+    assert [cond.strip() for cond in values['WHERE']] == ['t.x = 1']
+    values, = parsed_values('SELECT t.id FROM T t WHERE t.a BETWEEN 1 AND 5 AND (t.b = 1 AND t.c = 2)')
+    assert [cond.strip() for cond in values['WHERE']] == ['t.a BETWEEN 1 AND 5', '(t.b = 1 AND t.c = 2)']
+
+def test_parse_cache():
+    info, second, reparsed, relationship = parse_cache_queries()
+    assert (info['hits'], info['misses']) == (1, 1)
+    assert 'c.name' in second[0].values['SELECT']
+    assert second == reparsed
+    assert relationship == ('customer', '')
+
+def test_concurrent_builds():
+    expected = expected_scripts(12)
+    results, before, after = concurrent_builds(2000)
+    for index, script in results:
+        assert script == expected[index % 12], index
+    assert after == before
+
+def test_async_builds():
+    assert async_builds(200)
+
+def test_scoped_registries():
+    inside, before, after = scoped_relationship()
+    assert inside == ('pro_id', '')
+    assert after == before
+    assert scoped_aliases() == scoped_aliases()
+    assert 'Category' not in str(DQL_Object.catalog)
+    assert DQL_Object.ALIAS_FUNC is None
+
+def test_flat_memory():
+    assert memory_growth(1500) < 10_000
+
+def test_session_registries():
+    global_size = len(ForeignKey.references)
+    size, last, cleared = session_registries(500, 50)
+    assert size == 50
+    assert last is not None
+    assert cleared == 0
+    assert len(ForeignKey.references) == global_size
+
+def test_shared_session_threads():
+    scripts = shared_session_builds(400)
+    assert len(scripts) == 400
+    assert all(f'Sales{i}' in script for i, script in enumerate(scripts))
+
+def test_copy_on_write():
+    query, copied, other, text, expected = copy_on_write_queries()
+    assert str(copied.copy()) != text
+    assert str(query) == str(expected)
+    assert 's.region = 3' in str(copied)
+    assert 's.region' in str(copied).split('FROM')[0]
+    assert 'col0 > 0' in str(other)
+    assert 's.region' not in str(other)
+
+def test_copy_shares_lists():
+    read_again, where, copied_where = shared_lists()
+    assert read_again is where
+    assert copied_where is where
+
+def test_held_list_after_copy():
+    fields, copied_fields, copied_text = held_list_copy()
+    assert 's.secret' in fields
+    assert 's.secret' not in copied_fields
+    assert 's.secret' not in copied_text
+
+def test_clause_nodes():
+    nodes = sales_nodes()
+    func, field, _ = nodes['SELECT']
+    main, join = nodes['FROM']
+    condition, negated = nodes['WHERE']
+    sort_key, = nodes['ORDER BY']
+    assert (func.func_name, func.params, func.alias) == ('Sum', ('s.amount',), 'total')
+    assert (field.table, field.name, field.alias) == ('s', 'amount', '')
+    assert (main.table, main.alias, main.join_type) == ('Sales', 's', '')
+    assert (join.table, join.alias, join.condition) == ('Customer', 'c', '(s.cus = c.id)')
+    assert (condition.field, condition.operator, condition.value) == ('s.id', 'IN', '(1,2)')
+    assert negated.negated and negated.operator == 'LIKE'
+    assert (sort_key.field, sort_key.descending) == ('region', True)
+    assert sales_nodes()['WHERE'][0] is condition
+    query = sales_with_customer()
+    assert query.has_named_field('total')
+    assert not query.has_named_field('amount')
+
+def test_node_prefixes():
+    node = prefixed_node('Sum(sc.amount * c.rate) AS total')
+    assert node.has_prefix('sc') and node.has_prefix('c')
+    assert not node.has_prefix('s')
+    assert prefixed_node('Sum(sc.amount * c.rate) AS total') is node
+
+def test_clause_index():
+    query = person_query()
+    assert query.has_named_field('full_name')
+    edit_person_fields(query)
+    assert query.has_named_field('nick')
+    assert query.has_named_field('birthday')
+    assert not query.has_named_field('full_name')
+    assert same_as_rebuilt(query, 'SELECT')
+    delete_person_fields(query)
+    assert not query.has_named_field('birthday')
+    assert same_as_rebuilt(query, 'SELECT')
+    copied = query.copy()
+    copied(weight=NamedField('kg'))
+    assert copied.has_named_field('kg')
+    assert not query.has_named_field('kg')
+
+def test_wide_select():
+    query = wide_select(300)
+    assert len(query.values['SELECT']) == 300
+    assert query.has_named_field('c297')
+
+def test_function_registry():
+    assert Function.find('substr', Dialect.ORACLE) is SubString
+    assert Function.find('SUM') is Sum
+    assert Function.find('unknown_func') is None
+    assert [
+        SubString.name(dialect) for dialect in (Dialect.ANSI, Dialect.ORACLE)
+    ] == ['SubString', 'Substr']
+
+def test_median_registry():
+    median, found, is_descendant, name = median_registry()
+    assert found is median
+    assert is_descendant
+    assert name == 'Percentile_Median'
+    assert Function.find('percentile_median') is None
+    assert median not in Function.descendants()
+
+def test_dialect_languages():
+    dialect = Function.dialect
+    scripts = dialect_scripts()
+    assert 'Substr(t.name, 1, 3)' in scripts[OracleLanguage]
+    assert 'Substr(t.name, 1, 3)' in scripts[MySqlLanguage]
+    assert scripts[OracleLanguage].endswith('OFFSET 20 ROWS FETCH NEXT 10 ROWS ONLY')
+    assert 'LIMIT' not in scripts[OracleLanguage]
+    assert scripts[PostgreLanguage].split()[-3:] == ['10', 'OFFSET', '20']
+    assert Function.dialect == dialect
+    assert traffic_query(20).values[CMD_LIMIT] == ['10 OFFSET 20']
+
+def test_dialect_top():
+    top = top_script()
+    assert 'TOP(10) t.event_date' in top
+    assert 'LIMIT' not in top
+
+def test_dialect_date_literals():
+    scripts = dialect_scripts()
+    for lang, prefix in [
+        (OracleLanguage, 'TIMESTAMP'), (PostgreLanguage, 'TIMESTAMP'),
+        (BigQueryLanguage, 'DATETIME'),
+    ]:
+        assert f"{prefix} '2024-10-03 00:00:00'" in scripts[lang]
+    script = non_date_literal()
+    assert "t.code = '2024-10-03'" in script
+    assert "DATE '2024-10-03'" not in script
+
+def test_dialect_concurrent():
+    expected = [traffic_query(20).translate_to(lang) for lang in LANGUAGES]
+    assert concurrent_scripts() == expected * 20
+
+def test_dialect_keeps_cte():
+    script = cte_script()
+    assert script.startswith('WITH Recent AS (')
+    assert 'Substr(' in script
+
+def test_bigquery_count():
+    script = bigquery_count()
+    assert 'COUNT(*) as n' in script
+    assert 'APPROX_COUNT_DISTINCT' not in script
+
+def test_insert_batches():
+    scripts, statements, counts = sqlite_batches()
+    assert len(scripts) == 8
+    assert counts == (5000, 2500)
+    assert len({sql for sql, _ in statements[:-1]}) == 1
+
+def test_insert_batches_dialects():
+    sql_server = dialect_batches(Dialect.SQL_SERVER, ({'id': i} for i in range(2500)), 'Numbers')
+    assert [s.count('\n\t(') for s in sql_server] == [1000, 1000, 500]
+    oracle = dialect_batches(Dialect.ORACLE)[0]
+    assert oracle.startswith('INSERT ALL')
+    assert oracle.count('INTO Customer') == 1000
+    assert oracle.endswith('SELECT 1 FROM DUAL;')
+
+def test_insert_batches_packet():
+    mysql = dialect_batches(Dialect.MYSQL, max_bytes=4096)
+    assert all(len(s) <= 4096 for s in mysql)
+    assert sum(s.count('\n\t(') for s in mysql) == 2500
+    mysql = dialect_batches(Dialect.MYSQL, multibyte_rows(500), max_bytes=4096)
+    assert all(len(s.encode('utf-8')) <= 4096 for s in mysql)
+    assert sum(s.count('\n\t(') for s in mysql) == 500
+
+def test_batches_row_too_big():
+    import pytest
+    with pytest.raises(ValueError):
+        dialect_batches(Dialect.ANSI, max_params=2)
+    with pytest.raises(ValueError):
+        bulk_update_packets(max_params=4)
+
+def test_streaming_insert():
+    assert rows_consumed_by_first_batch() == 101
+    assert streaming_peak_memory() < 1_000_000
+    assert csv_inserted_rows() == [
+        ('A1', 'Bolt, "large"', '0.5'), ('B2', "Nut's", None), ('C3', 'Washer', '0.1'),
+    ]
+
+def test_bulk_load():
+    import pytest
+    for dialect, rows in bulk_loaded_rows().items():
+        assert rows == TRICKY_ROWS, dialect.name
+    assert bulk_load_command(Dialect.POSTGRESQL) == 'COPY Note (id, name, note) FROM STDIN;'
+    with pytest.raises(ValueError):
+        bulk_load_command(Dialect.ORACLE)
+
+def test_bulk_update():
+    result = bulk_update_values()
+    assert len(result['scripts']) == 8  # --- 999 // 5 params = 199 rows
+    assert result['renamed'] == (1500,)
+    assert result['cleared'] == (1500,)
+    assert 'AS v (id, name, price)\nWHERE t.id = v.id' in result['postgres']
+    assert len(result['sql_server']) == 3
+    assert all(script.startswith('MERGE INTO Product AS t') for script in result['sql_server'])
+
+def test_bulk_update_packet():
+    mysql = bulk_update_packets(4096)
+    assert len(mysql) > 1
+    assert all(len(script.encode('utf-8')) <= 4096 for script in mysql)
+    assert sum(script.count(' WHEN ') for script in mysql) == 2 * 500
+
+def test_upsert():
+    result = upsert_values()
+    assert len(result['statements']) == 5  # --- 999 // 4 fields = 249 rows
+    assert result['upserted'] == (1000, 2000, 1000)
+    assert result['single'] == ('Seven', 2)
+    assert 'ON (target.id = source.id)' in result['merge']
+    assert 'WHEN NOT MATCHED THEN INSERT' in result['merge']
+    assert 'ON DUPLICATE KEY UPDATE driver_licence = VALUES(driver_licence)' in result['mysql']
+
+def test_upsert_packet():
+    packets = upsert_values()['packets']
+    assert len(packets) > 1
+    assert all(len(script.encode('utf-8')) <= 4096 for script in packets)
+    assert sum(script.count('\n\t(') for script in packets) == 500
+
+def test_pagination():
+    conn = orders_database()
+    expected = ordered_rows(conn, 'customer, id')
+    assert all_pages(conn, 'customer, id', Dialect.ANSI) == expected
+    assert all_pages(conn, 'customer, id', Dialect.SQL_SERVER) == expected
+    assert all_pages(conn, 'amount DESC, id', Dialect.POSTGRESQL) == ordered_rows(conn, 'amount DESC, id')
+    assert all_pages(conn, 'customer ASC, id asc', None) == expected
+    assert cursor_round_trip(['a', 1]) == ['a', 1]
+    rownum, fetch = oracle_limits()
+    assert rownum == ['ROWNUM <= 10']
+    assert fetch.endswith('OFFSET 20 ROWS FETCH NEXT 10 ROWS ONLY')
+
+def test_pagination_default_language():
+    row_value = "(o.customer, o.id) > ('customer 3', 10)"
+    expanded = "((o.customer > 'customer 3') OR (o.customer = 'customer 3' AND o.id > 10))"
+    after = ['customer 3', 10]
+    assert seek_conditions('customer ASC, id', after) == [row_value]
+    assert seek_conditions('customer, id', after, SqlServerSelect) == [expanded]
+    assert seek_conditions('customer asc, id ASC', after, SqlServerSelect) == [expanded]
+
+
+def test_executor():
+    result = executor_values()
+    assert result['inserted'] == 5000
+    assert result['ids'] == list(range(100, 201))
+    assert result['updated'] == 10
+    assert result['pool_size'] == 0
+    assert result['statements'] == 3  # --- 2 orders of conditions + lost
+    for n, ids in enumerate(result['pages'], 1):
+        assert ids == list(range(n * 10, n * 10 + 11)), n
+    assert result['lost'] == []
+
+def test_split():
+    import pytest
+    path, parts, expected = split_orders()
+    assert [len(queries) for queries in parts.values()] == [8, 12, 6]
+    for name, queries in parts.items():
+        assert split_rows(path, queries) == expected, name
+    with pytest.raises(ValueError):
+        split_without_bounds()
+    for parts in (0, -1):
+        with pytest.raises(ValueError):
+            split_into(parts)
+    assert len(split_into(1)) == 1
+
+def test_result_cache():
+    result = result_cache_values()
+    assert result['hits'] == 1
+    assert result['first'] == result['second']
+    assert len(result['first']) == 10
+    assert len(result['after_update']) == 5
+    assert result['cached_after_update'] == 1  # --- only `cheap` read a table not changed
+    assert result['new_sales'] == [(2,)]
+    assert result['size'] == 3
+    assert result['expired'] == 1
+
+def test_upsert_invalidates_cache():
+    table, before, after = upsert_invalidation()
+    assert table == 'Product'
+    assert (1,) not in before
+    assert (1,) in after
+
+def test_upsert_statements():
+    statements, count, stored = upsert_statements()
+    assert statements == 2
+    assert count == 12000
+    assert stored == (12000, 0)
+
+def test_engine():
+    for name, (rows, expected) in engine_comparisons().items():
+        assert rows, name
+        assert rows == expected, name
+
+def test_engine_seek():
+    rows, expected = seek_rows()
+    assert rows == expected
+
+def test_engine_left_join():
+    rows, expected = left_join_rows()
+    assert rows == expected
+
+def test_engine_csv():
+    rows, expected = csv_rows()
+    assert rows == expected
+
+def test_engine_sub_query():
+    rows, expected = sub_query_rows()
+    assert sorted_rows(rows) == sorted_rows(expected)
+
+def test_engine_parsed_aggregates():
+    for script in (
+        'SELECT c.region, Count(c.id) AS customers FROM Customer c GROUP BY c.region',
+        'SELECT Sum(s.amount) AS total, Count(*) AS n FROM Sales s',
+    ):
+        rows, expected = parsed_rows(script)
+        assert sorted_rows(rows) == sorted_rows(expected), script
+
+def test_engine_nulls_order():
+    data = sales_with_nulls()
+    for script in (
+        'SELECT s.id, s.amount FROM Sales s ORDER BY s.amount DESC LIMIT 5',
+        'SELECT s.id, s.amount FROM Sales s ORDER BY s.amount, s.id LIMIT 5',
+    ):
+        rows, expected = parsed_rows(script, data)
+        assert rows == expected, script
+
+def test_engine_null_logic():
+    rows, expected = null_logic_rows('NOT (t.x > 0 AND t.y > 2)')
+    assert rows == expected == [{'y': 1}]
+    rows, expected = null_logic_rows('NOT (t.x > 1 AND t.y > 4)')
+    assert rows == expected == [{'y': 1}, {'y': 3}]
+    rows, expected = null_logic_rows('NOT (t.x > 0 OR t.y < 2)')
+    assert rows == expected == []
+    rows, expected = null_logic_rows('NOT t.x IN (1, NULL)')
+    assert rows == expected == []
+
+def test_engine_unsupported():
+    import pytest
+    for join in (
+        'RIGHT JOIN Sales s ON (c.id = s.customer)',
+        'JOIN Sales s ON (c.id > s.customer)',
+        'JOIN Sales s ON (id = customer)',
+    ):
+        with pytest.raises(ValueError):
+            evaluate_clauses('c.name', join)
+    with pytest.raises(ValueError):
+        evaluate_clauses('Median(c.id) as m')
+
+def test_engine_count_distinct():
+    _, rows, expected = count_distinct_rows()
+    assert rows == expected == [{'n': 2, 'total': 9}]
+
+def test_array_engine():
+    import pytest
+    pytest.importorskip('numpy')
+    for name, (rows, expected) in array_engine_comparisons().items():
+        assert rows, name
+        assert rows == expected, name
+
+def test_array_engine_std_dev():
+    import pytest
+    pytest.importorskip('numpy')
+    deviations, expected = array_deviations()
+    for customer, deviation in expected.items():
+        assert abs(deviations[customer] - deviation) < 1e-9
+
+def test_array_engine_null_logic():
+    import pytest
+    pytest.importorskip('numpy')
+    for condition in (
+        'NOT (t.x > 0 AND t.y > 2)', 'NOT (t.x > 1 AND t.y > 4)',
+        'NOT (t.x > 0 OR t.y < 2)', 'NOT t.x IN (1, NULL)', 'NOT t.k = 1',
+    ):
+        rows, expected = array_null_logic_rows(condition)
+        assert rows == expected, condition
+
+def test_array_engine_count_distinct():
+    import pytest
+    pytest.importorskip('numpy')
+    rows, expected, grouped, grouped_expected = array_count_distinct_rows()
+    assert rows == expected == [{'n': 2, 'total': 9}]
+    assert grouped == grouped_expected
+
+def test_array_engine_parsed_aggregates():
+    import pytest
+    pytest.importorskip('numpy')
+    for script in (
+        'SELECT c.region, Count(c.id) AS customers FROM Customer c GROUP BY c.region',
+        'SELECT Sum(s.amount) AS total, Count(*) AS n FROM Sales s',
+    ):
+        rows, expected = parsed_array_rows(script)
+        assert sorted_rows(rows) == sorted_rows(expected), script
+
+def test_array_engine_nulls_order():
+    import pytest
+    pytest.importorskip('numpy')
+    data = sales_with_nulls()
+    for script in (
+        'SELECT s.id, s.amount FROM Sales s ORDER BY s.amount DESC LIMIT 5',
+        'SELECT s.id, s.amount FROM Sales s ORDER BY s.amount, s.id LIMIT 5',
+    ):
+        rows, expected = parsed_array_rows(script, data)
+        assert rows == expected, script
+
+def test_array_engine_unsupported():
+    import pytest
+    pytest.importorskip('numpy')
+    with pytest.raises(ValueError):
+        evaluate_array_clauses('c.name', 'JOIN Sales s ON (c.id = s.customer)')
+    with pytest.raises(ValueError):
+        evaluate_array_clauses('Median(c.id) as m')
+
+def test_compiled_cache():
+    import pytest
+    funcs = compiled_functions()
+    assert funcs['same_query'] is funcs['first']
+    assert funcs['other_literals'] is not funcs['first']
+    assert funcs['other_language'] is not funcs['first']
+    assert [table for table, *_ in funcs['first'].tables] == ['Sales', 'Product']
+    with pytest.raises(ValueError):
+        compile_to_sql()
+
+def test_compiled_case_sensitive():
+    lower, upper = case_sensitive_functions()
+    assert lower is not upper
+    assert "'name'" in lower.script
+    assert "'Name'" in upper.script
+
+def test_compiled_pandas():
+    import pytest
+    pytest.importorskip('pandas')
+    rows, totals = compiled_pandas_results()
+    assert rows == {'customer': [1, 1, 1], 'name': ['pen', 'ink', 'pen']}
+    assert totals == {0: 180.0, 1: 220.0, 2: 150.0}
+
+def test_compiled_polars():
+    import pytest
+    pytest.importorskip('polars')
+    rows, totals = compiled_polars_results()
+    assert rows == {'customer': [1, 1, 1], 'name': ['pen', 'ink', 'pen']}
+    assert totals == {'customer': [0, 1, 2], 'amount': [180.0, 220.0, 150.0]}
+
+def test_lazy_script():
+    lines = lazy_script_lines()
+    script = '\n'.join(lines)
+    assert "df_Sales = pl.scan_parquet('data/Sales.parquet')" in lines
+    assert "df_Product = pl.scan_csv('data/Product.csv')" in lines
+    assert 'read_' not in script
+    assert script.index('.join(') < script.index('.collect(')
+    assert lines[-1] == f'df = df{PolarsLazyLanguage.COLLECT}'
+    assert LanguageEnum.by_name('Polars') == LanguageEnum.Polar
+
+def test_compiled_lazy():
+    import os, pytest, tempfile
+    pytest.importorskip('polars')
+    expected = {'customer': [1, 1, 1], 'name': ['pen', 'ink', 'pen']}
+    from_files, from_frames, plan = compiled_lazy_frames( lazy_files() )
+    assert from_files == from_frames == expected
+    assert 'SELECTION: (col("amount") > 30' in plan
+    # --- a folder whose name contains "on" is not a JOIN ... ON:
+    folder = os.path.join(tempfile.mkdtemp(), 'online')
+    os.makedirs(folder)
+    from_files, _, _ = compiled_lazy_frames( lazy_files(folder) )
+    assert from_files == expected
@@ -1,5 +1,5 @@
 import re
-from sql_blocks import detect, Insert
+from sql_blocks import detect, Insert, Dialect
 from tests.util import (
     create_public_schema, 
     remove_public_schema
@@ -69,3 +69,200 @@ def compare_insert_from_list() -> bool:
     txt1 = remove_spaces( str(insert_from_list()) )
     txt2 = remove_spaces( text_insert_from_list() )
     return SequenceMatcher(None, txt1, txt2).ratio() > 0.66
+
+def customer_rows(count: int) -> list:
+    return [
+        (f'{i:03}.{i:03}.00-00', f"Customer {i}'s name", i % 5)
+        for i in range(count)
+    ]
+
+BATCH_FIELDS = ['driver_licence', 'name', 'region']
+
+def sqlite_batches() -> tuple:
+    import sqlite3
+    from sql_blocks import Dialect, ParamStyle
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE Customer (driver_licence, name, region)')
+    rows = customer_rows(2500)
+    scripts = list(Insert.batches(
+        rows, 'Customer', BATCH_FIELDS, max_params=999, dialect=Dialect.ANSI
+    ))
+    for script in scripts:
+        conn.execute(script)
+    statements = list(Insert.batches(
+        rows, 'Customer', BATCH_FIELDS, max_params=999,
+        dialect=Dialect.ANSI, style=ParamStyle.QMARK
+    ))
+    for sql, params in statements:
+        conn.execute(sql, params)
+    return scripts, statements, conn.execute(
+        'SELECT Count(*), Count(DISTINCT name) FROM Customer'
+    ).fetchone()
+
+def dialect_batches(dialect, rows=None, table: str='Customer', **limits) -> list:
+    rows = customer_rows(2500) if rows is None else rows
+    fields = BATCH_FIELDS if table == 'Customer' else None
+    return list( Insert.batches(rows, table, fields, dialect=dialect, **limits) )
+
+def multibyte_rows(count: int) -> list:
+    return [(f'{i:013d}', 'José Ação ' * 5, i % 4) for i in range(count)]
+
+def rows_consumed_by_first_batch() -> int:
+    consumed = []
+    def lazy_rows(count: int):
+        for i in range(count):
+            consumed.append(i)
+            yield {'id': i, 'name': f'item {i}'}
+    statements = Insert.batches(lazy_rows(10_000), 'Item', max_rows=100)
+    next(statements)
+    return len(consumed)
+
+def streaming_peak_memory() -> int:
+    import tracemalloc
+    from sql_blocks import ParamStyle
+    tracemalloc.start()
+    for _ in Insert.batches(
+        ((i, f'item {i}') for i in range(50_000)), 'Item', ['id', 'name'],
+        max_rows=500, style=ParamStyle.QMARK
+    ):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def csv_inserted_rows() -> list:
+    import csv, io, sqlite3
+    source = io.StringIO()
+    writer = csv.writer(source)
+    writer.writerow(['code', 'description', 'price'])
+    writer.writerows([
+        ('A1', 'Bolt, "large"', '0.5'), ('B2', "Nut's", ''), ('C3', 'Washer', '0.1'),
+    ])
+    source.seek(0)
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE Part (code, description, price)')
+    for sql, params in Insert.from_csv(
+        source, 'Part', max_rows=2, dialect=Dialect.ANSI, style='qmark'
+    ):
+        conn.execute(sql, params)
+    return conn.execute('SELECT * FROM Part ORDER BY code').fetchall()
+
+TRICKY_ROWS = [
+    (1, 'tab\there', 'line\nbreak'),
+    (2, 'back\\slash \\N', 'carriage\r\nreturn'),
+    (3, 'quote " and \'', ''),
+    (4, None, 'ação, 日本'),
+]
+
+def decode_text_line(line: str) -> list:
+    ESCAPES = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r'}
+    return [
+        None if field == '\\N' else re.sub(
+            r'\\(.)', lambda found: ESCAPES[found.group(1)], field
+        )
+        for field in line.rstrip('\n').split('\t')
+    ]
+
+def bulk_loaded_rows() -> dict:
+    """The rows loaded back from the data file of each dialect"""
+    import csv, io, sqlite3
+    FIELDS = ['id', 'name', 'note']
+    conn = sqlite3.connect(':memory:')
+    result = {}
+    for dialect in (Dialect.POSTGRESQL, Dialect.MYSQL, Dialect.SQL_SERVER):
+        command, lines = Insert.bulk_load(
+            TRICKY_ROWS, 'Note', FIELDS, dialect=dialect, file_name='/tmp/note.dat'
+        )
+        payload = ''.join(lines)
+        if dialect == Dialect.SQL_SERVER:
+            records = [
+                [None if field == '' else field for field in record]
+                for record in csv.reader(io.StringIO(payload, newline=''))
+            ]
+            records[2][2] = ''  # --- csv.reader does not tell "" from NULL
+        else:
+            records = [decode_text_line(line) for line in payload.splitlines(True)]
+        table = f'Note_{dialect.name}'
+        conn.execute(f'CREATE TABLE {table} (id INTEGER, name, note)')
+        conn.executemany(f'INSERT INTO {table} VALUES (?, ?, ?)', records)
+        result[dialect] = conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+    return result
+
+def bulk_load_command(dialect: Dialect) -> str:
+    command, _ = Insert.bulk_load([], 'Note', ['id', 'name', 'note'], dialect=dialect)
+    return command
+
+def bulk_update_values() -> dict:
+    import sqlite3
+    from sql_blocks import Update
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE Product (id INTEGER PRIMARY KEY, name, price)')
+    conn.executemany(
+        'INSERT INTO Product VALUES (?, ?, ?)',
+        [(i, f'product {i}', 1.0) for i in range(3000)]
+    )
+    records = [
+        {'id': i, 'name': f"product {i}'s new name", 'price': i * 0.5}
+        for i in range(0, 3000, 2)
+    ]
+    scripts = list(Update.bulk(
+        records, 'id', 'Product', max_params=999, dialect=Dialect.ANSI
+    ))
+    for script in scripts:
+        conn.execute(script)
+    result = {'scripts': scripts, 'renamed': conn.execute(
+        "SELECT Count(*) FROM Product WHERE name LIKE '%new name'"
+    ).fetchone()}
+    records = [{'id': i, 'name': None, 'price': 0} for i in range(1, 3000, 2)]
+    for sql, params in Update.bulk(
+        records, 'id', 'Product', dialect=Dialect.ANSI, style='qmark'
+    ):
+        conn.execute(sql, params)
+    result['cleared'] = conn.execute(
+        'SELECT Count(*) FROM Product WHERE name IS NULL AND price = 0'
+    ).fetchone()
+    result['postgres'] = next(Update.bulk(records, 'id', 'Product', dialect=Dialect.POSTGRESQL))
+    result['sql_server'] = list(Update.bulk(records, 'id', 'Product', dialect=Dialect.SQL_SERVER))
+    return result
+
+def bulk_update_packets(max_bytes: int=4096, **limits) -> list:
+    from sql_blocks import Update
+    records = [
+        {'id': i, 'name': 'José Ação ' * 5, 'price': i * 0.5}
+        for i in range(500)
+    ]
+    return list(Update.bulk(
+        records, 'id', 'Product', max_bytes=max_bytes, dialect=Dialect.MYSQL, **limits
+    ))
+
+def upsert_values() -> dict:
+    import sqlite3
+    from sql_blocks import Upsert
+    create_public_schema()
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE Customer (id INTEGER PRIMARY KEY, driver_licence, name, region)')
+    conn.executemany(
+        'INSERT INTO Customer VALUES (?, ?, ?, ?)',
+        [(i, f'{i:03}', 'old', 1) for i in range(0, 1000, 2)]
+    )
+    rows = [(i, f'{i:03}', f"Customer {i}'s", 2) for i in range(1000)]
+    statements = list(Upsert.batches(
+        rows, 'Customer', max_params=999, dialect=Dialect.ANSI, style='qmark'
+    ))
+    for sql, params in statements:
+        conn.execute(sql, params)
+    single = Upsert({'id': 7, 'name': 'Seven'}, 'Customer', dialect=Dialect.ANSI)
+    conn.execute(str(single))
+    return {
+        'statements': statements,
+        'upserted': conn.execute(
+            'SELECT Count(*), Sum(region), Count(DISTINCT name) FROM Customer'
+        ).fetchone(),
+        'single': conn.execute('SELECT name, region FROM Customer WHERE id = 7').fetchone(),
+        'merge': str( Upsert(rows[:2], 'Customer', dialect=Dialect.SQL_SERVER) ),
+        'mysql': str( Upsert(rows[:2], 'Customer', dialect=Dialect.MYSQL) ),
+        'packets': list(Upsert.batches(
+            [(i, f'{i:03}', 'José Ação ' * 5, 2) for i in range(500)],
+            'Customer', max_bytes=4096, dialect=Dialect.MYSQL
+        )),
+    }
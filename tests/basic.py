@@ -1,5 +1,6 @@
 from sql_blocks.sql_blocks import *
 from difflib import SequenceMatcher
+from tests.util import remove_public_schema
 
 
 Select.join_type = JoinType.LEFT
@@ -147,3 +148,24 @@ def like_conditions() -> list:
         last_name=endswith('Cascalles'),
     )
     return [v.split(' LIKE ')[-1] for v in query.values[CMD_WHERE]]
+
+def many_subqueries(count: int) -> list:
+    remove_public_schema()
+    conditions = ' AND '.join(
+        f"x.f{i} IN (SELECT t{i}.id FROM T{i} t{i} WHERE t{i}.v = {i})"
+        for i in range(count)
+    )
+    return Select.parse(
+        f"SELECT x.a FROM X x WHERE {conditions} AND x.c > 1"
+    )[0].values[CMD_WHERE]
+
+def keywords_inside_text() -> dict:
+    remove_public_schema()
+    return Select.parse("""
+        SELECT c.name, -- FROM the customer table
+            c.note /* ORDER BY and WHERE are ignored here */
+        FROM Customer c
+        WHERE c.note = "from where to where" AND c.id NOT IN (
+            SELECT o.customer FROM Orders o WHERE o.status = 'closed'
+        ) ORDER BY c.name
+    """)[0].values
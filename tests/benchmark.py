@@ -0,0 +1,184 @@
+"""
+Timings of the most expensive operations:
+    python -m tests.benchmark
+"""
+import os, re
+from timeit import timeit
+from sql_blocks import *
+
+
+def join_chain_tables(size: int) -> list:
+    main = Select(
+        'Sales s',
+        **{f'ref{i}': ForeignKey(f'Table{i}') for i in range(1, size)},
+        id=[Field, inside(list(range(200)))],
+        region=inside([f'region{i}' for i in range(50)]),
+    )
+    tables = [
+        Select(
+            f'Table{i} t{i}', id=PrimaryKey,
+            name=Field, status=inside(list(range(100))),
+        )
+        for i in range(1, size)
+    ]
+    return [main] + tables
+
+def join_chain(tables: list) -> Select:
+    result, *others = tables
+    for query in others:
+        result = result + query
+    return result
+
+def bench_join_chains(sizes: tuple=(2, 10, 50), number: int=20) -> dict:
+    result = {}
+    for size in sizes:
+        tables = join_chain_tables(size)
+        result[f'join_chain_{size}'] = timeit(
+            lambda: join_chain(tables), number=number
+        ) / number
+        joined = join_chain(tables)
+        result[f'copy_joined_{size}'] = timeit(
+            joined.copy, number=number
+        ) / number
+    return result
+
+def wide_select(columns: int) -> Select:
+    query = Select('Measure m')
+    for i in range(columns):
+        if i % 3 == 0:
+            query(**{f'col{i}': NamedField(f'c{i}')})
+        else:
+            query(**{f'col{i}': [Field, gt(i)]})
+    return query
+
+def bench_wide_selects(sizes: tuple=(100, 300, 1000), number: int=3) -> dict:
+    return {
+        f'wide_select_{size}': timeit(
+            lambda: wide_select(size), number=number
+        ) / number
+        for size in sizes
+    }
+
+def bench_renders(sizes: tuple=(10, 100, 1000), number: int=1000) -> dict:
+    """The first str() renders the query; the next ones return the cached text"""
+    result = {}
+    for size in sizes:
+        query = wide_select(size)
+        def render_again() -> str:
+            query.values.touch()  # --- as if the query had changed
+            return str(query)
+        result[f'first_render_{size}'] = timeit(render_again, number=10) / 10
+        result[f'repeated_render_{size}'] = timeit(lambda: str(query), number=number) / number
+    return result
+
+SAMPLE_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'sample')
+SAMPLE_SCRIPTS = (
+    'all_in_one', 'case', 'confused', 'dialect_postgre', 'order',
+    'person1', 'person2', 'pivot', 'range', 'remove_from_orders',
+)
+
+def nested_script(count: int) -> str:
+    conditions = ' AND '.join(
+        f"x.f{i} IN (SELECT t{i}.id FROM T{i} t{i} WHERE t{i}.v = {i})"
+        for i in range(count)
+    )
+    return f"SELECT x.a FROM X x WHERE {conditions} AND x.c > 1"
+
+def bench_parse(sizes: tuple=(100, 500), number: int=5) -> dict:
+    scripts = []
+    for name in SAMPLE_SCRIPTS:
+        with open(os.path.join(SAMPLE_FOLDER, f'{name}.sql')) as file:
+            scripts.append( file.read() )
+    with BuildContext(schema=None):
+        result = {'parse_samples': timeit(
+            lambda: [Select.parse(script) for script in scripts], number=number
+        ) / number}
+        for size in sizes:
+            script = nested_script(size)
+            result[f'parse_subqueries_{size}'] = timeit(
+                lambda: Select.parse(script), number=number
+            ) / number
+    return result
+
+def many_functions(count: int) -> Select:
+    FUNCTIONS = [Sum, Max, Min, Avg, Count, Round, SubString, Trim, Year, Coalesce]
+    return Select('Sales s', **{
+        f'col{i}': Round( FUNCTIONS[i % len(FUNCTIONS)] ).As(f'f{i}')
+        for i in range(count)
+    })
+
+def bench_functions(sizes: tuple=(100, 500), number: int=5) -> dict:
+    result = {}
+    languages = [QueryLanguage, OracleLanguage, SqlServerLanguage, PostgreLanguage]
+    for size in sizes:
+        result[f'build_functions_{size}'] = timeit(
+            lambda: many_functions(size), number=number
+        ) / number
+        result[f'render_functions_{size}'] = timeit(
+            lambda: [
+                many_functions(size).translate_to(language)
+                for language in languages
+            ], number=number
+        ) / number / len(languages)
+    names = re.findall(r'(\w+)[(]', many_functions(sizes[-1]).translate_to(QueryLanguage))
+    result[f'find_functions_{len(names)}'] = timeit(
+        lambda: [Function.find(name) for name in names], number=number
+    ) / number
+    return result
+
+def bench_engine(sizes: tuple=(10_000, 100_000), number: int=3) -> dict:
+    from tests.engine import store_data, sqlite_rows, engine_queries
+    result = {}
+    for size in sizes:
+        data = store_data(size)
+        for name in ('join', 'having', 'top_n'):
+            query = engine_queries()[name]
+            result[f'engine_{name}_{size}'] = timeit(
+                lambda: query.evaluate(data), number=number
+            ) / number
+            result[f'sqlite_{name}_{size}'] = timeit(
+                lambda: sqlite_rows(data, str(query)), number=number
+            ) / number  # --- includes loading the rows
+    return result
+
+def bench_array_engine(size: int=10_000_000, number: int=3) -> dict:
+    import numpy as np
+    rng = np.random.default_rng(0)
+    arrays = {'Request': {
+        'server': rng.integers(0, 50, size),
+        'response_time': rng.exponential(200.0, size),
+    }}
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        summary = Select('Request r', response_time=EDA(
+            faster=Min, slower=Max, average=Avg, deviation=StdDev, total=Count
+        ))
+        by_server = Select(
+            'Request r', server=[Field, GroupBy],
+            response_time=[Where.gt(100), EDA(faster=Min, slower=Max, average=Avg)],
+        )
+    return {
+        f'eda_{size}': timeit(
+            lambda: summary.evaluate_arrays(arrays), number=number
+        ) / number,
+        f'eda_group_by_{size}': timeit(
+            lambda: by_server.evaluate_arrays(arrays), number=number
+        ) / number,
+    }
+
+def bench_compiled(number: int=200) -> dict:
+    from tests.compiled import sales_query
+    def translate_and_compile():
+        CompiledQuery.cache.clear()
+        return sales_query().compile_to('Pandas')
+    return {
+        'compile_to_miss': timeit(translate_and_compile, number=number) / number,
+        'compile_to_hit': timeit(
+            lambda: sales_query().compile_to('Pandas'), number=number
+        ) / number,
+    }
+
+
+if __name__ == '__main__':
+    results = bench_join_chains() | bench_wide_selects() | bench_renders() | bench_parse() | bench_functions() | bench_engine() | bench_array_engine() | bench_compiled()
+    for name, seconds in results.items():
+        print(f'{name:<25}{seconds * 1000:10.3f} ms')
@@ -0,0 +1,99 @@
+from sql_blocks.sql_blocks import *
+
+
+def render_cache_texts() -> tuple:
+    """The rendered text after each change of the query"""
+    query = Select('Customer c', name=Field, region=eq(3), id=OrderBy)
+    first = str(query)
+    version = query.values.version
+    same_text = str(query)
+    same_version = query.values.version == version
+    query.delete('region', [CMD_WHERE])
+    after_delete = str(query)
+    query(age=gt(18))
+    after_call = str(query)
+    query.values[CMD_SELECT].append('c.birth')
+    return first, same_text, same_version, after_delete, after_call, str(query)
+
+def render_state_texts() -> dict:
+    """The text of a query rendered again after changes outside its values"""
+    DATE_SCHEMA = 'CREATE TABLE Orders (id INT PRIMARY KEY, ref_date DATE);'
+    TEXT_SCHEMA = 'CREATE TABLE Orders (id INT PRIMARY KEY, ref_date VARCHAR(10));'
+    result = {}
+    schema = Schema(DATE_SCHEMA)
+    with BuildContext(schema=schema):
+        query = Select('Orders o', id=Field, ref_date=eq('2024-01-01'))
+        result['date'] = query.translate_to(OracleLanguage)
+        schema.summary['Orders'] = Schema(TEXT_SCHEMA).summary['Orders']
+        result['text'] = query.translate_to(OracleLanguage)
+    with BuildContext(schema=None):
+        cte = CTE('Totals', [Select('Orders o', id=Field)])
+        result['shown'] = cte.translate_to(OracleLanguage)
+        cte.show_query = False
+        result['hidden'] = cte.translate_to(OracleLanguage)
+        cte.query_list[0](amount=Field)
+        result['changed'] = cte.translate_to(OracleLanguage)
+    return result
+
+def fingerprint_queries() -> tuple:
+    q1 = Select('Product p', price=gt(10), name=Field, id=OrderBy)
+    q2 = Select('Product p', id=OrderBy, name=Field, price=gt(99.5))
+    q3 = Select('Product p', price=lt(10), name=Field, id=OrderBy)
+    q4 = q1.copy()
+    q4(category=eq(3))
+    return q1, q2, q3, q4
+
+def quoted_name_queries() -> tuple:
+    """Equal queries (==) where only one of them has a literal"""
+    return (
+        Select('Product p', name=eq('x'), id=Field),
+        Select('Product p', name=Where('= x'), id=Field),
+    )
+
+def parse_cache_queries() -> tuple:
+    SCRIPT = '''
+        SELECT c.name, o.total FROM Customer c
+        JOIN Orders o ON (o.customer = c.id)
+        WHERE o.total > 100
+    '''
+    ParseCache.clear()
+    ParseCache.enabled = True
+    first = Select.parse(SCRIPT)
+    first[0].delete('name')
+    ForeignKey.references.pop(('Orders', 'Customer'), None)
+    second = Select.parse(SCRIPT.replace('\n', ' '))
+    info = ParseCache.info()
+    ParseCache.enabled = False
+    return (
+        info, second, Select.parse(SCRIPT),
+        ForeignKey.references.get(('Orders', 'Customer'))
+    )
+
+def copy_on_write_queries() -> tuple:
+    query = Select(
+        'Sales s', amount=Field,
+        **{f'col{i}': gt(i) for i in range(1000)}
+    )
+    text = str(query)
+    copied = query.copy()
+    copied(region=eq(3))
+    copied.values[CMD_SELECT].append('s.region')
+    other = query.copy()
+    query.delete('col0', [CMD_WHERE])
+    expected = Select('Sales s', amount=Field, **{
+        f'col{i}': gt(i) for i in range(1, 1000)
+    })
+    return query, copied, other, text, expected
+
+def shared_lists() -> tuple:
+    query = Select('Sales s', amount=Field, region=eq(3))
+    copied = query.copy()
+    where = query.values[CMD_WHERE]
+    return query.values[CMD_WHERE], where, dict.get(copied.values, CMD_WHERE)
+
+def held_list_copy() -> tuple:
+    query = Select('Sales s', amount=Field, region=Field)
+    fields = query.values[CMD_SELECT]
+    copied = query.copy()
+    fields.append('s.secret')
+    return fields, copied.values[CMD_SELECT], str(copied)
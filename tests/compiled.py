@@ -0,0 +1,97 @@
+from sql_blocks import *
+
+
+SALES = {
+    'id': list(range(1, 11)),
+    'customer': [i % 3 for i in range(1, 11)],
+    'amount': [i * 10.0 for i in range(1, 11)],
+    'product': [i % 2 + 1 for i in range(1, 11)],
+}
+PRODUCT = {'id': [1, 2], 'name': ['pen', 'ink']}
+
+def sales_query(customer: int=1, min_amount: float=30) -> Select:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        return Select(
+            'Sales s', amount=gt(min_amount), customer=[Field, eq(customer)],
+            product=Select('Product p', id=PrimaryKey, name=Field)
+        )
+
+def totals_query() -> Select:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        return Select('Sales s', customer=[Field, GroupBy], amount=Sum())
+
+def compiled_functions() -> dict:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+        return {
+            'first': sales_query().compile_to('Pandas'),
+            'same_query': sales_query().compile_to('Pandas'),
+            'other_literals': sales_query(2).compile_to('Pandas'),
+            'other_language': sales_query().compile_to('Polars'),
+        }
+
+def compile_to_sql():
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+        return sales_query().compile_to('SQL')
+
+def case_sensitive_functions() -> tuple:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        lower = Select('Sales s', name=Field).compile_to('Pandas')
+        upper = Select('Sales s', Name=Field).compile_to('Pandas')
+    return lower, upper
+
+def compiled_pandas_results() -> tuple:
+    import pandas as pd
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+        func = sales_query().compile_to('Pandas')
+        totals = totals_query().compile_to('Pandas')
+    result = func({'Sales': pd.DataFrame(SALES), 'Product': pd.DataFrame(PRODUCT)})
+    return (
+        result.to_dict('list'),
+        totals(pd.DataFrame(SALES))[('amount', 'sum')].to_dict()
+    )
+
+def compiled_polars_results() -> tuple:
+    import polars as pl
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+        func = sales_query().compile_to('Polars')
+        totals = totals_query().compile_to('Polars')
+    result = func(Sales=pl.DataFrame(SALES), Product=pl.DataFrame(PRODUCT))
+    return (
+        result.to_dict(as_series=False),
+        totals(pl.DataFrame(SALES)).sort('customer').to_dict(as_series=False)
+    )
+
+def lazy_query(folder: str) -> Select:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        return Select(
+            f'{folder}/Sales.parquet s', amount=gt(30), customer=[Field, eq(1)],
+            product=Select(f'{folder}/Product.csv p', id=PrimaryKey, name=Field)
+        )
+
+def lazy_script_lines() -> list:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+        return lazy_query('data').translate_to('PolarsLazy').splitlines()
+
+def lazy_files(folder: str='') -> str:
+    import os, tempfile
+    import polars as pl
+    folder = folder or tempfile.mkdtemp()
+    pl.DataFrame(SALES).write_parquet(os.path.join(folder, 'Sales.parquet'))
+    pl.DataFrame(PRODUCT).write_csv(os.path.join(folder, 'Product.csv'))
+    return folder
+
+def compiled_lazy_frames(folder: str) -> tuple:
+    """The results read from the files and from a DataFrame, and the query plan"""
+    import polars as pl
+    class LazyPlan(PolarsLazyLanguage):
+        COLLECT = '.explain()'
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+        query = lazy_query(folder)
+        func = query.compile_to('PolarsLazy')
+        namespace = {}
+        exec(query.translate_to(LazyPlan), namespace)
+    return (
+        func().to_dict(as_series=False),
+        func(Sales=pl.DataFrame(SALES)).to_dict(as_series=False),
+        namespace['df']
+    )
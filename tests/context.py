@@ -0,0 +1,110 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from sql_blocks import *
+
+
+def build_sales_query() -> str:
+    query = Select(
+        'Sales s',
+        due_date=DateDiff(Current_Date()).As('late'),
+        amount=[Sum().over(customer=Partition).As('total'), OrderBy],
+        region=Range('area', {10: 'north', 20: 'south'}),
+    )
+    return str(query)
+
+def build_options(index: int) -> dict:
+    dialects = list(Dialect)
+    return dict(
+        dialect=dialects[index % len(dialects)],
+        sort=list(SortType)[index % 2],
+    )
+
+def build_in_context(index: int) -> tuple:
+    options = build_options(index)
+    with BuildContext(**options):
+        return index, build_sales_query()
+
+def expected_scripts(count: int) -> dict:
+    return {
+        i: build_in_context(i)[1]
+        for i in range(count)
+    }
+
+def concurrent_builds(count: int, workers: int=16) -> tuple:
+    """The scripts built by the threads and the global settings before/after"""
+    before = Function.dialect, OrderBy.sort
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list( executor.map(build_in_context, range(count)) )
+    return results, before, (Function.dialect, OrderBy.sort)
+
+def async_builds(count: int) -> bool:
+    async def build(index: int) -> str:
+        with BuildContext(**build_options(index)):
+            await asyncio.sleep(0)
+            query = Select('Sales s', amount=OrderBy)
+            await asyncio.sleep(0)
+            return str( DateDiff(Current_Date(), 'due_date') ) + str(query)
+    async def main() -> list:
+        return await asyncio.gather(*[build(i) for i in range(count)])
+    expected = {}
+    for i in range(12):
+        with BuildContext(**build_options(i)):
+            expected[i] = str( DateDiff(Current_Date(), 'due_date') ) + str( Select('Sales s', amount=OrderBy) )
+    return asyncio.run( main() ) == [expected[i % 12] for i in range(count)]
+
+def scoped_aliases() -> list:
+    with BuildContext(use_catalog=True, alias_func=lambda t: t[0].lower()):
+        return [
+            Select(name).alias
+            for name in ('Customer', 'Category', 'Customer')
+        ]
+
+def scoped_relationship() -> tuple:
+    """The relationship inside the context and the registry before/after it"""
+    before = dict(ForeignKey.references)
+    with BuildContext():
+        Select('Product p', id=PrimaryKey)
+        Select('Sales s', pro_id=ForeignKey('Product'))
+        inside = ForeignKey.references.get( ('Sales', 'Product') )
+    return inside, before, dict(ForeignKey.references)
+
+def build_with_relationship(index: int, context: BuildContext=None) -> str:
+    with context or BuildContext(use_catalog=True):
+        product = Select(f'Product{index}', id=PrimaryKey)
+        sales = Select(f'Sales{index}', pro_id=ForeignKey(f'Product{index}'))
+        return str(sales + product)
+
+def memory_growth(count: int) -> int:
+    import gc, tracemalloc
+    tracemalloc.start()
+    try:
+        for i in range(count // 10):
+            build_with_relationship(i)
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            build_with_relationship(i)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+def session_registries(count: int, max_size: int) -> tuple:
+    """Sizes of the session registry (full and cleared) and its last relationship"""
+    session = BuildContext(max_size=max_size)
+    for i in range(count):
+        build_with_relationship(i, session)
+    with session:
+        size = len(ForeignKey.references.maps[0])
+        last = ForeignKey.references.get( (f'Sales{count-1}', f'Product{count-1}') )
+    session.clear()
+    with session:
+        cleared = len(ForeignKey.references.maps[0])
+    return size, last, cleared
+
+def shared_session_builds(count: int, workers: int=8) -> list:
+    session = BuildContext(max_size=1000, use_catalog=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda i: build_with_relationship(i, session), range(count)
+        ))
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+from sql_blocks.sql_blocks import *
+
+
+LANGUAGES = (
+    OracleLanguage, PostgreLanguage, SqlServerLanguage,
+    MySqlLanguage, BigQueryLanguage,
+)
+
+
+def traffic_query(offset: int=0) -> Select:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+        query = Select(
+            'Traffic t',
+            event_date=[SameDay('2024-10-03'), Field],
+            name=SubString(1, 3).As('prefix'),
+            id=OrderBy,
+        )
+        query.limit(10, offset)
+    return query
+
+TRAFFIC_SCHEMA = """CREATE TABLE Traffic(
+    id int primary key, name varchar(50), code char(10), event_date date
+);"""
+
+
+def dialect_scripts() -> dict:
+    with BuildContext(schema=Schema(TRAFFIC_SCHEMA)):
+        query = traffic_query(20)
+        return {lang: query.translate_to(lang) for lang in LANGUAGES}
+
+def concurrent_scripts() -> list:
+    query = traffic_query(20)
+    with ThreadPoolExecutor(8) as executor:
+        return list(executor.map(
+            query.translate_to, LANGUAGES * 20
+        ))
+
+def top_script() -> str:
+    return traffic_query().translate_to(SqlServerLanguage)
+
+def non_date_literal() -> str:
+    with BuildContext(dialect=Dialect.ANSI, schema=Schema(TRAFFIC_SCHEMA)):
+        query = Select('Traffic t', code=eq('2024-10-03'), event_date=Field)
+        return query.translate_to(OracleLanguage)
+
+def cte_script() -> str:
+    with BuildContext(dialect=Dialect.ANSI):
+        cte = CTE('Recent', [Select('Traffic t', id=Field, name=Field)])
+        cte(name=SubString(1, 3).As('prefix'))
+        return cte.translate_to(OracleLanguage)
+
+def bigquery_count() -> str:
+    query = Select.parse('SELECT COUNT(*) as n, region FROM Sales s GROUP BY region')[0]
+    return query.translate_to(BigQueryLanguage)
@@ -0,0 +1,243 @@
+import csv, os, sqlite3, tempfile
+from sql_blocks import *
+
+
+def store_data(count: int=2000) -> dict:
+    return {
+        'Customer': [
+            {'id': i, 'name': f'customer {i}', 'region': ['north', 'south', None][i % 3]}
+            for i in range(1, count // 10 + 1)
+        ],
+        'Sales': [
+            {'id': i, 'customer': i % (count // 10) + 1, 'amount': (i * 37) % 500 / 4}
+            for i in range(1, count + 1)
+        ],
+    }
+
+def sqlite_rows(data: dict, sql: str) -> list:
+    conn = sqlite3.connect(':memory:')
+    for table, rows in data.items():
+        fields = list(rows[0])
+        conn.execute('CREATE TABLE {} ({})'.format(table, ', '.join(fields)))
+        conn.executemany(
+            'INSERT INTO {} VALUES ({})'.format(table, ', '.join('?' * len(fields))),
+            [tuple(row.values()) for row in rows]
+        )
+    cursor = conn.execute(sql)
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+def engine_queries() -> dict:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        return {
+            'filter': Select(
+                'Sales s', id=Field, amount=[Field, Where.gt(100)],
+                customer=Where.inside([1, 2, 3, 150])
+            ),
+            'join': Select(
+                'Sales s', id=[Field, OrderBy], amount=Between(10, 20).literal(),
+                customer=Select(
+                    'Customer c', id=PrimaryKey, region=Where.is_null(),
+                    name=[Field, Where.contains('customer 1', Position.StartsWith)],
+                )
+            ),
+            'group': Select(
+                'Sales s', amount=[Sum().As('total'), Count().As('sales')],
+                customer=Select('Customer c', id=PrimaryKey, region=[Field, GroupBy]),
+            ),
+            'having': Select(
+                'Sales s', customer=[Field, GroupBy], id=Count().As('sales'),
+                amount=[Sum().As('total'), Max().As('biggest'), Having.sum(gt(700))],
+            ),
+            'top_n': Select(
+                'Sales s', amount=[Field, OrderBy], id=Field,
+            ).limit(15, 30),
+        }
+
+def sorted_rows(rows: list) -> list:
+    return sorted(rows, key=repr)
+
+def engine_comparisons() -> dict:
+    """The rows of RowEngine and of SQLite for each query"""
+    data = store_data()
+    result = {}
+    for name, query in engine_queries().items():
+        with BuildContext(sort=SortType.ASC):
+            sql, rows = str(query), query.evaluate(data)
+        expected = sqlite_rows(data, sql)
+        if 'ORDER BY' not in sql:
+            expected, rows = sorted_rows(expected), sorted_rows(rows)
+        result[name] = (rows, expected)
+    return result
+
+def seek_rows() -> tuple:
+    data = store_data()
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        seek, _ = Select('Sales s', id=Field, amount=Field).paginate(
+            'amount, id', after=[100, 40], size=25, dialect=Dialect.ANSI
+        )
+    return seek.evaluate(data), sqlite_rows(data, str(seek))
+
+def left_join_rows() -> tuple:
+    data = store_data()
+    outer = Select.parse('''SELECT c.name, s.amount FROM Customer c
+        LEFT JOIN Sales s ON (c.id = s.customer) WHERE c.region IS NOT NULL''')[0]
+    first_sales = {**data, 'Sales': data['Sales'][:150]}
+    return (
+        sorted_rows(outer.evaluate(first_sales)),
+        sorted_rows(sqlite_rows(first_sales, str(outer)))
+    )
+
+def csv_rows() -> tuple:
+    data = store_data()
+    folder = tempfile.mkdtemp()
+    with open(os.path.join(folder, 'Customer.csv'), 'w', newline='') as file:
+        writer = csv.DictWriter(file, ['id', 'name', 'region'])
+        writer.writeheader()
+        writer.writerows(data['Customer'])
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        query = Select(
+            'Customer c', region=[Field, GroupBy, Not.is_null()],
+            id=[Count().As('customers'), Max().As('last')]
+        )
+    return (
+        sorted_rows(query.evaluate(folder=folder)),
+        sorted_rows(sqlite_rows({'Customer': data['Customer']}, str(query)))
+    )
+
+def sub_query_rows() -> tuple:
+    data = store_data()
+    sub_query = Select.parse(
+        'SELECT name FROM Customer c WHERE c.id IN (SELECT customer FROM Sales s WHERE s.amount > 124)'
+    )[0]
+    return sub_query.evaluate(data), sqlite_rows(data, str(sub_query))
+
+NULL_DATA = {'T': [
+    {'x': None, 'y': 5, 'k': 1}, {'x': 1, 'y': 1, 'k': 1},
+    {'x': 2, 'y': 3, 'k': 2}, {'x': None, 'y': None, 'k': None},
+]}
+
+def null_logic_rows(condition: str) -> tuple:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        query = Select('T t', y=Field)
+    query.values[CMD_WHERE] = [condition]
+    return sorted_rows(query.evaluate(NULL_DATA)), sorted_rows(sqlite_rows(NULL_DATA, str(query)))
+
+def count_distinct_rows(data: dict=NULL_DATA) -> tuple:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        query = Select('T t')
+    query.values[CMD_SELECT] = ['Count(DISTINCT t.k) as n', 'Sum(DISTINCT t.y) as total']
+    return query, query.evaluate(data), sqlite_rows(data, str(query))
+
+def columnar(data: dict) -> dict:
+    return {
+        table: {name: [row[name] for row in rows] for name in rows[0]}
+        for table, rows in data.items()
+    }
+
+def array_rows(columns: dict) -> list:
+    return [
+        dict(zip(columns, values))
+        for values in zip(*[array.tolist() for array in columns.values()])
+    ]
+
+def array_engine_comparisons() -> dict:
+    """The rows of ArrayEngine and of RowEngine for each query"""
+    data = store_data()
+    arrays = columnar(data)
+    queries = engine_queries()
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        queries.pop('join'), queries.pop('group')
+        queries['regions'] = Select(
+            'Customer c', region=[Field, GroupBy, OrderBy],
+            name=[Not.contains('9'), Count().As('customers')], id=Max().As('last'),
+        )
+        queries['seek'], _ = Select('Sales s', id=Field, amount=Field).paginate(
+            'amount, id', after=[100, 40], size=25, dialect=Dialect.ANSI
+        )
+        queries['not_in'] = Select(
+            'Sales s', customer=[Field, Not.inside([1, 2, 3])],
+            amount=Between(50, 51).literal(), id=Field,
+        )
+        queries['not_in'].values[CMD_ORDER_BY] = ['s.customer DESC', 's.id']
+    result = {}
+    for name, query in queries.items():
+        with BuildContext(sort=SortType.ASC):
+            expected, rows = query.evaluate(data), array_rows( query.evaluate_arrays(arrays) )
+        if 'ORDER BY' not in str(query):
+            expected, rows = sorted_rows(expected), sorted_rows(rows)
+        result[name] = (rows, expected)
+    return result
+
+def array_deviations() -> tuple:
+    import statistics
+    data = store_data()
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        eda = Select(
+            'Sales s', customer=[Field, GroupBy],
+            amount=EDA(low=Min, high=Max, mean=Avg, deviation=StdDev)
+        )
+    summary = eda.evaluate_arrays( columnar(data) )
+    deviations = dict(zip( summary['customer'].tolist(), summary['deviation'].tolist() ))
+    amounts = {}
+    for row in data['Sales']:
+        amounts.setdefault(row['customer'], []).append(row['amount'])
+    return deviations, {
+        customer: statistics.stdev(values) for customer, values in amounts.items()
+    }
+
+def array_null_logic_rows(condition: str) -> tuple:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        query = Select('T t', y=Field)
+    query.values[CMD_WHERE] = [condition]
+    return (
+        sorted_rows(array_rows( query.evaluate_arrays(columnar(NULL_DATA)) )),
+        sorted_rows(sqlite_rows(NULL_DATA, str(query)))
+    )
+
+def array_count_distinct_rows() -> tuple:
+    query, _, expected = count_distinct_rows()
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        grouped = Select('T t', k=[Field, GroupBy])
+    grouped.values[CMD_SELECT].append('Count(DISTINCT t.y) as n')
+    return (
+        array_rows( query.evaluate_arrays(columnar(NULL_DATA)) ), expected,
+        sorted_rows(array_rows( grouped.evaluate_arrays(columnar(NULL_DATA)) )),
+        sorted_rows(sqlite_rows(NULL_DATA, str(grouped)))
+    )
+
+def evaluate_clauses(select: str, *joins: str) -> list:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        query = Select('Customer c')
+    query.values[CMD_SELECT] = [select]
+    query.values[CMD_FROM] += list(joins)
+    return query.evaluate( store_data(200) )
+
+def evaluate_array_clauses(select: str, *joins: str) -> dict:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        query = Select('Customer c')
+    query.values[CMD_SELECT] = [select]
+    query.values[CMD_FROM] += list(joins)
+    return query.evaluate_arrays( columnar(store_data(200)) )
+
+def sales_with_nulls() -> dict:
+    data = store_data()
+    for row in data['Sales'][::7]:
+        row['amount'] = None
+    return data
+
+def parsed_rows(script: str, data: dict=None) -> tuple:
+    """The rows of RowEngine and of SQLite for a script read by Select.parse"""
+    data = data or store_data()
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        query = Select.parse(script)[0]
+        rows, sql = query.evaluate(data), str(query)
+    return rows, sqlite_rows(data, sql)
+
+def parsed_array_rows(script: str, data: dict=None) -> tuple:
+    """The rows of ArrayEngine and of SQLite for a script read by Select.parse"""
+    data = data or store_data()
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        query = Select.parse(script)[0]
+        rows, sql = array_rows( query.evaluate_arrays(columnar(data)) ), str(query)
+    return rows, sqlite_rows(data, sql)
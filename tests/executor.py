@@ -0,0 +1,152 @@
+import os, sqlite3, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from sql_blocks import *
+
+
+def product_pool(max_size: int=3) -> ConnectionPool:
+    path = os.path.join(tempfile.mkdtemp(), 'products.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE Product (id INTEGER PRIMARY KEY, name, price)')
+        conn.execute('CREATE TABLE Sales (id INTEGER PRIMARY KEY, product, quantity)')
+    return ConnectionPool(
+        lambda: sqlite3.connect(path, check_same_thread=False), max_size
+    )
+
+def products(min_price: float, max_price: float, reverse: bool=False) -> Select:
+    conditions = [dict(price=Where.gte(min_price)), dict(id=Where.lte(max_price * 10))]
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        query = Select('Product p', id=[Field, OrderBy], name=Field)
+        for condition in (reversed(conditions) if reverse else conditions):
+            query(**condition)
+    return query
+
+def executor_values() -> dict:
+    pool = product_pool()
+    inserted = Insert.executemany(
+        pool, ({'id': i, 'name': f'product {i}', 'price': i / 10} for i in range(1, 5001)),
+        'Product', batch_size=700
+    )
+    # ---------------------------------------------------------------------------
+    def fetch(query: Select, arraysize: int=500) -> list:
+        with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC):
+            return list( query.run(pool, arraysize) )
+    # ---------------------------------------------------------------------------
+    rows = fetch(products(10, 20), arraysize=64)
+    with BuildContext(schema=None):
+        updated = Update({'price': 0}, 'Product', id=Where.gt(4990)).run(pool)
+    def page(n: int) -> list:
+        return fetch( products(n, n + 1, reverse=bool(n % 2)) )
+    with ThreadPoolExecutor(8) as executor:
+        pages = list( executor.map(page, range(1, 41)) )
+    try:
+        with pool.connection() as cache:
+            cache.connection.execute("INSERT INTO Product VALUES (9999, 'lost', 1)")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    lost = fetch( Select('Product p', id=[Field, Where.eq(9999)]) )
+    pool.close()
+    return {
+        'inserted': inserted,
+        'ids': [row[0] for row in rows],
+        'updated': updated,
+        'pool_size': pool.size,
+        'statements': len(pool.statements),
+        'pages': [[row[0] for row in rows] for rows in pages],
+        'lost': lost,
+    }
+
+def result_cache_values() -> dict:
+    import time
+    pool = product_pool()
+    pool.result_cache = ResultCache(max_size=3, ttl=60)
+    Insert.executemany(pool, [(i, f'product {i}', i / 10) for i in range(1, 101)], 'Product', ['id', 'name', 'price'])
+    result = {}
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        expensive = Select('Product p', id=Field, price=Where.gt(9))
+        cheap = Select('Product p', id=Field, price=Where.gt(5))
+        sales = Select(
+            'Sales s', quantity=Field,
+            product=Where.inside(Select('Product p', id=Field, price=Where.gt(9)))
+        )
+        run = lambda query: list( query.run(pool) )
+        result['first'], result['second'] = run(expensive), run(expensive)
+        result['hits'] = pool.result_cache.info()['hits']
+        run(cheap), run(sales)
+        Update({'price': 0}, 'Product', id=Where.gt(95)).run(pool)
+        result['after_update'] = run(expensive)
+        result['cached_after_update'] = pool.result_cache.info()['size']
+        Insert.executemany(pool, [(1, 95, 2)], 'Sales', ['id', 'product', 'quantity'])
+        result['new_sales'] = run(sales)
+        for query in (expensive, cheap, sales):
+            run(query)
+        result['size'] = pool.result_cache.info()['size']
+        pool.result_cache.clear()
+        pool.result_cache.ttl = 0
+        run(expensive)
+        time.sleep(0.01)
+        misses = pool.result_cache.info()['misses']
+        run(expensive)
+        result['expired'] = pool.result_cache.info()['misses'] - misses
+    pool.close()
+    return result
+
+PRODUCT_SCHEMA = 'CREATE TABLE Product(id int primary key, name varchar(50), price float);'
+
+def upsert_invalidation() -> tuple:
+    pool = product_pool()
+    pool.result_cache = ResultCache(max_size=3, ttl=60)
+    Insert.executemany(pool, [(i, f'product {i}', i / 10) for i in range(1, 11)], 'Product', ['id', 'name', 'price'])
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=Schema(PRODUCT_SCHEMA)):
+        expensive = Select('Product p', id=Field, price=Where.gt(0.5))
+        before = list( expensive.run(pool) )
+        upsert = Upsert([{'id': 1, 'name': 'product 1', 'price': 99.0}])
+        upsert.run(pool)
+        after = list( expensive.run(pool) )
+    pool.close()
+    return upsert.table, before, after
+
+def upsert_statements() -> tuple:
+    """An Upsert too big for one statement, run in a pool"""
+    pool = product_pool()
+    Insert.executemany(pool, [(i, 'old', 0) for i in range(1, 101)], 'Product', ['id', 'name', 'price'])
+    rows = [{'id': i, 'name': f'product {i}', 'price': i / 10} for i in range(1, 12001)]
+    upsert = Upsert(rows, 'Product', key='id', dialect=Dialect.ANSI)
+    count = upsert.run(pool)
+    with pool.connection() as cache:
+        stored = cache.connection.execute(
+            "SELECT Count(*), Sum(name = 'old') FROM Product"
+        ).fetchone()
+    pool.close()
+    return len(upsert.statements()), count, stored
+
+def split_orders() -> tuple:
+    from datetime import date, timedelta
+    path = os.path.join(tempfile.mkdtemp(), 'orders.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE Orders (id INTEGER PRIMARY KEY, ref_date, amount)')
+        conn.executemany('INSERT INTO Orders VALUES (?, ?, ?)', [
+            (i, str(date(2024, 1, 1) + timedelta(hours=i * 7)), None if i % 50 == 0 else i * 0.3)
+            for i in range(1, 2001)
+        ])
+        expected = sorted( conn.execute('SELECT * FROM Orders').fetchall() )
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        base = Select('Orders o', id=Field, ref_date=Field, amount=Field)
+        parts = {
+            'id': base.split('id', 8, (1, 2000)),
+            'month': base.split('ref_date', bounds=('2024-01-01', '2024-12-31'), granularity='month'),
+            'amount': base.split('amount', 5, (0.0, 600.0), nulls=True),
+        }
+    return path, parts, expected
+
+def split_rows(path: str, queries: list) -> list:
+    pages = Select.run_parallel(queries, lambda: sqlite3.connect(path), workers=4)
+    return sorted(row for page in pages for row in page)
+
+def split_without_bounds() -> list:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        return Select('Orders o', id=Field).split('id', 4)
+
+def split_into(parts: int, bounds: tuple=(1, 2000)) -> list:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        return Select('Orders o', id=Field).split('id', parts, bounds)
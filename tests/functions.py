@@ -121,3 +121,17 @@ def window_func_with_formula() -> bool:
         variation=Lag(FORMULA).over(**OVER_PARAMS),
     )
     return q1 == q2
+
+def median_registry() -> tuple:
+    """Declares Median only while checking it: unregistered in the end."""
+    class Median(Aggregate, Function):
+        @classmethod
+        def alternative_names(cls) -> dict:
+            return {Dialect.SQL_SERVER: 'Percentile_Median'}
+    try:
+        return (
+            Median, Function.find('percentile_median'),
+            Median in Function.descendants(), Median.name(Dialect.SQL_SERVER)
+        )
+    finally:
+        FunctionRegistry.unregister(Median)
@@ -0,0 +1,41 @@
+from sql_blocks.sql_blocks import *
+
+
+def sales_with_customer() -> Select:
+    with BuildContext(sort=SortType.DESC):
+        return Select(
+            'Sales s',
+            amount=[Sum().As('total'), Field],
+            region=[Field, OrderBy],
+            id=[inside([1, 2]), GroupBy],
+            cus=Select('Customer c', id=PrimaryKey, name=Not.contains('x')),
+        )
+
+def sales_nodes() -> dict:
+    query = sales_with_customer()
+    return {
+        key: query.nodes(key)
+        for key in (CMD_SELECT, CMD_FROM, CMD_WHERE, CMD_ORDER_BY)
+    }
+
+def prefixed_node(text: str) -> ClauseNode:
+    return ClauseNode.parse(CMD_SELECT, text)
+
+def same_as_rebuilt(query: Select, key: str) -> bool:
+    indexed = query.clause_index(key)
+    rebuilt = ClauseIndex(key, query.values.get(key, []))
+    return (indexed.named, indexed.elements) == (rebuilt.named, rebuilt.elements)
+
+def person_query() -> Select:
+    return Select('Person p', name=NamedField('full_name'), age=[Field, gt(18)])
+
+def edit_person_fields(query: Select):
+    fields = query.values[CMD_SELECT]
+    fields.append('p.birth AS birthday')
+    fields[0] = 'p.name AS nickname'
+    fields.insert(0, 'p.id')
+    fields.remove('p.age')
+
+def delete_person_fields(query: Select):
+    query.delete('birth', [CMD_SELECT])
+    del query.values[CMD_SELECT][:]
@@ -0,0 +1,45 @@
+import sqlite3
+from sql_blocks import *
+
+
+def orders_database() -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE Orders (id INTEGER PRIMARY KEY, customer, amount)')
+    conn.executemany('INSERT INTO Orders VALUES (?, ?, ?)', [
+        (i, f'customer {i % 7}', (i * 37) % 50) for i in range(1, 1001)
+    ])
+    return conn
+
+def all_pages(conn, order_fields: str, dialect: Dialect, size: int=64) -> list:
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        base = Select('Orders o', id=Field, customer=Field, amount=Field)
+    result, token = [], None
+    while True:
+        query, next_cursor = base.paginate(order_fields, after=token, size=size, dialect=dialect)
+        rows = conn.execute( *query.to_params() ).fetchall()
+        result += rows
+        token = next_cursor(rows)
+        if not token:
+            return result
+
+class SqlServerSelect(Select):
+    DefaultLanguage = SqlServerLanguage
+
+def seek_conditions(order_fields: str, after: list, query_class=Select) -> list:
+    """The WHERE of the page after `after`, paginated without a dialect"""
+    with BuildContext(dialect=Dialect.ANSI, sort=SortType.ASC, schema=None):
+        base = query_class('Orders o', id=Field, customer=Field)
+        query, _ = base.paginate(order_fields, after=after, size=10)
+    return query.values[CMD_WHERE]
+
+def ordered_rows(conn, order_fields: str) -> list:
+    return conn.execute(f'SELECT * FROM Orders ORDER BY {order_fields}').fetchall()
+
+def cursor_round_trip(values: list) -> list:
+    return Select.read_cursor( Select.cursor_token(values) )
+
+def oracle_limits() -> tuple:
+    with BuildContext(dialect=Dialect.ORACLE, schema=None):
+        oracle = Select('Orders o', id=Field).limit(10)
+        ordered = Select('Orders o', id=[Field, OrderBy]).limit(10, 20)
+    return oracle.values[CMD_WHERE], ordered.translate_to(OracleLanguage)
@@ -0,0 +1,34 @@
+from sql_blocks.sql_blocks import *
+from tests.util import create_public_schema
+
+
+def select_with_params(style: str) -> tuple:
+    query = Select(
+        'Customer c', name=[Field, contains('Jo')],
+        region=inside([1, 2]), age=Between(18, 65)
+    )
+    return query.to_params(style)
+
+def same_shape_for_other_values() -> bool:
+    sql1, params1 = Select('Product p', price=gt(10)).to_params()
+    sql2, params2 = Select('Product p', price=gt(99.9)).to_params()
+    return sql1 == sql2 and params1 != params2
+
+def delete_with_params() -> tuple:
+    create_public_schema()
+    return Delete(
+        'Product', serial_number=eq(5), name=contains('a')
+    ).to_params('named')
+
+def function_args_params() -> tuple:
+    with BuildContext(dialect=Dialect.ANSI, schema=None):
+        query = Select('Product p', name=Field)
+        query.values[CMD_WHERE] = [
+            'Round(p.price, 2) > 10.5', "Coalesce(p.name, 'none') <> 'x'", 'p.id IN (1, 2)',
+        ]
+        return query.to_params()
+
+def rownum_params() -> tuple:
+    with BuildContext(dialect=Dialect.ORACLE, schema=None):
+        query = Select('Product p', name=Field, price=gt(5)).limit(10)
+        return query.to_params(language=OracleLanguage)
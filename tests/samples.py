@@ -0,0 +1,60 @@
+import os
+from sql_blocks import *
+
+
+SAMPLE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sample')
+
+# --- Select.parse of each sample/ script (fresh settings), as in the
+#     regex-based parser, except for:
+#       * all_in_one.sql, range.sql: the /* multi-line */ comments are removed;
+#       * case.sql: the nested CASE is kept in SELECT (it was read as WHERE);
+#       * subqueries.sql: each (SELECT ...) AS name in FROM is the table `name`
+#         (the former result mixed the clauses of the 4 inner queries).
+PARSED_SAMPLES = {
+    'all_in_one.sql': [
+        'SELECT\n\ts.prod_id\nFROM\n\tSales s\nWHERE\n\t(s.store = 65 OR s.store = 31 or s.store = 84)  AND \n\tYear(s.ref_date) = 2023 \nORDER BY\n\ts.ref_date DESC',
+        "SELECT\n\tp.value\nFROM\n\tProduct p\nWHERE\n\tnot p.name <> 'iPhone'  AND \n\tp.value * 1.05 < 1050",
+    ],
+    'case.sql': [
+        "SELECT\n\tp.name,\n\tCASE WHEN p.age BETWEEN 0 AND 13 THEN CASE WHEN gender = 'M' THEN 'boy' WHEN gender = 'F' THEN 'girl' END WHEN p.age BETWEEN 14 AND 20 THEN CASE WHEN gender = 'M' THEN 'young man' WHEN gender = 'F' THEN 'young woman' END WHEN p.age BETWEEN 21 AND 40 THEN CASE WHEN gender = 'M' THEN 'man' WHEN gender = 'F' THEN 'woman' END WHEN p.age BETWEEN 41 AND 99 THEN CASE WHEN gender = 'M' THEN 'old man' WHEN gender = 'F' THEN 'old woman' END END AS ptype\nFROM\n\tPerson p",
+    ],
+    'confused.sql': [
+        'SELECT\n\ts.value,\n\ts.quantity\nFROM\n\tSales s\nWHERE\n\t(s.store = 65 OR s.store = 31 or s.store = 84) \nORDER BY\n\ts.ref_date DESC',
+        "SELECT\n\t*\nFROM\n\tProduct p\nWHERE\n\tnot p.name <> 'iPhone'  AND \n\tp.value * 1.05 < 1050",
+    ],
+    'dialect_postgre.sql': [
+        "SELECT\n\tSubstring(EAN, '\\d+',), Date_Part(ref_date, YEAR) as ref_year, Current_date() - due_date as elapsed_time\nFROM\n\tOrders ord\nWHERE\n\tcustomer_id = 35",
+    ],
+    'order.sql': [
+        'SELECT\n\to.ref_date,\n\to.order_num,\n\to.store,\n\to.customer_id,\n\to.product_id,\n\to.price,\n\to.discount\nFROM\n\tOrder o\nWHERE\n\to.store IN (27, 18, 49, 36)  AND \n\to.price > 500 \nORDER BY\n\to.ref_date',
+    ],
+    'person1.sql': [
+        "SELECT\n\tper.name,\n\tper.age\nFROM\n\tperson per\nWHERE\n\tstatus = 'active'",
+    ],
+    'person2.sql': [
+        'SELECT\n\tper.department,\n\tper.name\nFROM\n\tPERSON per\nWHERE\n\tage > 18 \nORDER BY\n\tper.name',
+    ],
+    'pivot.sql': [
+        'SELECT\n\ts.product,\n\ts.region,\n\ts.month_ref\nFROM\n\tSales s\nGROUP BY\n\ts.product',
+    ],
+    'range.sql': [
+        'SELECT\n\tp.name,\n\tp.age\nFROM\n\tPerson p\nORDER BY\n\tp.name',
+    ],
+    'remove_from_orders.sql': [
+        'SELECT\n\tord.ref_date\nFROM\n\tOrder ord\nWHERE\n\tstore is null \nORDER BY\n\tord.ref_date',
+    ],
+    'subqueries.sql': [
+        'SELECT\n\tu001.name\nFROM\n\tu001 u001',
+        'SELECT\n\tagg_vendas.total\nFROM\n\tagg_vendas agg_vendas',
+    ],
+}
+
+def parsed_sample(file_name: str) -> list:
+    with open(os.path.join(SAMPLE_FOLDER, file_name)) as file:
+        script = file.read()
+    with BuildContext(sort=SortType.ASC, schema=None, alias_func=None, use_catalog=False):
+        return [str(query) for query in Select.parse(script)]
+
+def parsed_values(script: str) -> list:
+    with BuildContext(sort=SortType.ASC, schema=None, alias_func=None, use_catalog=False):
+        return [dict(query.values) for query in Select.parse(script)]